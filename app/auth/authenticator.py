@@ -10,6 +10,7 @@ from app.exceptions import (
     MSALAuthenticationError,
     TokenAcquisitionError,
 )
+from app.services import metrics
 
 
 class Authenticator:
@@ -124,6 +125,7 @@ class Authenticator:
         """
         if "access_token" in result:
             logging.info("Token acquisition successful")
+            metrics.TOKEN_REFRESHES.inc()
             self.access_token = result["access_token"]
             self.token_expiry = datetime.now(timezone.utc) + timedelta(
                 seconds=result["expires_in"]
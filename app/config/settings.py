@@ -26,6 +26,14 @@ class Settings:
         The user email for authentication.
     AIOHTTP_LIMIT : int
         The connection limit for aiohttp.
+    AIOHTTP_LIMIT_PER_HOST : int
+        The connection limit per host for aiohttp.
+    AIOHTTP_DNS_CACHE_TTL : int
+        The number of seconds resolved DNS entries are cached.
+    AIOHTTP_KEEPALIVE_TIMEOUT : float
+        The number of seconds idle connections are kept open.
+    AIOHTTP_WARM_UP_CONNECTIONS : int
+        The number of connections opened to Graph before sending.
     API_SCOPE : str
         The API scope for authentication.
     EXCEL_FILE_PATH : str
@@ -38,12 +46,87 @@ class Settings:
         The default font size.
     FONT_SIZE_INCREMENT : float
         The increment value for font size.
+    FORMAT_CHUNK_SIZE : int
+        The number of rows of the first chunks formatted before being handed to
+        the sender; later chunks are sized from the measured formatting cost.
+    RENDER_WORKERS : int
+        The number of worker processes that format large campaigns; 1 formats
+        them in the application process.
     INVALID_VALUES : List[str]
         The list of invalid values for filtering rows.
     GRAPH_API_URL : str
         The URL for the Microsoft Graph API.
     SAVE_TO_SENT_ITEMS : str
         The value for saving sent items.
+    ATTACHMENT_INLINE_LIMIT : int
+        The maximum size, in bytes, of base64-encoded attachments sent inline in
+        the sendMail request; larger attachments use upload sessions.
+    ATTACHMENT_UPLOAD_CHUNK_SIZE : int
+        The size, in bytes, of each chunk uploaded through an upload session.
+    ATTACHMENT_CACHE_MAX_BYTES : int
+        The memory budget, in bytes, for the encoded attachments cached per campaign.
+    MAILBOX_BALANCING : str
+        How emails are distributed across the sender mailboxes
+        ("least_loaded" or "weighted_round_robin").
+    MAX_SEND_RETRIES : int
+        The number of times a throttled email is retried on another mailbox.
+    MAILBOX_MESSAGES_PER_MINUTE : float
+        The maximum number of emails sent per minute by each mailbox; 0 disables it.
+    MAILBOX_RECIPIENTS_PER_DAY : int
+        The maximum number of recipients per rolling 24 hours of each mailbox; 0
+        disables it.
+    DATA_DIR : str
+        The directory where the application keeps its local state.
+    SEND_WORKERS : int
+        The number of worker processes used to send emails; 1 sends from the
+        application process.
+    MAX_CONCURRENT_JOBS : int
+        The number of queued campaigns that run at the same time.
+    CSV_DELIMITER : str
+        The field delimiter of CSV input files.
+    CSV_ENCODING : str
+        The text encoding of CSV input files.
+    SNAPSHOT_CACHE_MAX_FILES : int
+        The number of parsed spreadsheets kept as Arrow snapshots; 0 disables it.
+    MAX_RECIPIENTS_PER_MESSAGE : int
+        The maximum number of To, CC and CCO recipients of an email; 0 disables it.
+    MAX_REQUEST_BYTES : int
+        The maximum size, in bytes, of a Graph API request.
+    DEDUP_POLICY : str
+        What happens to an email identical to one of a previous row: "drop",
+        "flag" or "off".
+    SUPPRESSION_LIST_PATH : str
+        The text file, one address per line, whose addresses never receive emails;
+        empty disables the import.
+    PROFILE_MODE : str
+        How campaigns are profiled: "off", "spans" to log the time of each stage,
+        or "capture" to also write cProfile and tracemalloc reports to DATA_DIR.
+    METRICS_PORT : int
+        The port of the local endpoint exposing metrics in the Prometheus format;
+        0 disables it.
+    METRICS_HOST : str
+        The address the metrics endpoint listens on.
+    DRY_RUN_FORMAT : str
+        "jsonl" or "eml" to write the emails of each campaign to DATA_DIR instead
+        of sending them; "off" sends them.
+    RECIPIENT_MODE : str
+        "grouped" to send one email per row with every address in To, or "fan_out"
+        to send each To address its own copy.
+    RESULT_WRITE_BACK : str
+        Where the result of each row is written after a campaign: "annotate" for
+        a copy of the workbook with status columns, "sidecar" for a sheet with
+        only the results, or "off".
+    RUNTIME_CONFIG_PATH : str
+        The JSON file watched for tuning values changed while campaigns run;
+        empty disables it.
+    RUNTIME_CONFIG_POLL_SECONDS : float
+        The number of seconds between two checks of the runtime config file.
+    LOOP_MONITOR_INTERVAL : float
+        The number of seconds between two samples of the event loop lag; 0
+        disables the monitor.
+    LOOP_BLOCK_THRESHOLD : float
+        The number of seconds the event loop may be blocked before the stack of
+        the blocking code is logged; 0 disables it.
 
     Methods
     -------
@@ -65,6 +148,18 @@ class Settings:
         self.CLIENT_SECRET: str = self._get_env_var("CLIENT_SECRET")
         self.USER_EMAIL: str = self._get_env_var("USER_EMAIL")
         self.AIOHTTP_LIMIT: int = int(self._get_env_var("AIOHTTP_LIMIT", 10))
+        self.AIOHTTP_LIMIT_PER_HOST: int = int(
+            self._get_env_var("AIOHTTP_LIMIT_PER_HOST", self.AIOHTTP_LIMIT)
+        )
+        self.AIOHTTP_DNS_CACHE_TTL: int = int(
+            self._get_env_var("AIOHTTP_DNS_CACHE_TTL", 300)
+        )
+        self.AIOHTTP_KEEPALIVE_TIMEOUT: float = float(
+            self._get_env_var("AIOHTTP_KEEPALIVE_TIMEOUT", 60)
+        )
+        self.AIOHTTP_WARM_UP_CONNECTIONS: int = int(
+            self._get_env_var("AIOHTTP_WARM_UP_CONNECTIONS", 4)
+        )
         self.API_SCOPE: str = self._get_env_var("API_SCOPE")
         self.EXCEL_FILE_PATH: str = self._get_env_var("EXCEL_FILE_PATH")
         self.APP_TITLE: str = self._get_env_var("APP_TITLE")
@@ -73,6 +168,10 @@ class Settings:
         self.FONT_SIZE_INCREMENT: float = float(
             self._get_env_var("FONT_SIZE_INCREMENT", 0.01)
         )
+        self.FORMAT_CHUNK_SIZE: int = int(self._get_env_var("FORMAT_CHUNK_SIZE", 500))
+        self.RENDER_WORKERS: int = int(
+            self._get_env_var("RENDER_WORKERS", os.cpu_count() or 1)
+        )
         self.INVALID_VALUES: List[str] = self._get_env_var(
             "INVALID_VALUES", "x,nan,"
         ).split(",")
@@ -80,6 +179,61 @@ class Settings:
             "GRAPH_API_URL", "https://graph.microsoft.com/v1.0"
         )
         self.SAVE_TO_SENT_ITEMS: str = self._get_env_var("SAVE_TO_SENT_ITEMS", "true")
+        self.ATTACHMENT_INLINE_LIMIT: int = int(
+            self._get_env_var("ATTACHMENT_INLINE_LIMIT", 3 * 1024 * 1024)
+        )
+        self.ATTACHMENT_UPLOAD_CHUNK_SIZE: int = int(
+            self._get_env_var("ATTACHMENT_UPLOAD_CHUNK_SIZE", 10 * 320 * 1024)
+        )
+        self.ATTACHMENT_CACHE_MAX_BYTES: int = int(
+            self._get_env_var("ATTACHMENT_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+        )
+        self.MAILBOX_BALANCING: str = self._get_env_var(
+            "MAILBOX_BALANCING", "least_loaded"
+        )
+        self.MAX_SEND_RETRIES: int = int(self._get_env_var("MAX_SEND_RETRIES", 3))
+        self.MAILBOX_MESSAGES_PER_MINUTE: float = float(
+            self._get_env_var("MAILBOX_MESSAGES_PER_MINUTE", 0)
+        )
+        self.MAILBOX_RECIPIENTS_PER_DAY: int = int(
+            self._get_env_var("MAILBOX_RECIPIENTS_PER_DAY", 0)
+        )
+        self.DATA_DIR: str = self._get_env_var("DATA_DIR", ".disparador")
+        self.SEND_WORKERS: int = int(self._get_env_var("SEND_WORKERS", 1))
+        self.MAX_CONCURRENT_JOBS: int = int(self._get_env_var("MAX_CONCURRENT_JOBS", 3))
+        self.CSV_DELIMITER: str = self._get_env_var("CSV_DELIMITER", ",")
+        self.CSV_ENCODING: str = self._get_env_var("CSV_ENCODING", "utf-8")
+        self.SNAPSHOT_CACHE_MAX_FILES: int = int(
+            self._get_env_var("SNAPSHOT_CACHE_MAX_FILES", 20)
+        )
+        self.MAX_RECIPIENTS_PER_MESSAGE: int = int(
+            self._get_env_var("MAX_RECIPIENTS_PER_MESSAGE", 500)
+        )
+        self.MAX_REQUEST_BYTES: int = int(
+            self._get_env_var("MAX_REQUEST_BYTES", 4 * 1024 * 1024)
+        )
+        self.DEDUP_POLICY: str = self._get_env_var("DEDUP_POLICY", "off")
+        self.SUPPRESSION_LIST_PATH: str = self._get_env_var("SUPPRESSION_LIST_PATH", "")
+        self.PROFILE_MODE: str = self._get_env_var("PROFILE_MODE", "off").lower()
+        self.METRICS_PORT: int = int(self._get_env_var("METRICS_PORT", 0))
+        self.METRICS_HOST: str = self._get_env_var("METRICS_HOST", "127.0.0.1")
+        self.DRY_RUN_FORMAT: str = self._get_env_var("DRY_RUN_FORMAT", "off").lower()
+        self.RECIPIENT_MODE: str = self._get_env_var(
+            "RECIPIENT_MODE", "grouped"
+        ).lower()
+        self.RESULT_WRITE_BACK: str = self._get_env_var(
+            "RESULT_WRITE_BACK", "off"
+        ).lower()
+        self.RUNTIME_CONFIG_PATH: str = self._get_env_var("RUNTIME_CONFIG_PATH", "")
+        self.RUNTIME_CONFIG_POLL_SECONDS: float = float(
+            self._get_env_var("RUNTIME_CONFIG_POLL_SECONDS", 1.0)
+        )
+        self.LOOP_MONITOR_INTERVAL: float = float(
+            self._get_env_var("LOOP_MONITOR_INTERVAL", 0)
+        )
+        self.LOOP_BLOCK_THRESHOLD: float = float(
+            self._get_env_var("LOOP_BLOCK_THRESHOLD", 0.5)
+        )
 
     @staticmethod
     def _get_env_var(name: str, default: Optional[str] = None) -> str:
@@ -1,12 +1,44 @@
+import asyncio
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from tkinter import Tk, filedialog
-from typing import Dict, Optional
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
 from app.auth.authenticator import Authenticator
 from app.config.settings import Settings
-from app.services.email_formatter import EmailFormatter
+from app.enum.dry_run_format import DryRunFormat
+from app.enum.duplicate_policy import DuplicatePolicy
+from app.enum.job_status import JobStatus
+from app.enum.mailbox_balancing_strategy import MailboxBalancingStrategy
+from app.enum.recipient_mode import RecipientMode
+from app.enum.result_write_back import ResultWriteBack
+from app.enum.send_status import SendStatus
+from app.exceptions import RuntimeKnobError
+from app.services import metrics, profiling
+from app.services.dedup_index import BODY_PART_SEPARATOR, DuplicateDetector
+from app.services.dry_run import DryRunEmailSender, DryRunWriter
+from app.services.fair_share import FairShareLimiter, JobShare
+from app.services.fan_out import fan_out, split_recipients
+from app.services.http_session import HttpSessionManager
+from app.services.job_queue import JobQueue
+from app.services.loop_monitor import LoopLagMonitor
+from app.services.mailbox_pool import MailboxPool
+from app.services.metrics import MetricsServer
+from app.services.preflight import PreflightValidator
 from app.services.process_excel import ExcelProcessor
+from app.services.render_pool import RenderJob, RenderPool
+from app.services.result_writer import ResultWriter
+from app.services.runtime_knobs import RuntimeConfigWatcher, RuntimeKnobs
 from app.services.send_email import EmailSender
+from app.services.send_scheduler import (
+    RecipientLedger,
+    SendScheduler,
+    count_recipients,
+)
+from app.services.sharded_sender import ShardedEmailSender
+from app.services.suppression_list import SuppressionList
 
 
 class HomeController:
@@ -18,6 +50,19 @@ class HomeController:
         selected_file (Optional[str]): The path to the selected Excel file.
         status_message (str): The status message of the current operation.
         settings (Settings): The application settings.
+        authenticator (Authenticator): The authenticator, kept so that a valid token
+            is reused across campaigns.
+        session_manager (HttpSessionManager): The HTTP session shared across campaigns.
+        executor (ThreadPoolExecutor): The thread that parses and formats workbooks
+            off the event loop.
+        recipient_ledger (RecipientLedger): The recipients sent from each mailbox over
+            the last 24 hours.
+        job_queue (JobQueue): The campaigns queued to run in the background.
+        suppression_list (SuppressionList): The addresses that must never receive
+            emails.
+        render_pool (RenderPool): The worker processes that format large campaigns.
+        metrics_server (Optional[MetricsServer]): The endpoint exposing the metrics,
+            if METRICS_PORT is set.
     """
 
     def __init__(self) -> None:
@@ -27,6 +72,38 @@ class HomeController:
         self.selected_file: Optional[str] = None
         self.status_message: str = ""
         self.settings = Settings()
+        self.authenticator = Authenticator(
+            self.settings.CLIENT_ID,
+            self.settings.TENANT_ID,
+            self.settings.CLIENT_SECRET,
+            self.settings.API_SCOPE,
+        )
+        self.session_manager = HttpSessionManager(self.settings)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="workbook")
+        self.recipient_ledger = RecipientLedger.for_settings(self.settings)
+        self.job_queue = JobQueue.for_settings(self.settings)
+        self.suppression_list = SuppressionList.for_settings(self.settings)
+        self.knobs = RuntimeKnobs(self.settings)
+        self.runtime_config_watcher: Optional[RuntimeConfigWatcher] = None
+        if self.settings.RUNTIME_CONFIG_PATH:
+            self.runtime_config_watcher = RuntimeConfigWatcher(
+                self.knobs,
+                self.settings.RUNTIME_CONFIG_PATH,
+                self.settings.RUNTIME_CONFIG_POLL_SECONDS,
+            )
+            self.runtime_config_watcher.start()
+        self.render_pool = RenderPool(self.settings, self.knobs)
+        self.loop_monitor: Optional[LoopLagMonitor] = None
+        if self.settings.LOOP_MONITOR_INTERVAL:
+            self.loop_monitor = LoopLagMonitor(
+                self.settings.LOOP_MONITOR_INTERVAL, self.settings.LOOP_BLOCK_THRESHOLD
+            )
+        self.metrics_server: Optional[MetricsServer] = None
+        if self.settings.METRICS_PORT:
+            self.metrics_server = MetricsServer(
+                metrics.REGISTRY, self.settings.METRICS_HOST, self.settings.METRICS_PORT
+            )
+            self.metrics_server.start()
 
     def open_file_dialog(self) -> str:
         """
@@ -37,7 +114,14 @@ class HomeController:
         """
         root = Tk()
         root.withdraw()  # Hide the root window
-        file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx")])
+        file_path = filedialog.askopenfilename(
+            filetypes=[
+                ("Excel files", "*.xlsx"),
+                ("CSV files", "*.csv"),
+                ("Parquet files", "*.parquet"),
+                ("Arrow files", "*.arrow *.feather"),
+            ]
+        )
         root.destroy()
         if file_path:
             self.selected_file = file_path
@@ -55,9 +139,6 @@ class HomeController:
         Args:
             sender_email (str): The email address of the sender.
             formats (Dict[str, Dict[str, str]]): The dictionary containing the formats for each body part.
-
-        Raises:
-            Exception: If there is an error during the email sending process.
         """
         if not self.selected_file:
             self.status_message = "Por favor, selecione um arquivo primeiro"
@@ -68,16 +149,519 @@ class HomeController:
             return
 
         try:
-            access_token = await self._get_access_token()
-            email_data = self._process_excel()
-            formatted_email_data = self._format_emails(email_data, formats)
-            await self._send_emails(access_token, sender_email, formatted_email_data)
-            self.status_message = "Emails enviados com sucesso"
+            self.status_message = await self.run_campaign(
+                self.selected_file, sender_email, formats
+            )
         except Exception as e:
             self.status_message = f"Erro: {e}"
+
+    def update_knobs(self, values: Dict[str, Any]) -> None:
+        """
+        Changes the tuning values of the running and next campaigns.
+
+        Args:
+            values (Dict[str, Any]): The new values, keyed by knob name.
+        """
+        try:
+            changed = self.knobs.update(values)
+        except RuntimeKnobError as e:
+            self.status_message = f"Erro: {e}"
+            return
+        if changed:
+            self.status_message = "Ajustes aplicados: " + ", ".join(
+                f"{name}={value}" for name, value in changed.items()
+            )
+        else:
+            self.status_message = "Nenhum ajuste alterado"
+
+    def get_live_status(self) -> str:
+        """
+        Describes the progress of the running campaigns, for the UI to poll.
+
+        Returns:
+            str: The emails sent and failed, the responses throttled by Graph, the
+            current concurrency and send rate and the event loop lag.
+        """
+        status = (
+            f"{int(metrics.MESSAGES[SendStatus.SENT.value].value)} enviados, "
+            f"{int(metrics.MESSAGES[SendStatus.FAILED.value].value)} com falha, "
+            f"{int(metrics.THROTTLED_RESPONSES.value)} limitados pelo Graph "
+            f"(concorrência {self.knobs.concurrency}, "
+            f"{self.knobs.messages_per_minute:g} emails/min por caixa)"
+        )
+        if self.loop_monitor is not None:
+            status += f", atraso do loop {self.loop_monitor.last_lag * 1000:.0f} ms"
+        return status
+
+    def enqueue_job(
+        self, sender_email: str, formats: Dict[str, Dict[str, str]], priority: int = 1
+    ) -> None:
+        """
+        Adds the selected Excel file to the job queue.
+
+        Args:
+            sender_email (str): The email address of the sender.
+            formats (Dict[str, Dict[str, str]]): The dictionary containing the formats for each body part.
+            priority (int): The priority of the job.
+        """
+        if not self.selected_file:
+            self.status_message = "Por favor, selecione um arquivo primeiro"
+            return
+
+        if not sender_email:
+            self.status_message = "Por favor, insira o email do remetente"
+            return
+
+        job_id = self.job_queue.enqueue(
+            self.selected_file, sender_email, formats, priority
+        )
+        pending = len(self.job_queue.list_jobs(JobStatus.PENDING))
+        self.status_message = (
+            f"Campanha {job_id} adicionada à fila ({pending} aguardando)"
+        )
+
+    async def run_jobs(self) -> None:
+        """
+        Runs the queued campaigns until the queue is empty.
+
+        Up to MAX_CONCURRENT_JOBS campaigns run at once over the shared HTTP session,
+        token and sending limits, and share one concurrency budget in proportion to
+        their priority.
+        """
+        limiter = FairShareLimiter(self.knobs.concurrency)
+        scheduler = self._create_scheduler()
+        running: Dict[asyncio.Task, Dict[str, Any]] = {}
+        finished = 0
+        try:
+            while True:
+                while len(running) < max(1, self.settings.MAX_CONCURRENT_JOBS):
+                    job = self.job_queue.claim_next()
+                    if job is None:
+                        break
+                    logging.info(
+                        f"Iniciando a campanha {job['id']} ({job['file_path']}) "
+                        f"com prioridade {job['priority']}"
+                    )
+                    task = asyncio.create_task(
+                        self.run_campaign(
+                            job["file_path"],
+                            job["sender_email"],
+                            job["formats"],
+                            scheduler.for_campaign(job["id"]),
+                            limiter.share(job["id"], job["priority"]),
+                        )
+                    )
+                    running[task] = job
+                if not running:
+                    break
+                self.status_message = f"Executando {len(running)} campanhas da fila"
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    job = running.pop(task)
+                    limiter.unregister(job["id"])
+                    try:
+                        message, status = task.result(), JobStatus.DONE
+                    except Exception as e:
+                        message, status = f"Erro: {e}", JobStatus.FAILED
+                    self.job_queue.finish(job["id"], status, message)
+                    logging.info(f"Campanha {job['id']}: {message}")
+                    finished += 1
         finally:
-            logging.info("Fechando o arquivo Excel.")
-            self._close_excel()
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+        self.status_message = f"Fila concluída: {finished} campanhas processadas"
+
+    async def run_campaign(
+        self,
+        file_path: str,
+        sender_email: str,
+        formats: Dict[str, Dict[str, str]],
+        scheduler: Optional[SendScheduler] = None,
+        job_share: Optional[JobShare] = None,
+    ) -> str:
+        """
+        Parses, formats and sends the emails of a workbook.
+
+        Args:
+            file_path (str): The path to the Excel file.
+            sender_email (str): The email address of the sender.
+            formats (Dict[str, Dict[str, str]]): The dictionary containing the formats for each body part.
+            scheduler (Optional[SendScheduler]): The send scheduler shared with other
+                campaigns. Defaults to a scheduler of this campaign.
+            job_share (Optional[JobShare]): The share of the campaign in the
+                concurrency budget of the job queue. Queued campaigns are always sent
+                from this process, regardless of SEND_WORKERS.
+
+        Returns:
+            str: The summary of the campaign.
+
+        Raises:
+            Exception: If there is an error during the email sending process.
+        """
+        if self.loop_monitor is not None:
+            self.loop_monitor.start()
+        # Token acquisition and connection warm-up run on the event loop while the
+        # workbook is parsed and formatted in the executor thread
+        loop = asyncio.get_running_loop()
+        dry_run_format = DryRunFormat(self.settings.DRY_RUN_FORMAT)
+        recipient_mode = RecipientMode(self.settings.RECIPIENT_MODE)
+        if dry_run_format is DryRunFormat.OFF:
+            token_task = asyncio.create_task(self._get_access_token())
+            warm_up_task = asyncio.create_task(self.session_manager.warm_up())
+        else:
+            # Dry runs never reach Graph
+            token_task = loop.create_future()
+            token_task.set_result("")
+            warm_up_task = loop.create_future()
+            warm_up_task.set_result(0)
+        render_job: Optional[RenderJob] = None
+        with profiling.profile_session(self.settings):
+            try:
+                email_data = await loop.run_in_executor(
+                    self.executor, self._process_excel, file_path
+                )
+                email_data, suppressed_results = await loop.run_in_executor(
+                    self.executor, self._apply_suppression, email_data
+                )
+                email_data, invalid_results = self._validate_rows(email_data)
+                # Repeated rows are left out before planning, so they do not take
+                # daily quota from the unique ones
+                duplicate_detector = DuplicateDetector(
+                    DuplicatePolicy(self.settings.DEDUP_POLICY), len(email_data["rows"])
+                )
+                email_data, duplicate_results = await loop.run_in_executor(
+                    self.executor,
+                    self._drop_duplicates,
+                    email_data,
+                    duplicate_detector,
+                )
+                if dry_run_format is not DryRunFormat.OFF:
+                    # Nothing is sent, so no quota is used nor rate applied
+                    scheduler = None
+                elif scheduler is None:
+                    scheduler = self._create_scheduler()
+                email_data, deferred_results = self._plan_campaign(
+                    scheduler, sender_email, email_data
+                )
+                if (
+                    job_share is None
+                    and dry_run_format is DryRunFormat.OFF
+                    and recipient_mode is RecipientMode.GROUPED
+                    and self.settings.SEND_WORKERS > 1
+                    and len(email_data["bodies"]) > 1
+                ):
+                    formatted_email_data = await self.render_pool.render_all(
+                        email_data, formats, self.executor
+                    )
+                    access_token = await token_task
+                    with profiling.span("send"):
+                        results = await self._send_emails_sharded(
+                            access_token, sender_email, formatted_email_data
+                        )
+                    self._record_sharded_results(results, formatted_email_data)
+                else:
+                    render_job = self.render_pool.start(
+                        email_data, formats, self.executor
+                    )
+                    messages = self._iter_messages(render_job)
+                    if recipient_mode is RecipientMode.FAN_OUT:
+                        # Rows are expanded as the senders consume them, never
+                        # held as one email per address
+                        messages = fan_out(messages)
+                    access_token = await token_task
+                    with profiling.span("send"):
+                        if dry_run_format is DryRunFormat.OFF:
+                            results = await self._send_emails(
+                                access_token,
+                                sender_email,
+                                messages,
+                                scheduler,
+                                job_share,
+                            )
+                        else:
+                            results = await self._write_dry_run(
+                                file_path, sender_email, messages, dry_run_format
+                            )
+                self._flag_duplicates(results, duplicate_detector)
+                all_results = (
+                    results
+                    + duplicate_results
+                    + suppressed_results
+                    + invalid_results
+                    + deferred_results
+                )
+                summary = self._summarize_results(all_results)
+                if dry_run_format is not DryRunFormat.OFF:
+                    return f"Simulação (nada foi enviado): {summary}"
+                return summary + await self._write_results(file_path, all_results)
+            finally:
+                if render_job is not None:
+                    render_job.cancel()
+                for task in [token_task, warm_up_task]:
+                    task.cancel()
+                await asyncio.gather(token_task, warm_up_task, return_exceptions=True)
+                if scheduler is not None:
+                    # The quota planned and not sent is given back to the queue
+                    scheduler.finish()
+                self.recipient_ledger.save()
+                logging.info("Fechando o arquivo Excel.")
+                self._close_excel(file_path)
+
+    async def _write_results(
+        self, file_path: str, results: List[Dict[str, Any]]
+    ) -> str:
+        """
+        Writes the result of each row next to the spreadsheet, according to
+        RESULT_WRITE_BACK. A failure is reported without failing the campaign,
+        whose emails were already sent.
+
+        Args:
+            file_path (str): The path to the Excel file.
+            results (List[Dict[str, Any]]): The result of each email.
+
+        Returns:
+            str: The note appended to the summary of the campaign.
+        """
+        result_writer = ResultWriter(ResultWriteBack(self.settings.RESULT_WRITE_BACK))
+        loop = asyncio.get_running_loop()
+        try:
+            with profiling.span("write_back"):
+                output_path = await loop.run_in_executor(
+                    self.executor, result_writer.write, file_path, results
+                )
+        except Exception as e:
+            logging.error(f"Erro ao gravar o resultado da campanha: {e}")
+            return f" (não foi possível gravar o resultado: {e})"
+        if output_path is None:
+            return ""
+        return f" (resultado em {os.path.basename(output_path)})"
+
+    def _apply_suppression(
+        self, email_data: Dict[str, list]
+    ) -> Tuple[Dict[str, list], List[Dict[str, Any]]]:
+        """
+        Removes the suppressed addresses from the To, CC and CCO fields, after
+        importing the addresses appended to SUPPRESSION_LIST_PATH. Rows left without
+        any To recipient are not sent.
+
+        Args:
+            email_data (Dict[str, list]): The raw email data.
+
+        Returns:
+            Tuple[Dict[str, list], List[Dict[str, Any]]]: The email data without the
+            suppressed addresses and the results of the rows left without recipients.
+        """
+        source_path = self.settings.SUPPRESSION_LIST_PATH
+        if source_path and os.path.exists(source_path):
+            with profiling.span("suppression_sync"):
+                self.suppression_list.sync_source(source_path)
+        if not len(self.suppression_list):
+            return email_data, []
+
+        original_recipients = email_data["recipients"]
+        email_data = dict(email_data)
+        removed = 0
+        with profiling.span("suppression"):
+            for field in ("recipients", "cc", "cco"):
+                email_data[field], count = self.suppression_list.filter_cells(
+                    email_data[field]
+                )
+                removed += count
+        if not removed:
+            return email_data, []
+        logging.info(f"{removed} endereços da lista de supressão removidos")
+
+        suppressed = [
+            position
+            for position, (before, after) in enumerate(
+                zip(original_recipients, email_data["recipients"])
+            )
+            if count_recipients(after) == 0 and count_recipients(before) > 0
+        ]
+        suppressed_results = [
+            {
+                "row": email_data["rows"][position],
+                "status": SendStatus.SUPPRESSED.value,
+                "recipients": original_recipients[position],
+                "sender": None,
+                "error": "Todos os destinatários estão na lista de supressão",
+            }
+            for position in suppressed
+        ]
+        suppressed_positions = set(suppressed)
+        kept = [
+            position
+            for position in range(len(email_data["rows"]))
+            if position not in suppressed_positions
+        ]
+        return self._select_rows(email_data, kept), suppressed_results
+
+    def _validate_rows(
+        self, email_data: Dict[str, list]
+    ) -> Tuple[Dict[str, list], List[Dict[str, Any]]]:
+        """
+        Runs the pre-flight validation and leaves out the rows whose requests would
+        fail, so no API call is spent on them.
+
+        Args:
+            email_data (Dict[str, list]): The raw email data.
+
+        Returns:
+            Tuple[Dict[str, list], List[Dict[str, Any]]]: The email data of the valid
+            rows and the results of the invalid rows.
+        """
+        with profiling.span("preflight"):
+            problems = PreflightValidator(self.settings).validate(email_data)
+        if not problems:
+            return email_data, []
+        invalid_results = []
+        for position, row_problems in sorted(problems.items()):
+            error = "; ".join(row_problems)
+            logging.warning(f"Linha {email_data['rows'][position]}: {error}")
+            invalid_results.append(
+                {
+                    "row": email_data["rows"][position],
+                    "status": SendStatus.INVALID.value,
+                    "recipients": email_data["recipients"][position],
+                    "sender": None,
+                    "error": error,
+                }
+            )
+        logging.info(f"Pré-validação: {len(problems)} linhas inválidas")
+        valid = [
+            position
+            for position in range(len(email_data["rows"]))
+            if position not in problems
+        ]
+        return self._select_rows(email_data, valid), invalid_results
+
+    @staticmethod
+    def _select_rows(
+        email_data: Dict[str, list], positions: List[int]
+    ) -> Dict[str, list]:
+        """
+        Keeps only some rows of the email data.
+
+        Args:
+            email_data (Dict[str, list]): The email data.
+            positions (List[int]): The positions of the rows to keep, in order.
+
+        Returns:
+            Dict[str, list]: The email data of the kept rows.
+        """
+        if len(positions) == len(email_data["rows"]):
+            return email_data
+        return {
+            key: [values[position] for position in positions]
+            for key, values in email_data.items()
+        }
+
+    def _create_scheduler(self) -> SendScheduler:
+        """
+        Creates the scheduler that paces the campaign within the sending limits. It
+        is created even when no limit is configured, so a send rate set from the
+        knobs while the campaign runs still applies to it.
+
+        Returns:
+            SendScheduler: The scheduler.
+        """
+        return SendScheduler(self.settings, self.recipient_ledger, knobs=self.knobs)
+
+    def _plan_campaign(
+        self,
+        scheduler: Optional[SendScheduler],
+        sender_email: str,
+        email_data: Dict[str, list],
+    ) -> Tuple[Dict[str, list], List[Dict[str, Any]]]:
+        """
+        Computes the send plan of the campaign and leaves out the rows that do not fit
+        in the daily quota of the sender mailboxes. Fanned-out rows count as one
+        message per To address.
+
+        Args:
+            scheduler (Optional[SendScheduler]): The send scheduler.
+            sender_email (str): The sender mailboxes, separated by ';'.
+            email_data (Dict[str, list]): The raw email data.
+
+        Returns:
+            Tuple[Dict[str, list], List[Dict[str, Any]]]: The email data of the
+            scheduled rows and the results of the deferred rows.
+        """
+        if scheduler is None:
+            return email_data, []
+        mailboxes = [
+            mailbox.address
+            for mailbox in MailboxPool.from_string(
+                sender_email, MailboxBalancingStrategy(self.settings.MAILBOX_BALANCING)
+            ).mailboxes
+        ]
+        recipient_counts = [
+            count_recipients(recipients, cc, cco)
+            for recipients, cc, cco in zip(
+                email_data["recipients"], email_data["cc"], email_data["cco"]
+            )
+        ]
+        message_counts = None
+        if RecipientMode(self.settings.RECIPIENT_MODE) is RecipientMode.FAN_OUT:
+            # Each To address gets its own message
+            message_counts = [
+                max(1, len(split_recipients(recipients)))
+                for recipients in email_data["recipients"]
+            ]
+        with profiling.span("plan"):
+            plan = scheduler.plan(recipient_counts, mailboxes, message_counts)
+        eta = plan["eta_seconds"]
+        logging.info(
+            f"Plano de envio: {len(plan['scheduled'])} emails agendados, "
+            f"{len(plan['deferred'])} adiados"
+            + (f", término estimado em {eta / 60:.1f} min" if eta is not None else "")
+        )
+        for mailbox, figures in plan["per_mailbox"].items():
+            logging.info(f"Plano de envio para {mailbox}: {figures}")
+
+        deferred_results = [
+            {
+                "row": email_data["rows"][position],
+                "status": SendStatus.DEFERRED.value,
+                "recipients": email_data["recipients"][position],
+                "sender": None,
+                "error": "Cota diária de destinatários das caixas remetentes esgotada",
+            }
+            for position in plan["deferred"]
+        ]
+        return self._select_rows(email_data, plan["scheduled"]), deferred_results
+
+    def _record_sharded_results(
+        self, results: List[Dict[str, Any]], email_data: Dict[str, list]
+    ) -> None:
+        """
+        Records in the recipient ledger and in the metrics the emails sent by the
+        worker processes, which do not write the ledger file nor expose their
+        metrics themselves.
+
+        Args:
+            results (List[Dict[str, Any]]): The result of each row.
+            email_data (Dict[str, list]): The formatted email data.
+        """
+        recipient_counts = {
+            row: count_recipients(recipients, cc, cco)
+            for row, recipients, cc, cco in zip(
+                email_data["rows"],
+                email_data["recipients"],
+                email_data["cc"],
+                email_data["cco"],
+            )
+        }
+        for result in results:
+            if result["status"] in metrics.MESSAGES:
+                metrics.MESSAGES[result["status"]].inc()
+            if result["status"] == SendStatus.SENT.value:
+                self.recipient_ledger.record(
+                    result["sender"], recipient_counts[result["row"]]
+                )
 
     async def _get_access_token(self) -> str:
         """
@@ -86,65 +670,325 @@ class HomeController:
         Returns:
             str: The access token.
         """
-        authenticator = Authenticator(
-            self.settings.CLIENT_ID,
-            self.settings.TENANT_ID,
-            self.settings.CLIENT_SECRET,
-            self.settings.API_SCOPE,
-        )
-        return await authenticator.get_access_token()
+        with profiling.span("token"):
+            return await self.authenticator.get_access_token()
 
-    def _process_excel(self) -> Dict[str, list]:
+    def _process_excel(self, file_path: Optional[str] = None) -> Dict[str, list]:
         """
-        Processes the selected Excel file and extracts email data.
+        Processes an Excel file and extracts email data.
+
+        Args:
+            file_path (Optional[str]): The path to the Excel file. Defaults to the
+                selected file.
 
         Returns:
             Dict[str, list]: A dictionary containing email bodies, subjects, and recipients.
         """
-        excel_processor = ExcelProcessor(self.selected_file, self.settings)
-        return excel_processor.process_excel()
+        excel_processor = ExcelProcessor(file_path or self.selected_file, self.settings)
+        with profiling.span("parse"):
+            return excel_processor.process_excel()
 
-    def _format_emails(
-        self, email_data: Dict[str, list], formats: Dict[str, Dict[str, str]]
-    ) -> Dict[str, list]:
+    @staticmethod
+    async def _iter_messages(render_job: RenderJob) -> AsyncIterator[Dict[str, Any]]:
         """
-        Formats the email data.
+        Yields the emails of each formatted chunk as soon as the chunk is ready.
+
+        Args:
+            render_job (RenderJob): The rendering of the campaign.
+
+        Yields:
+            Dict[str, Any]: The email of one row.
+        """
+        async for chunk in render_job:
+            for message in HomeController._chunk_messages(chunk):
+                yield message
+
+    @staticmethod
+    def _chunk_messages(email_data: Dict[str, list]) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the emails of formatted email data.
+
+        Args:
+            email_data (Dict[str, list]): The formatted email data.
+
+        Yields:
+            Dict[str, Any]: The email of one row.
+        """
+        for i, body in enumerate(email_data["bodies"]):
+            yield {
+                "row": email_data["rows"][i],
+                "body": body,
+                "subject": email_data["subjects"][i],
+                "recipients": email_data["recipients"][i],
+                "cc": email_data["cc"][i],
+                "cco": email_data["cco"][i],
+                "attachments": email_data["attachments"][i],
+                "inline_images": email_data["inline_images"][i],
+            }
+
+    @staticmethod
+    def _drop_duplicates(
+        email_data: Dict[str, list], duplicate_detector: DuplicateDetector
+    ) -> Tuple[Dict[str, list], List[Dict[str, Any]]]:
+        """
+        Leaves out the rows the duplicate policy does not send. The rows are
+        compared before formatting: every row of a campaign is formatted with the
+        same formats, so identical rows give identical emails.
 
         Args:
             email_data (Dict[str, list]): The raw email data.
-            formats (Dict[str, Dict[str, str]]): The dictionary containing the formats for each body part.
+            duplicate_detector (DuplicateDetector): The duplicate detector.
 
         Returns:
-            Dict[str, list]: The formatted email data.
+            Tuple[Dict[str, list], List[Dict[str, Any]]]: The email data of the rows
+            to send and the results of the dropped rows.
         """
-        email_formatter = EmailFormatter(self.settings)
-        return email_formatter.format_emails(email_data, formats)
+        if duplicate_detector.policy is DuplicatePolicy.OFF:
+            return email_data, []
+        with profiling.span("dedup"):
+            unique = []
+            duplicate_results = []
+            for position, row in enumerate(email_data["rows"]):
+                message = {
+                    "row": row,
+                    "body": BODY_PART_SEPARATOR.join(
+                        str(part) for part in email_data["bodies"][position]
+                    ),
+                    "subject": email_data["subjects"][position],
+                    "recipients": email_data["recipients"][position],
+                    "cc": email_data["cc"][position],
+                    "cco": email_data["cco"][position],
+                    "attachments": email_data["attachments"][position],
+                }
+                if duplicate_detector.should_send(message):
+                    unique.append(position)
+                else:
+                    duplicate_results.append(
+                        HomeController._duplicate_result(message, duplicate_detector)
+                    )
+        return HomeController._select_rows(email_data, unique), duplicate_results
 
-    async def _send_emails(
-        self, access_token: str, sender_email: str, email_data: Dict[str, list]
+    @staticmethod
+    def _duplicate_result(
+        message: Dict[str, Any], duplicate_detector: DuplicateDetector
+    ) -> Dict[str, Any]:
+        """
+        Builds the result of a dropped duplicate email.
+
+        Args:
+            message (Dict[str, Any]): The email.
+            duplicate_detector (DuplicateDetector): The duplicate detector.
+
+        Returns:
+            Dict[str, Any]: The result of the row.
+        """
+        return {
+            "row": message["row"],
+            "status": SendStatus.DUPLICATE.value,
+            "recipients": message["recipients"],
+            "sender": None,
+            "error": (
+                f"Duplicado da linha {duplicate_detector.duplicates[message['row']]}"
+            ),
+        }
+
+    @staticmethod
+    def _flag_duplicates(
+        results: List[Dict[str, Any]], duplicate_detector: DuplicateDetector
     ) -> None:
+        """
+        Notes in the results of the sent emails which ones repeated a previous row,
+        when the duplicate policy flags repeats instead of dropping them.
+
+        Args:
+            results (List[Dict[str, Any]]): The result of each sent row.
+            duplicate_detector (DuplicateDetector): The duplicate detector.
+        """
+        if not duplicate_detector.duplicates:
+            return
+        for result in results:
+            first_row = duplicate_detector.duplicates.get(result["row"])
+            if first_row is not None and result["error"] is None:
+                result["error"] = f"Duplicado da linha {first_row}"
+
+    async def _send_emails(
+        self,
+        access_token: str,
+        sender_email: str,
+        messages: AsyncIterator[Dict[str, Any]],
+        scheduler: Optional[SendScheduler],
+        job_share: Optional[JobShare] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Sends the formatted emails using the EmailSender.
 
         Args:
             access_token (str): The access token for authentication.
             sender_email (str): The email address of the sender.
-            email_data (Dict[str, list]): The formatted email data.
+            messages (AsyncIterator[Dict[str, Any]]): The formatted emails.
+            scheduler (Optional[SendScheduler]): The send scheduler.
+            job_share (Optional[JobShare]): The share of the campaign in the
+                concurrency budget of the job queue.
+
+        Returns:
+            List[Dict[str, Any]]: The result of each row.
         """
         email_sender = EmailSender(
-            access_token, self.settings.API_SCOPE, sender_email, self.settings
+            access_token,
+            self.settings.API_SCOPE,
+            sender_email,
+            self.settings,
+            self.session_manager,
+            scheduler,
+            job_share,
+            self.knobs,
+        )
+        return await email_sender.send_messages(messages)
+
+    async def _write_dry_run(
+        self,
+        file_path: str,
+        sender_email: str,
+        messages: AsyncIterator[Dict[str, Any]],
+        dry_run_format: DryRunFormat,
+    ) -> List[Dict[str, Any]]:
+        """
+        Renders the formatted emails through the full payload build path and writes
+        them to DATA_DIR/dry_run instead of sending them.
+
+        Args:
+            file_path (str): The path to the Excel file, naming the output directory.
+            sender_email (str): The email address of the sender.
+            messages (AsyncIterator[Dict[str, Any]]): The formatted emails.
+            dry_run_format (DryRunFormat): The format of the written emails.
+
+        Returns:
+            List[Dict[str, Any]]: The result of each row.
+        """
+        directory = os.path.join(
+            self.settings.DATA_DIR,
+            "dry_run",
+            f"{os.path.splitext(os.path.basename(file_path))[0]}-"
+            f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}",
+        )
+        writer = DryRunWriter(directory, dry_run_format)
+        try:
+            email_sender = DryRunEmailSender(
+                sender_email, self.settings, writer, self.session_manager
+            )
+            return await email_sender.send_messages(messages)
+        finally:
+            # Joining the writer thread waits for the buffered records to be
+            # written, which must not block the event loop
+            await asyncio.to_thread(writer.close)
+
+    async def _send_emails_sharded(
+        self, access_token: str, sender_email: str, email_data: Dict[str, list]
+    ) -> List[Dict[str, Any]]:
+        """
+        Shards the formatted emails across SEND_WORKERS worker processes.
+
+        Args:
+            access_token (str): The access token for authentication.
+            sender_email (str): The email address of the sender.
+            email_data (Dict[str, list]): The formatted email data.
+
+        Returns:
+            List[Dict[str, Any]]: The result of each row.
+        """
+        sharded_sender = ShardedEmailSender(
+            access_token,
+            self.settings.API_SCOPE,
+            sender_email,
+            self.settings,
+            self.settings.SEND_WORKERS,
         )
-        await email_sender.send_emails(
-            email_data["bodies"],
-            email_data["subjects"],
-            email_data["recipients"],
-            email_data["cc"],
-            email_data["cco"],
+        return await sharded_sender.send_emails(
+            email_data, progress_callback=self._update_progress
         )
 
-    def _close_excel(self) -> None:
+    def _update_progress(self, done: int, total: int) -> None:
+        """
+        Updates the status message with the sending progress.
+
+        Args:
+            done (int): The number of rows already processed.
+            total (int): The total number of rows.
+        """
+        self.status_message = f"Enviando emails: {done}/{total}"
+        logging.debug(self.status_message)
+
+    @staticmethod
+    def _summarize_results(results: List[Dict[str, Any]]) -> str:
         """
-        Closes the Excel file.
+        Builds the status message from the result of each row.
+
+        Args:
+            results (List[Dict[str, Any]]): The result of each row.
+
+        Returns:
+            str: The status message.
+        """
+        by_status = {
+            status: [result for result in results if result["status"] == status.value]
+            for status in SendStatus
+        }
+        failed = by_status[SendStatus.FAILED]
+        if len(by_status[SendStatus.SENT]) == len(results):
+            return "Emails enviados com sucesso"
+        for result in failed:
+            logging.error(f"Linha {result['row']}: {result['error']}")
+        message = f"{len(by_status[SendStatus.SENT])} emails enviados"
+        if failed:
+            message += (
+                f", {len(failed)} com falha "
+                f"(linhas {', '.join(str(result['row']) for result in failed[:10])})"
+            )
+        invalid = by_status[SendStatus.INVALID]
+        if invalid:
+            message += (
+                f", {len(invalid)} inválidos na pré-validação "
+                f"(linhas {', '.join(str(result['row']) for result in invalid[:10])})"
+            )
+        if by_status[SendStatus.DUPLICATE]:
+            message += (
+                f", {len(by_status[SendStatus.DUPLICATE])} duplicados descartados"
+            )
+        if by_status[SendStatus.SUPPRESSED]:
+            message += (
+                f", {len(by_status[SendStatus.SUPPRESSED])} sem destinatários fora da "
+                f"lista de supressão"
+            )
+        if by_status[SendStatus.DEFERRED]:
+            message += (
+                f", {len(by_status[SendStatus.DEFERRED])} adiados por falta de cota "
+                f"diária"
+            )
+        return message
+
+    async def close(self) -> None:
+        """
+        Releases the resources kept between campaigns, such as the HTTP session.
+        """
+        await self.session_manager.close()
+        self.executor.shutdown(wait=False)
+        self.job_queue.close()
+        self.suppression_list.close()
+        self.render_pool.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.runtime_config_watcher is not None:
+            self.runtime_config_watcher.stop()
+        if self.loop_monitor is not None:
+            self.loop_monitor.stop()
+
+    def _close_excel(self, file_path: Optional[str] = None) -> None:
+        """
+        Closes an Excel file.
+
+        Args:
+            file_path (Optional[str]): The path to the Excel file. Defaults to the
+                selected file.
         """
-        excel_processor = ExcelProcessor(self.selected_file, self.settings)
+        excel_processor = ExcelProcessor(file_path or self.selected_file, self.settings)
         excel_processor.close()
@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class DryRunFormat(Enum):
+    """
+    Enum representing how a dry run writes the emails it would send.
+    """
+
+    OFF = "off"
+    JSONL = "jsonl"
+    EML = "eml"
@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class DuplicatePolicy(Enum):
+    """
+    Enum representing what happens to an email identical to one of a previous row.
+    """
+
+    DROP = "drop"
+    FLAG = "flag"
+    OFF = "off"
@@ -10,4 +10,5 @@ class ExcelColumns(Enum):
     RECIPIENTS = "E-MAIL PARA (separar com ;)"
     CC = "E-MAIL CC (separar com ;)"
     CCO = "E-MAIL CCO (separar com ;)"
+    ATTACHMENTS = "ANEXOS (separar com ;)"
     BODY_PREFIX = "CORPO E-MAIL"
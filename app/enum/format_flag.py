@@ -0,0 +1,14 @@
+from enum import IntFlag
+
+
+class FormatFlag(IntFlag):
+    """
+    Enum representing the formats of an email body part as bits, so that the
+    formats of a body part are a single integer. The names match EmailFormatType.
+    """
+
+    NEGRITO = 1
+    ITALICO = 2
+    SUBLINHADO = 4
+    AUMENTAR_FONTE = 8
+    HYPERLINK = 16
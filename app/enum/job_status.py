@@ -0,0 +1,12 @@
+from enum import Enum
+
+
+class JobStatus(Enum):
+    """
+    Enum representing the state of a campaign in the job queue.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
@@ -0,0 +1,10 @@
+from enum import Enum
+
+
+class MailboxBalancingStrategy(Enum):
+    """
+    Enum representing how emails are distributed across the sender mailboxes.
+    """
+
+    LEAST_LOADED = "least_loaded"
+    WEIGHTED_ROUND_ROBIN = "weighted_round_robin"
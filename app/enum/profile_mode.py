@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class ProfileMode(Enum):
+    """
+    Enum representing how much of a campaign is profiled.
+    """
+
+    OFF = "off"
+    SPANS = "spans"
+    CAPTURE = "capture"
@@ -0,0 +1,10 @@
+from enum import Enum
+
+
+class RecipientMode(Enum):
+    """
+    Enum representing how the To addresses of a row are sent.
+    """
+
+    GROUPED = "grouped"
+    FAN_OUT = "fan_out"
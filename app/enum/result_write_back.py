@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class ResultWriteBack(Enum):
+    """
+    Enum representing where the result of each row is written after a campaign.
+    """
+
+    OFF = "off"
+    ANNOTATE = "annotate"
+    SIDECAR = "sidecar"
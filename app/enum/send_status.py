@@ -0,0 +1,14 @@
+from enum import Enum
+
+
+class SendStatus(Enum):
+    """
+    Enum representing the outcome of sending the email of a spreadsheet row.
+    """
+
+    SENT = "sent"
+    FAILED = "failed"
+    DEFERRED = "deferred"
+    INVALID = "invalid"
+    SUPPRESSED = "suppressed"
+    DUPLICATE = "duplicate"
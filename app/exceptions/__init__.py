@@ -6,10 +6,16 @@ from .authentication_exceptions import (
 from .configuration_exceptions import (
     EnvironmentVariableError,
     LoggingConfigurationError,
+    RuntimeKnobError,
+)
+from .email_exceptions import (
+    EmailSendError,
+    SendQuotaExceededError,
+    SenderConfigurationError,
 )
-from .email_exceptions import EmailSendError
 from .excel_exceptions import (
     ExcelReadError,
     ExcelWriteError,
+    UnsupportedFileFormatError,
 )
 from .main_exceptions import MainExecutionError
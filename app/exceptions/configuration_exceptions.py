@@ -8,3 +8,9 @@ class LoggingConfigurationError(Exception):
     """Exception raised for errors in configuring logging."""
 
     pass
+
+
+class RuntimeKnobError(Exception):
+    """Exception raised for invalid runtime tuning values."""
+
+    pass
@@ -2,3 +2,15 @@ class EmailSendError(Exception):
     """Exception raised when an error occurs while sending an email."""
 
     pass
+
+
+class SenderConfigurationError(Exception):
+    """Exception raised when the sender mailboxes are not configured correctly."""
+
+    pass
+
+
+class SendQuotaExceededError(Exception):
+    """Exception raised when no sender mailbox has daily quota left for an email."""
+
+    pass
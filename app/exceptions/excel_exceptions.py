@@ -8,3 +8,9 @@ class ExcelWriteError(Exception):
     """Exception raised for errors in writing the Excel file."""
 
     pass
+
+
+class UnsupportedFileFormatError(Exception):
+    """Exception raised when no reader handles the format of the input file."""
+
+    pass
@@ -0,0 +1,179 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.exceptions import EmailSendError
+
+
+class AttachmentCache:
+    """
+    A content-addressed cache of base64-encoded attachments, so a file attached to
+    every row of a campaign is read and encoded only once.
+
+    Entries are keyed by the SHA-256 of the file content, so the same file under
+    several paths is stored once, and the least recently used entries are evicted
+    when the memory budget is exceeded. Each path remembers the modification time
+    and size it was hashed at, so a changed file is read again.
+
+    Reading, hashing and encoding a file block, so get_encoded_async runs them in a
+    thread and only cache hits are served on the event loop.
+
+    Attributes:
+        max_bytes (int): The memory budget for the encoded attachments, in bytes.
+        size (int): The memory currently used by the encoded attachments, in bytes.
+        hits (int): The number of lookups served from the cache.
+        misses (int): The number of lookups that had to read and encode the file.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        """
+        Initializes the AttachmentCache instance with its memory budget.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._paths: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    async def get_encoded_async(self, path: str) -> bytes:
+        """
+        Returns the base64 encoding of a file like get_encoded, reading and encoding
+        it in a thread when it is not cached.
+
+        Args:
+            path (str): The attachment file path.
+
+        Returns:
+            bytes: The base64-encoded file content, which callers must not modify.
+
+        Raises:
+            EmailSendError: If the file cannot be read.
+        """
+        encoded = self.lookup(path)
+        if encoded is None:
+            encoded = await asyncio.to_thread(self.get_encoded, path)
+        return encoded
+
+    def lookup(self, path: str) -> Optional[bytes]:
+        """
+        Returns the cached encoding of a file, if the file has not changed since it
+        was cached.
+
+        Args:
+            path (str): The attachment file path.
+
+        Returns:
+            Optional[bytes]: The base64-encoded file content, or None if it is not
+            cached.
+
+        Raises:
+            EmailSendError: If the file is not available.
+        """
+        stat = self._stat(path)
+        with self._lock:
+            known = self._paths.get(path)
+            if known is None or known[:2] != (stat.st_mtime_ns, stat.st_size):
+                return None
+            encoded = self._entries.get(known[2])
+            if encoded is not None:
+                self._entries.move_to_end(known[2])
+                self.hits += 1
+            return encoded
+
+    def get_encoded(self, path: str) -> bytes:
+        """
+        Returns the base64 encoding of a file, reading and encoding it only if it is
+        not cached yet or has changed since it was cached. This blocks, so it is
+        only called from threads.
+
+        Args:
+            path (str): The attachment file path.
+
+        Returns:
+            bytes: The base64-encoded file content. The same object is returned for
+            every lookup of the same content, so callers must not modify it.
+
+        Raises:
+            EmailSendError: If the file cannot be read.
+        """
+        encoded = self.lookup(path)
+        if encoded is not None:
+            return encoded
+        stat = self._stat(path)
+        try:
+            with open(path, "rb") as file:
+                content = file.read()
+        except OSError as e:
+            raise EmailSendError(f"Attachment {path} is not available: {e}")
+
+        key = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            self._paths[path] = (stat.st_mtime_ns, stat.st_size, key)
+            encoded = self._entries.get(key)
+            if encoded is not None:
+                # Same content already cached, under this or another path
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return encoded
+
+        encoded = base64.b64encode(content)
+        with self._lock:
+            self.misses += 1
+            self._store(key, encoded)
+        return encoded
+
+    def clear(self) -> None:
+        """
+        Removes every cached attachment.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._paths.clear()
+            self.size = 0
+
+    @staticmethod
+    def _stat(path: str) -> os.stat_result:
+        """
+        Returns the status of an attachment file.
+
+        Args:
+            path (str): The attachment file path.
+
+        Returns:
+            os.stat_result: The status of the file.
+
+        Raises:
+            EmailSendError: If the file is not available.
+        """
+        try:
+            return os.stat(path)
+        except OSError as e:
+            raise EmailSendError(f"Attachment {path} is not available: {e}")
+
+    def _store(self, key: str, encoded: bytes) -> None:
+        """
+        Adds an encoded attachment, evicting the least recently used ones to stay
+        within the memory budget. Attachments larger than the whole budget are not
+        cached.
+
+        Args:
+            key (str): The content hash.
+            encoded (bytes): The base64-encoded content.
+        """
+        if len(encoded) > self.max_bytes:
+            logging.debug(f"Attachment {key} is larger than the cache budget")
+            return
+        if key in self._entries:
+            return
+        while self._entries and self.size + len(encoded) > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+        self._entries[key] = encoded
+        self.size += len(encoded)
@@ -0,0 +1,355 @@
+import logging
+import mimetypes
+import mmap
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+from app.config.settings import Settings
+from app.exceptions import EmailSendError
+from app.services.attachment_cache import AttachmentCache
+from app.services.inline_images import content_id
+from app.services.json_payload import blob_reference, encode_json
+from app.services.mailbox_pool import THROTTLING_STATUSES, get_retry_after
+
+# Graph requires upload session chunks to be a multiple of 320 KiB
+UPLOAD_CHUNK_MULTIPLE = 320 * 1024
+
+
+class _Throttled(Exception):
+    """Raised internally when Graph throttles one of the upload session requests."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Throttled for {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AttachmentUploader:
+    """
+    Sends emails with attachments too large for a single sendMail request, using the
+    create draft, createUploadSession and send flow of the Graph API.
+
+    Large files are uploaded in fixed-size chunks read from a memory-mapped file, so
+    the memory used per message does not depend on the attachment size.
+
+    Attributes:
+        settings (Settings): The application settings.
+        cache (AttachmentCache): The cache of base64-encoded attachments.
+        chunk_size (int): The size of each uploaded chunk, in bytes.
+    """
+
+    def __init__(self, settings: Settings, cache: AttachmentCache) -> None:
+        """
+        Initializes the AttachmentUploader instance with settings and the attachment
+        cache.
+        """
+        self.settings = settings
+        self.cache = cache
+        self.chunk_size = max(
+            UPLOAD_CHUNK_MULTIPLE,
+            settings.ATTACHMENT_UPLOAD_CHUNK_SIZE
+            // UPLOAD_CHUNK_MULTIPLE
+            * UPLOAD_CHUNK_MULTIPLE,
+        )
+
+    def fits_inline(
+        self, paths: List[str], body: str, inline_images: Sequence[str] = ()
+    ) -> bool:
+        """
+        Checks if the attachments can be sent inline in the sendMail request.
+
+        Args:
+            paths (List[str]): The attachment file paths.
+            body (str): The email body.
+            inline_images (Sequence[str]): The paths of the images embedded in the body.
+
+        Returns:
+            bool: True if the base64-encoded attachments and the body fit within
+            ATTACHMENT_INLINE_LIMIT, False otherwise.
+        """
+        encoded_size = (
+            sum(
+                self.get_size(path)
+                for path, _ in self._iter_files(paths, inline_images)
+            )
+            * 4
+            // 3
+        )
+        return encoded_size + len(body) <= self.settings.ATTACHMENT_INLINE_LIMIT
+
+    @staticmethod
+    def get_size(path: str) -> int:
+        """
+        Returns the size of an attachment file.
+
+        Args:
+            path (str): The attachment file path.
+
+        Returns:
+            int: The file size in bytes.
+
+        Raises:
+            EmailSendError: If the file does not exist or cannot be read.
+        """
+        try:
+            return os.path.getsize(path)
+        except OSError as e:
+            raise EmailSendError(f"Attachment {path} is not available: {e}")
+
+    async def build_attachments(
+        self, paths: List[str], inline_images: Sequence[str] = ()
+    ) -> Tuple[List[Dict[str, Any]], List[bytes]]:
+        """
+        Builds the Graph fileAttachment resources for a list of files. The content of
+        each resource is a blob placeholder referencing the cached base64 encoding,
+        to be spliced in by encode_json. Files that are not cached are read and
+        encoded in a thread.
+
+        Args:
+            paths (List[str]): The attachment file paths.
+            inline_images (Sequence[str]): The paths of the images embedded in the
+                body, attached as inline attachments with their Content-ID.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], List[bytes]]: The fileAttachment resources
+            and the encoded contents they reference.
+
+        Raises:
+            EmailSendError: If a file cannot be read.
+        """
+        resources = []
+        blobs = []
+        for path, inline in self._iter_files(paths, inline_images):
+            resource = {
+                "@odata.type": "#microsoft.graph.fileAttachment",
+                "name": os.path.basename(path),
+                "contentType": self._get_content_type(path),
+                "contentBytes": blob_reference(len(blobs)),
+            }
+            if inline:
+                resource["isInline"] = True
+                resource["contentId"] = content_id(path)
+            resources.append(resource)
+            blobs.append(await self.cache.get_encoded_async(path))
+        return resources, blobs
+
+    @staticmethod
+    def _iter_files(
+        paths: List[str], inline_images: Sequence[str]
+    ) -> List[Tuple[str, bool]]:
+        """
+        Lists the files to attach, each inline image only once even if the body
+        references it several times.
+
+        Args:
+            paths (List[str]): The attachment file paths.
+            inline_images (Sequence[str]): The paths of the images embedded in the body.
+
+        Returns:
+            List[Tuple[str, bool]]: Each file path and whether it is an inline image.
+        """
+        return [(path, False) for path in paths] + [
+            (path, True) for path in dict.fromkeys(inline_images)
+        ]
+
+    async def send_with_upload_session(
+        self,
+        session: aiohttp.ClientSession,
+        mailbox: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        paths: List[str],
+        inline_images: Sequence[str] = (),
+    ) -> Optional[float]:
+        """
+        Creates a draft, attaches the files and sends it. Files that fit within
+        ATTACHMENT_INLINE_LIMIT are attached with a single request; larger ones go
+        through an upload session.
+
+        Drafts are always saved to Sent Items once sent, regardless of
+        SAVE_TO_SENT_ITEMS.
+
+        Args:
+            session (aiohttp.ClientSession): The aiohttp client session.
+            mailbox (str): The address of the sender mailbox.
+            headers (Dict[str, str]): The authenticated request headers.
+            payload (Dict[str, Any]): The sendMail payload of the email.
+            paths (List[str]): The attachment file paths.
+            inline_images (Sequence[str]): The paths of the images embedded in the body.
+
+        Returns:
+            Optional[float]: None if the email was sent, or the number of seconds to
+            wait if Graph throttled the mailbox.
+
+        Raises:
+            EmailSendError: If Graph rejects one of the requests.
+        """
+        messages_url = f"{self.settings.GRAPH_API_URL}/users/{mailbox}/messages"
+        message_id = None
+        try:
+            async with session.post(
+                messages_url, headers=headers, json=payload["message"]
+            ) as response:
+                self._check(response)
+                message_id = (await response.json())["id"]
+            message_url = f"{messages_url}/{message_id}"
+            for path, inline in self._iter_files(paths, inline_images):
+                if (
+                    self.get_size(path) * 4 // 3
+                    <= self.settings.ATTACHMENT_INLINE_LIMIT
+                ):
+                    await self._add_attachment(
+                        session, message_url, headers, path, inline
+                    )
+                else:
+                    await self._upload_attachment(
+                        session, message_url, headers, path, inline
+                    )
+            async with session.post(f"{message_url}/send", headers=headers) as response:
+                self._check(response)
+            return None
+        except _Throttled as e:
+            if message_id:
+                await self._delete_draft(
+                    session, f"{messages_url}/{message_id}", headers
+                )
+            return e.retry_after
+        except Exception:
+            if message_id:
+                await self._delete_draft(
+                    session, f"{messages_url}/{message_id}", headers
+                )
+            raise
+
+    async def _add_attachment(
+        self,
+        session: aiohttp.ClientSession,
+        message_url: str,
+        headers: Dict[str, str],
+        path: str,
+        inline: bool,
+    ) -> None:
+        """
+        Attaches a small file to a draft with a single request.
+
+        Args:
+            session (aiohttp.ClientSession): The aiohttp client session.
+            message_url (str): The URL of the draft message.
+            headers (Dict[str, str]): The authenticated request headers.
+            path (str): The attachment file path.
+            inline (bool): Whether the file is an image embedded in the body.
+        """
+        if inline:
+            resources, blobs = await self.build_attachments([], [path])
+        else:
+            resources, blobs = await self.build_attachments([path])
+        async with session.post(
+            f"{message_url}/attachments",
+            headers=headers,
+            data=encode_json(resources[0], blobs),
+        ) as response:
+            self._check(response)
+
+    async def _upload_attachment(
+        self,
+        session: aiohttp.ClientSession,
+        message_url: str,
+        headers: Dict[str, str],
+        path: str,
+        inline: bool,
+    ) -> None:
+        """
+        Uploads a large file to a draft through an upload session, one chunk at a
+        time, reading the chunks from a memory-mapped file.
+
+        Args:
+            session (aiohttp.ClientSession): The aiohttp client session.
+            message_url (str): The URL of the draft message.
+            headers (Dict[str, str]): The authenticated request headers.
+            path (str): The attachment file path.
+            inline (bool): Whether the file is an image embedded in the body.
+        """
+        size = self.get_size(path)
+        attachment_item = {
+            "AttachmentItem": {
+                "attachmentType": "file",
+                "name": os.path.basename(path),
+                "size": size,
+                "contentType": self._get_content_type(path),
+            }
+        }
+        if inline:
+            attachment_item["AttachmentItem"]["isInline"] = True
+            attachment_item["AttachmentItem"]["contentId"] = content_id(path)
+        async with session.post(
+            f"{message_url}/attachments/createUploadSession",
+            headers=headers,
+            json=attachment_item,
+        ) as response:
+            self._check(response)
+            upload_url = (await response.json())["uploadUrl"]
+
+        logging.info(f"Uploading {path} ({size} bytes) in chunks of {self.chunk_size}")
+        with open(path, "rb") as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            for start in range(0, size, self.chunk_size):
+                end = min(start + self.chunk_size, size)
+                # The upload URL is pre-authenticated and rejects an Authorization
+                # header
+                chunk_headers = {
+                    "Content-Length": str(end - start),
+                    "Content-Range": f"bytes {start}-{end - 1}/{size}",
+                }
+                with memoryview(mapped)[start:end] as chunk:
+                    async with session.put(
+                        upload_url, headers=chunk_headers, data=chunk
+                    ) as response:
+                        self._check(response)
+
+    async def _delete_draft(
+        self, session: aiohttp.ClientSession, message_url: str, headers: Dict[str, str]
+    ) -> None:
+        """
+        Deletes a draft left behind by a failed send, ignoring errors.
+
+        Args:
+            session (aiohttp.ClientSession): The aiohttp client session.
+            message_url (str): The URL of the draft message.
+            headers (Dict[str, str]): The authenticated request headers.
+        """
+        try:
+            async with session.delete(message_url, headers=headers):
+                pass
+        except aiohttp.ClientError as e:
+            logging.warning(f"Could not delete draft {message_url}: {e}")
+
+    @staticmethod
+    def _check(response: aiohttp.ClientResponse) -> None:
+        """
+        Checks the response of one of the upload session requests.
+
+        Args:
+            response (aiohttp.ClientResponse): The response to check.
+
+        Raises:
+            _Throttled: If Graph throttled the mailbox.
+            aiohttp.ClientResponseError: If the request failed.
+        """
+        if response.status in THROTTLING_STATUSES:
+            raise _Throttled(get_retry_after(response))
+        response.raise_for_status()
+
+    @staticmethod
+    def _get_content_type(path: str) -> str:
+        """
+        Guesses the content type of an attachment from its extension.
+
+        Args:
+            path (str): The attachment file path.
+
+        Returns:
+            str: The content type.
+        """
+        return mimetypes.guess_type(path)[0] or "application/octet-stream"
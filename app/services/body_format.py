@@ -0,0 +1,187 @@
+import html
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.settings import Settings
+from app.enum.email_format_type import EmailFormatType
+from app.enum.format_flag import FormatFlag
+
+BODY_COLUMN_PREFIX = "CORPO E-MAIL "
+# Tags of the inline formats, from the innermost to the outermost
+INLINE_TAGS = [
+    (FormatFlag.NEGRITO, "<b>", "</b>"),
+    (FormatFlag.ITALICO, "<i>", "</i>"),
+    (FormatFlag.SUBLINHADO, "<u>", "</u>"),
+    (FormatFlag.HYPERLINK, '<a href="{href}">', "</a>"),
+]
+# Number of flag combinations, i.e. of entries in the tag table
+FLAG_COMBINATIONS = 1 << len(FormatFlag)
+
+TagPair = Tuple[str, str]
+
+
+def format_flags(format_info: Dict[str, Any]) -> FormatFlag:
+    """
+    Converts the format information of a body part into its flags. Formats that
+    were toggled off are ignored.
+
+    Args:
+        format_info (Dict[str, Any]): The "formats", "hyperlink" and
+            "line_breaks" of the body part.
+
+    Returns:
+        FormatFlag: The formats of the body part.
+    """
+    formats = format_info.get("formats", {})
+    flags = FormatFlag(0)
+    for format_type in EmailFormatType:
+        if formats.get(format_type.value):
+            flags |= FormatFlag[format_type.name]
+    if format_info.get("hyperlink"):
+        flags |= FormatFlag.HYPERLINK
+    return flags
+
+
+@lru_cache(maxsize=None)
+def tag_table(default_font_size: float, font_size_increment: float) -> List[TagPair]:
+    """
+    Builds the opening and closing tags of every flag combination, indexed by the
+    integer value of the flags. The opening tag of the combinations with
+    FormatFlag.HYPERLINK holds an {href} placeholder.
+
+    Args:
+        default_font_size (float): The font size of the body parts, in em.
+        font_size_increment (float): The increment of FormatFlag.AUMENTAR_FONTE.
+
+    Returns:
+        List[TagPair]: The tags of each flag combination.
+    """
+    table = []
+    for flags in range(FLAG_COMBINATIONS):
+        font_size = default_font_size
+        if flags & FormatFlag.AUMENTAR_FONTE:
+            font_size += font_size_increment
+        opening, closing = "", ""
+        for flag, open_tag, close_tag in INLINE_TAGS:
+            if flags & flag:
+                opening = open_tag + opening
+                closing += close_tag
+        table.append(
+            (f"<span style='font-size: {font_size}em;'>{opening}", f"{closing}</span>")
+        )
+    return table
+
+
+class BodyFormatPlan:
+    """
+    The formats of the body parts of a campaign, compiled once and applied to every
+    row. Each body column is reduced to its flags and line breaks, and its tags are
+    taken from the shared tag table, so formatting a body part is a table lookup
+    and two concatenations. The send and the preview of the UI both render through
+    it.
+
+    Attributes:
+        formats (Dict[str, Dict[str, Any]]): The format information of each body
+            column.
+        table (List[TagPair]): The tags of each flag combination.
+    """
+
+    def __init__(self, settings: Settings, formats: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Initializes the BodyFormatPlan instance with the settings and the formats.
+        """
+        self.formats = formats
+        self.table = tag_table(settings.DEFAULT_FONT_SIZE, settings.FONT_SIZE_INCREMENT)
+        self._parts: List[Tuple[FormatFlag, str, str, str]] = []
+        self._columns: Dict[str, Tuple[FormatFlag, str, str, str]] = {}
+
+    def render(self, column: str, text: str, href: Optional[str] = None) -> str:
+        """
+        Formats the text of a body column.
+
+        Args:
+            column (str): The name of the body column.
+            text (str): The text of the body part, already converted to HTML.
+            href (Optional[str]): The link target of hyperlink columns; defaults to
+                the text.
+
+        Returns:
+            str: The formatted body part, followed by its line breaks.
+        """
+        entry = self._columns.get(column)
+        if entry is None:
+            entry = self._columns[column] = self._compile(column)
+        return self._apply(entry, text, href)
+
+    def render_part(self, index: int, text: str, href: Optional[str] = None) -> str:
+        """
+        Formats the text of the body part at an index, i.e. of the body column
+        CORPO E-MAIL <index + 1>.
+
+        Args:
+            index (int): The position of the body part in the row.
+            text (str): The text of the body part, already converted to HTML.
+            href (Optional[str]): The link target of hyperlink columns; defaults to
+                the text.
+
+        Returns:
+            str: The formatted body part, followed by its line breaks.
+        """
+        while len(self._parts) <= index:
+            self._parts.append(
+                self._compile(f"{BODY_COLUMN_PREFIX}{len(self._parts) + 1}")
+            )
+        return self._apply(self._parts[index], text, href)
+
+    def flags(self, column: str) -> FormatFlag:
+        """
+        Returns the flags of a body column.
+
+        Args:
+            column (str): The name of the body column.
+
+        Returns:
+            FormatFlag: The formats of the body column.
+        """
+        return format_flags(self.formats.get(column, {}))
+
+    def _compile(self, column: str) -> Tuple[FormatFlag, str, str, str]:
+        """
+        Looks up the tags of a body column.
+
+        Args:
+            column (str): The name of the body column.
+
+        Returns:
+            Tuple[FormatFlag, str, str, str]: The flags, opening tag, closing tag
+            and line breaks of the body column.
+        """
+        format_info = self.formats.get(column, {})
+        flags = format_flags(format_info)
+        opening, closing = self.table[flags]
+        return flags, opening, closing, "<br>" * format_info.get("line_breaks", 0)
+
+    @staticmethod
+    def _apply(
+        entry: Tuple[FormatFlag, str, str, str], text: str, href: Optional[str]
+    ) -> str:
+        """
+        Wraps a text in the tags of a compiled body column.
+
+        Args:
+            entry (Tuple[FormatFlag, str, str, str]): The compiled body column.
+            text (str): The text of the body part.
+            href (Optional[str]): The link target of hyperlink columns, escaped
+                before being written.
+
+        Returns:
+            str: The formatted body part, followed by its line breaks.
+        """
+        flags, opening, closing, line_breaks = entry
+        if flags & FormatFlag.HYPERLINK:
+            # The link target comes from the spreadsheet, so it is escaped to stay
+            # inside the attribute
+            opening = opening.format(
+                href=html.escape(text if href is None else href, quote=True)
+            )
+        return f"{opening}{text}{closing}{line_breaks}"
@@ -0,0 +1,194 @@
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.enum.duplicate_policy import DuplicatePolicy
+
+# Fingerprint 0 marks an empty slot of the index
+EMPTY_SLOT = 0
+# The table is grown once it is more than half full, keeping probes short
+MAX_LOAD_FACTOR = 0.5
+FINGERPRINT_FIELDS = ("subject", "body", "attachments")
+# Joins the body parts of a row before fingerprinting; spreadsheet text cannot
+# hold NUL characters, so parts never run into each other
+BODY_PART_SEPARATOR = "\x00"
+
+
+def _normalize_addresses(*fields: str) -> str:
+    """
+    Normalizes recipient fields so the same set of addresses always gives the same
+    text, regardless of order, case, spacing or repeats.
+
+    Args:
+        *fields (str): The recipient fields, separated by ';'.
+
+    Returns:
+        str: The normalized addresses of each field.
+    """
+    return "|".join(
+        ";".join(
+            sorted(
+                {
+                    address.strip().lower()
+                    for address in (field or "").split(";")
+                    if address.strip() and address.strip().lower() != "nan"
+                }
+            )
+        )
+        for field in fields
+    )
+
+
+def fingerprint(message: Dict[str, Any]) -> int:
+    """
+    Computes the 64-bit fingerprint of an email: its normalized recipients and its
+    content.
+
+    Args:
+        message (Dict[str, Any]): The email.
+
+    Returns:
+        int: The fingerprint, never EMPTY_SLOT.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(
+        _normalize_addresses(
+            message["recipients"], message["cc"], message["cco"]
+        ).encode("utf-8")
+    )
+    for field in FINGERPRINT_FIELDS:
+        digest.update(b"\0")
+        digest.update(str(message.get(field) or "").encode("utf-8"))
+    for image in sorted(message.get("inline_images") or ()):
+        digest.update(b"\0")
+        digest.update(image.encode("utf-8"))
+    return int.from_bytes(digest.digest(), "little") or 1
+
+
+class FingerprintIndex:
+    """
+    An open-addressing hash table of email fingerprints, mapping each one to the
+    row that first produced it.
+
+    Slots are two fixed-width numpy arrays, so the index takes at most 32 bytes per
+    row however large the campaign is.
+
+    Attributes:
+        count (int): The number of fingerprints in the index.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        """
+        Initializes the FingerprintIndex instance sized for the expected rows.
+        """
+        self.count = 0
+        self._allocate(capacity)
+
+    def add(self, fingerprint: int, row: int) -> Optional[int]:
+        """
+        Adds a fingerprint, unless it is already in the index.
+
+        Args:
+            fingerprint (int): The fingerprint of the email.
+            row (int): The row of the email.
+
+        Returns:
+            Optional[int]: The row that first produced the fingerprint, or None if
+            it is new.
+        """
+        slot = self._find_slot(fingerprint)
+        if int(self._keys[slot]) == fingerprint:
+            return int(self._rows[slot])
+        self._keys[slot] = fingerprint
+        self._rows[slot] = row
+        self.count += 1
+        if self.count > len(self._keys) * MAX_LOAD_FACTOR:
+            self._grow()
+        return None
+
+    def _find_slot(self, fingerprint: int) -> int:
+        """
+        Finds the slot holding a fingerprint, or the empty slot where it belongs.
+
+        Args:
+            fingerprint (int): The fingerprint.
+
+        Returns:
+            int: The slot position.
+        """
+        mask = len(self._keys) - 1
+        slot = fingerprint & mask
+        while True:
+            key = int(self._keys[slot])
+            if key == EMPTY_SLOT or key == fingerprint:
+                return slot
+            slot = (slot + 1) & mask
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Allocates empty slots for a number of fingerprints.
+
+        Args:
+            capacity (int): The number of fingerprints to hold.
+        """
+        size = 16
+        while size * MAX_LOAD_FACTOR < capacity:
+            size *= 2
+        self._keys = np.zeros(size, dtype=np.uint64)
+        self._rows = np.zeros(size, dtype=np.int64)
+
+    def _grow(self) -> None:
+        """
+        Doubles the number of slots and reinserts the fingerprints.
+        """
+        keys, rows = self._keys, self._rows
+        used = keys != EMPTY_SLOT
+        self._allocate(len(keys))
+        for key, row in zip(keys[used].tolist(), rows[used].tolist()):
+            slot = self._find_slot(key)
+            self._keys[slot] = key
+            self._rows[slot] = row
+
+
+class DuplicateDetector:
+    """
+    Applies a DuplicatePolicy to the emails of a campaign, in row order.
+
+    Attributes:
+        policy (DuplicatePolicy): What happens to repeated emails.
+        index (FingerprintIndex): The fingerprints of the emails seen so far.
+        duplicates (Dict[int, int]): The row of each repeated email mapped to the
+            row of its first occurrence.
+    """
+
+    def __init__(self, policy: DuplicatePolicy, capacity: int = 1024) -> None:
+        """
+        Initializes the DuplicateDetector instance sized for the campaign rows.
+        """
+        self.policy = policy
+        self.index = FingerprintIndex(capacity)
+        self.duplicates: Dict[int, int] = {}
+
+    def should_send(self, message: Dict[str, Any]) -> bool:
+        """
+        Records an email and decides if it is sent.
+
+        Args:
+            message (Dict[str, Any]): The email.
+
+        Returns:
+            bool: False if the email repeats a previous one and the policy drops
+            repeats, True otherwise.
+        """
+        if self.policy is DuplicatePolicy.OFF:
+            return True
+        first_row = self.index.add(fingerprint(message), message["row"])
+        if first_row is None:
+            return True
+        self.duplicates[message["row"]] = first_row
+        logging.warning(
+            f"Linha {message['row']}: email idêntico ao da linha {first_row}"
+        )
+        return self.policy is DuplicatePolicy.FLAG
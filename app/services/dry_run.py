@@ -0,0 +1,400 @@
+import asyncio
+import base64
+import contextvars
+import json
+import logging
+import mimetypes
+import os
+import queue
+import threading
+from email.message import EmailMessage
+from email.policy import SMTP
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiohttp
+
+from app.config.settings import Settings
+from app.enum.dry_run_format import DryRunFormat
+from app.enum.email_recipient_type import EmailRecipientType
+from app.services.attachment_cache import AttachmentCache
+from app.services import metrics
+from app.services.attachment_uploader import AttachmentUploader
+from app.services.http_session import HttpSessionManager
+from app.services.inline_images import content_id
+from app.services.json_payload import encode_json_pieces
+from app.services.send_email import EmailSender
+
+# Size of the write buffer of the output files
+WRITE_BUFFER_BYTES = 1024 * 1024
+# Number of emails the writer thread may lag behind the event loop
+WRITE_QUEUE_SIZE = 10_000
+JSONL_FILE_NAME = "payloads.jsonl"
+
+# Spreadsheet row of the email being rendered by the current consumer task
+_current_row: contextvars.ContextVar[int] = contextvars.ContextVar("dry_run_row")
+# Position of the To address of a fanned-out email in its row
+_current_copy: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "dry_run_copy", default=None
+)
+
+
+class DryRunWriter:
+    """
+    Writes the emails of a dry run to disk from a background thread, so rendering
+    on the event loop never waits for the disk unless the thread falls
+    WRITE_QUEUE_SIZE emails behind.
+
+    In JSONL format, each line of payloads.jsonl holds the row, the sender mailbox,
+    the files that would go through an upload session and the exact sendMail
+    payload. In EML format, each email is written as row_<row>.eml, or
+    row_<row>_<copy>.eml for the copies of a fanned-out row.
+
+    Attributes:
+        directory (str): The directory the emails are written to.
+        output_format (DryRunFormat): The format of the written emails.
+        written (int): The number of emails written so far.
+    """
+
+    def __init__(self, directory: str, output_format: DryRunFormat) -> None:
+        """
+        Initializes the DryRunWriter instance and starts its thread.
+        """
+        self.directory = directory
+        self.output_format = output_format
+        self.written = 0
+        os.makedirs(directory, exist_ok=True)
+        self._queue: queue.Queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._error: Optional[BaseException] = None
+        self._jsonl = None
+        if output_format is DryRunFormat.JSONL:
+            self._jsonl = open(
+                os.path.join(directory, JSONL_FILE_NAME),
+                "wb",
+                buffering=WRITE_BUFFER_BYTES,
+            )
+        self._thread = threading.Thread(
+            target=self._run, name="dry-run-writer", daemon=True
+        )
+        self._thread.start()
+
+    async def write(self, record: Dict[str, Any]) -> None:
+        """
+        Hands an email to the writer thread.
+
+        Args:
+            record (Dict[str, Any]): The email, with the keys "row", "copy",
+                "sender", "payload", "blobs" and "uploads".
+
+        Raises:
+            OSError: If the writer thread failed to write a previous email.
+        """
+        if self._error is not None:
+            raise self._error
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, record)
+
+    def close(self) -> None:
+        """
+        Waits for the pending emails to be written and closes the output files.
+
+        Raises:
+            OSError: If the writer thread failed to write an email.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        if self._jsonl is not None:
+            self._jsonl.close()
+        if self._error is not None:
+            raise self._error
+        logging.info(f"Simulação: {self.written} emails gravados em {self.directory}")
+
+    def _run(self) -> None:
+        """
+        Writes the queued emails until close is called. After a failure, the
+        remaining emails are drained without being written.
+        """
+        while (record := self._queue.get()) is not None:
+            if self._error is not None:
+                continue
+            try:
+                if self.output_format is DryRunFormat.JSONL:
+                    self._write_jsonl(record)
+                else:
+                    self._write_eml(record)
+                self.written += 1
+            except Exception as e:
+                logging.error(f"Erro ao gravar a simulação: {e}")
+                self._error = e
+
+    def _write_jsonl(self, record: Dict[str, Any]) -> None:
+        """
+        Appends an email to payloads.jsonl, splicing the encoded attachments into
+        the payload without copying them.
+
+        Args:
+            record (Dict[str, Any]): The email.
+        """
+        header = json.dumps(
+            {
+                "row": record["row"],
+                "copy": record["copy"],
+                "sender": record["sender"],
+                "uploads": record["uploads"],
+            }
+        ).encode("utf-8")
+        self._jsonl.write(header[:-1] + b', "payload": ')
+        for piece in encode_json_pieces(record["payload"], record["blobs"]):
+            self._jsonl.write(piece)
+        self._jsonl.write(b"}\n")
+
+    def _write_eml(self, record: Dict[str, Any]) -> None:
+        """
+        Writes an email as a MIME message file.
+
+        Args:
+            record (Dict[str, Any]): The email.
+        """
+        message = record["payload"]["message"]
+        email = EmailMessage()
+        email["From"] = record["sender"]
+        for header, field in (
+            ("To", EmailRecipientType.TO),
+            ("Cc", EmailRecipientType.CC),
+            ("Bcc", EmailRecipientType.BCC),
+        ):
+            addresses = [
+                recipient["emailAddress"]["address"]
+                for recipient in message.get(field.value, [])
+            ]
+            if addresses:
+                email[header] = ", ".join(addresses)
+        email["Subject"] = message["subject"]
+        body = message["body"]["content"]
+        if body.startswith("\x00blob:"):
+            # The body of a fanned-out email is a blob of JSON string contents
+            body = json.loads(b'"' + record["blobs"][self._blob_index(body)] + b'"')
+        email.set_content(body, subtype="html")
+
+        parts = []
+        for attachment in message.get("attachments", []):
+            # The content is a blob placeholder; its blob holds the base64 bytes
+            blob = record["blobs"][self._blob_index(attachment["contentBytes"])]
+            parts.append(
+                (
+                    base64.b64decode(blob),
+                    attachment["name"],
+                    attachment["contentType"],
+                    attachment.get("contentId") if attachment.get("isInline") else None,
+                )
+            )
+        for upload in record["uploads"]:
+            with open(upload["path"], "rb") as file:
+                data = file.read()
+            parts.append(
+                (
+                    data,
+                    os.path.basename(upload["path"]),
+                    mimetypes.guess_type(upload["path"])[0]
+                    or "application/octet-stream",
+                    upload["content_id"],
+                )
+            )
+        # Inline images go first: once the message holds a regular attachment it
+        # can no longer take related parts
+        for data, name, content_type, cid in sorted(
+            parts, key=lambda part: part[3] is None
+        ):
+            self._attach(email, data, name, content_type, cid)
+
+        name = f"row_{record['row']}"
+        if record["copy"] is not None:
+            name += f"_{record['copy']}"
+        path = os.path.join(self.directory, f"{name}.eml")
+        with open(path, "wb") as file:
+            file.write(email.as_bytes(policy=SMTP))
+
+    @staticmethod
+    def _blob_index(reference: str) -> int:
+        """
+        Reads the blob index of a blob placeholder.
+
+        Args:
+            reference (str): The placeholder, from blob_reference.
+
+        Returns:
+            int: The position of the blob.
+        """
+        return int(reference.strip("\x00").split(":", 1)[1])
+
+    @staticmethod
+    def _attach(
+        email: EmailMessage,
+        data: bytes,
+        name: str,
+        content_type: str,
+        cid: Optional[str],
+    ) -> None:
+        """
+        Attaches a file to a MIME message, as a related part referenced by the HTML
+        body when it has a Content-ID.
+
+        Args:
+            email (EmailMessage): The message.
+            data (bytes): The content of the file.
+            name (str): The file name.
+            content_type (str): The MIME type of the file.
+            cid (Optional[str]): The Content-ID of an inline image.
+        """
+        maintype, subtype = content_type.split("/", 1)
+        if cid:
+            email.add_related(data, maintype, subtype, cid=f"<{cid}>", filename=name)
+        else:
+            email.add_attachment(data, maintype, subtype, filename=name)
+
+
+class _DryRunUploader(AttachmentUploader):
+    """
+    Records the emails whose attachments would go through an upload session instead
+    of creating drafts in Graph.
+    """
+
+    def __init__(
+        self, settings: Settings, cache: AttachmentCache, writer: DryRunWriter
+    ) -> None:
+        """
+        Initializes the _DryRunUploader instance with the dry run writer.
+        """
+        super().__init__(settings, cache)
+        self.writer = writer
+
+    async def send_with_upload_session(
+        self,
+        session: aiohttp.ClientSession,
+        mailbox: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        paths: List[str],
+        inline_images: Sequence[str] = (),
+    ) -> Optional[float]:
+        """
+        Writes the email with the files it would upload.
+
+        Args:
+            session (aiohttp.ClientSession): Unused.
+            mailbox (str): The address of the sender mailbox.
+            headers (Dict[str, str]): Unused.
+            payload (Dict[str, Any]): The sendMail payload of the email.
+            paths (List[str]): The attachment file paths.
+            inline_images (Sequence[str]): The paths of the images embedded in the body.
+
+        Returns:
+            Optional[float]: Always None, as nothing is throttled.
+        """
+        uploads = [
+            {
+                "path": path,
+                "size": self.get_size(path),
+                "content_id": content_id(path) if inline else None,
+            }
+            for path, inline in self._iter_files(paths, inline_images)
+        ]
+        await self.writer.write(
+            {
+                "row": _current_row.get(),
+                "copy": _current_copy.get(),
+                "sender": mailbox,
+                "payload": payload,
+                "blobs": [],
+                "uploads": uploads,
+            }
+        )
+        return None
+
+
+class DryRunEmailSender(EmailSender):
+    """
+    An EmailSender that goes through the whole payload build path, mailbox
+    selection included, but writes each email to a DryRunWriter instead of sending
+    it. No access token is needed and no request is made.
+
+    Daily quotas and send rates are not applied, since nothing is sent.
+    """
+
+    def __init__(
+        self,
+        user_email: str,
+        settings: Settings,
+        writer: DryRunWriter,
+        session_manager: Optional[HttpSessionManager] = None,
+    ) -> None:
+        """
+        Initializes the DryRunEmailSender instance with the dry run writer.
+        """
+        super().__init__("", settings.API_SCOPE, user_email, settings, session_manager)
+        self.writer = writer
+        self.attachment_uploader = _DryRunUploader(
+            settings, self.attachment_cache, writer
+        )
+
+    async def _send_message(
+        self, session: aiohttp.ClientSession, message: Dict[str, Any]
+    ) -> str:
+        """
+        Renders the email of a message dictionary, remembering its row and copy
+        for the writer.
+
+        Args:
+            session (aiohttp.ClientSession): The aiohttp client session, unused.
+            message (Dict[str, Any]): The email to render.
+
+        Returns:
+            str: The address of the mailbox that would send the email.
+        """
+        _current_row.set(message["row"])
+        _current_copy.set(message.get("copy"))
+        return await super()._send_message(session, message)
+
+    def _count_result(self, result: Dict[str, Any]) -> None:
+        """
+        Counts a written email apart from the sent ones, so dry runs do not show
+        up as sent in the metrics nor in the live status.
+
+        Args:
+            result (Dict[str, Any]): The result of the row.
+        """
+        metrics.DRY_RUN_MESSAGES.inc()
+
+    async def _post_send_mail(
+        self,
+        session: aiohttp.ClientSession,
+        mailbox: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        blobs: List[bytes],
+    ) -> Optional[float]:
+        """
+        Writes the sendMail payload of an email.
+
+        Args:
+            session (aiohttp.ClientSession): Unused.
+            mailbox (str): The address of the sender mailbox.
+            headers (Dict[str, str]): Unused.
+            payload (Dict[str, Any]): The sendMail payload.
+            blobs (List[bytes]): The encoded attachments referenced by the payload.
+
+        Returns:
+            Optional[float]: Always None, as nothing is throttled.
+        """
+        await self.writer.write(
+            {
+                "row": _current_row.get(),
+                "copy": _current_copy.get(),
+                "sender": mailbox,
+                "payload": payload,
+                "blobs": blobs,
+                "uploads": [],
+            }
+        )
+        return None
@@ -1,7 +1,8 @@
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.config.settings import Settings
-from app.enum.email_format_type import EmailFormatType
+from app.services.body_format import BodyFormatPlan
+from app.services.inline_images import render_inline_images
 
 
 class EmailFormatter:
@@ -14,12 +15,14 @@ class EmailFormatter:
         Initializes the EmailFormatter instance with settings.
         """
         self.settings = settings
+        self._format_plan: Optional[BodyFormatPlan] = None
 
     def format_emails(
         self, email_data: Dict[str, List[str]], formats: Dict[str, Dict[str, str]]
     ) -> Dict[str, List[str]]:
         """
-        Formats the email bodies, subjects, and recipients.
+        Formats the email bodies, subjects, and recipients. Image placeholders in the
+        bodies are rendered as cid: references and listed in "inline_images".
 
         Args:
             email_data (Dict[str, List[str]]): The dictionary containing email bodies, subjects, and recipients.
@@ -28,47 +31,58 @@ class EmailFormatter:
         Returns:
             Dict[str, List[str]]: The formatted email data.
         """
+        bodies, inline_images = [], []
+        for body_parts in email_data["bodies"]:
+            body, images = self._format_body(body_parts, formats)
+            bodies.append(body)
+            inline_images.append(images)
         formatted_data = {
-            "bodies": [
-                self._format_body(body_parts, formats)
-                for body_parts in email_data["bodies"]
-            ],
+            "bodies": bodies,
+            "inline_images": inline_images,
             "subjects": email_data["subjects"],
             "recipients": email_data["recipients"],
             "cc": email_data["cc"],
             "cco": email_data["cco"],
+            "attachments": email_data["attachments"],
+            "rows": email_data["rows"],
         }
         return formatted_data
 
     def _format_body(
         self, body_parts: List[str], formats: Dict[str, Dict[str, str]]
-    ) -> str:
+    ) -> Tuple[str, List[str]]:
         """
-        Formats the email body.
+        Formats the email body with the compiled plan of the formats.
 
         Args:
             body_parts (List[str]): The email body parts.
             formats (Dict[str, Dict[str, str]]): The format information.
 
         Returns:
-            str: The formatted email body.
+            Tuple[str, List[str]]: The formatted email body and the paths of the
+            images embedded in it.
         """
+        plan = self._plan(formats)
         formatted_body = ""
+        inline_images: List[str] = []
         for i, body in enumerate(body_parts):
-            format_info = formats.get(f"CORPO E-MAIL {i + 1}", {})
-            font_size = self.settings.DEFAULT_FONT_SIZE
-            if format_info.get("formats", {}).get(EmailFormatType.AUMENTAR_FONTE.value):
-                font_size += self.settings.FONT_SIZE_INCREMENT
-            if format_info.get("formats", {}).get(EmailFormatType.NEGRITO.value):
-                body = f"<b>{body}</b>"
-            if format_info.get("formats", {}).get(EmailFormatType.ITALICO.value):
-                body = f"<i>{body}</i>"
-            if format_info.get("formats", {}).get(EmailFormatType.SUBLINHADO.value):
-                body = f"<u>{body}</u>"
-            if format_info.get("formats", {}).get(EmailFormatType.HYPERLINK.value):
-                body = f"<a href='{body}'>{body}</a>"
-            body = body.replace("\n", "<br>")  # Preserve line breaks
-            formatted_body += f"<span style='font-size: {font_size}em;'>{body}</span>"
-            line_breaks = format_info.get("line_breaks", 0)
-            formatted_body += "<br>" * line_breaks
-        return formatted_body.strip()
+            text = body.replace("\n", "<br>")  # Preserve line breaks
+            text, images = render_inline_images(text)
+            inline_images.extend(images)
+            formatted_body += plan.render_part(i, text, href=body)
+        return formatted_body.strip(), inline_images
+
+    def _plan(self, formats: Dict[str, Dict[str, Any]]) -> BodyFormatPlan:
+        """
+        Returns the compiled plan of the formats, reusing it while the same formats
+        are passed.
+
+        Args:
+            formats (Dict[str, Dict[str, Any]]): The format information.
+
+        Returns:
+            BodyFormatPlan: The plan of the formats.
+        """
+        if self._format_plan is None or self._format_plan.formats is not formats:
+            self._format_plan = BodyFormatPlan(self.settings, formats)
+        return self._format_plan
@@ -0,0 +1,149 @@
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Hashable
+
+
+class FairShareLimiter:
+    """
+    A global concurrency budget shared by several jobs. When the budget is
+    exhausted, each freed slot goes to the waiting job with the fewest slots in
+    use relative to its weight, so a large campaign cannot starve the others.
+
+    Attributes:
+        capacity (int): The number of slots shared by all jobs.
+        in_use (int): The number of slots currently held.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Initializes the FairShareLimiter instance with the size of the budget.
+        """
+        self.capacity = max(1, capacity)
+        self.in_use = 0
+        self._held: Dict[Hashable, int] = {}
+        self._weights: Dict[Hashable, float] = {}
+        self._waiters: Dict[Hashable, Deque[asyncio.Future]] = {}
+
+    def share(self, job_id: Hashable, weight: float = 1.0) -> "JobShare":
+        """
+        Registers a job and returns its handle on the budget.
+
+        Args:
+            job_id (Hashable): The identifier of the job.
+            weight (float): The relative share of the job.
+
+        Returns:
+            JobShare: The handle used by the job to hold slots.
+        """
+        self._weights[job_id] = max(weight, 1e-6)
+        self._held.setdefault(job_id, 0)
+        return JobShare(self, job_id)
+
+    async def acquire(self, job_id: Hashable) -> None:
+        """
+        Waits for a slot on behalf of a job.
+
+        Args:
+            job_id (Hashable): The identifier of the job.
+        """
+        if self.in_use < self.capacity and not any(self._waiters.values()):
+            self._grant(job_id)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(job_id, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just before the cancellation
+                self.release(job_id)
+            raise
+
+    def release(self, job_id: Hashable) -> None:
+        """
+        Gives a slot back and hands it to the next job in fair order.
+
+        Args:
+            job_id (Hashable): The identifier of the job.
+        """
+        self.in_use -= 1
+        self._held[job_id] -= 1
+        self._wake_waiters()
+
+    def resize(self, capacity: int) -> None:
+        """
+        Changes the size of the budget. Slots above a smaller budget are kept by
+        their holders until released; a larger budget is granted to waiting jobs
+        right away.
+
+        Args:
+            capacity (int): The number of slots shared by all jobs.
+        """
+        capacity = max(1, capacity)
+        if capacity != self.capacity:
+            self.capacity = capacity
+            self._wake_waiters()
+
+    def unregister(self, job_id: Hashable) -> None:
+        """
+        Forgets a finished job.
+
+        Args:
+            job_id (Hashable): The identifier of the job.
+        """
+        if not self._held.get(job_id) and not self._waiters.get(job_id):
+            self._held.pop(job_id, None)
+            self._weights.pop(job_id, None)
+            self._waiters.pop(job_id, None)
+
+    def _grant(self, job_id: Hashable) -> None:
+        """
+        Records a slot held by a job.
+
+        Args:
+            job_id (Hashable): The identifier of the job.
+        """
+        self.in_use += 1
+        self._held[job_id] = self._held.get(job_id, 0) + 1
+
+    def _wake_waiters(self) -> None:
+        """
+        Grants free slots to the waiting jobs that hold the smallest share.
+        """
+        while self.in_use < self.capacity:
+            for waiters in self._waiters.values():
+                while waiters and waiters[0].done():
+                    waiters.popleft()
+            waiting = [job_id for job_id, waiters in self._waiters.items() if waiters]
+            if not waiting:
+                return
+            job_id = min(
+                waiting, key=lambda job: self._held.get(job, 0) / self._weights[job]
+            )
+            self._grant(job_id)
+            self._waiters[job_id].popleft().set_result(None)
+
+
+class JobShare:
+    """
+    The handle of one job on a FairShareLimiter, used as an async context manager
+    around each send.
+
+    Attributes:
+        limiter (FairShareLimiter): The shared concurrency budget.
+        job_id (Hashable): The identifier of the job.
+    """
+
+    def __init__(self, limiter: FairShareLimiter, job_id: Hashable) -> None:
+        """
+        Initializes the JobShare instance.
+        """
+        self.limiter = limiter
+        self.job_id = job_id
+
+    async def __aenter__(self) -> "JobShare":
+        await self.limiter.acquire(self.job_id)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.limiter.release(self.job_id)
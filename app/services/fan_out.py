@@ -0,0 +1,69 @@
+import json
+from typing import Any, AsyncIterator, Dict, List
+
+
+def split_recipients(recipients: str) -> List[str]:
+    """
+    Splits a recipient field separated by ';', ignoring empty values the same way
+    EmailSender does.
+
+    Args:
+        recipients (str): The recipient field.
+
+    Returns:
+        List[str]: The addresses.
+    """
+    return [
+        email.strip()
+        for email in (recipients or "").split(";")
+        if email.strip() and email.strip().lower() != "nan"
+    ]
+
+
+def encode_body(body: str) -> bytes:
+    """
+    Encodes an email body as the contents of a JSON string, to be spliced into the
+    sendMail requests of every copy of the row as a blob.
+
+    Args:
+        body (str): The email body.
+
+    Returns:
+        bytes: The JSON-escaped body, without the surrounding quotes.
+    """
+    return json.dumps(body)[1:-1].encode("utf-8")
+
+
+async def fan_out(
+    messages: AsyncIterator[Dict[str, Any]],
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Expands each email into one copy per To address, as the copies are consumed.
+
+    The copies share the body string of the row and its JSON encoding, made once
+    per row, so a row costs the same memory whatever its number of addresses. CC
+    and CCO recipients receive only the first copy, as they would otherwise get
+    the same email once per To address.
+
+    Args:
+        messages (AsyncIterator[Dict[str, Any]]): The formatted emails.
+
+    Yields:
+        Dict[str, Any]: The email of one To address, with the keys "copy", the
+        position of the address in the row, and "body_blob", the encoded body.
+    """
+    async for message in messages:
+        addresses = split_recipients(message["recipients"])
+        if len(addresses) <= 1:
+            yield message
+            continue
+        body_blob = encode_body(message["body"])
+        for copy, address in enumerate(addresses):
+            yield dict(
+                message,
+                recipients=address,
+                cc=message["cc"] if copy == 0 else "",
+                cco=message["cco"] if copy == 0 else "",
+                copy=copy,
+                body_blob=body_blob,
+            )
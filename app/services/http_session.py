@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import warnings
+from typing import Optional
+
+import aiohttp
+
+from app.config.settings import Settings
+
+
+class HttpSessionManager:
+    """
+    Keeps a long-lived aiohttp session, with a tuned connection pool, so that
+    connections to Graph are reused across campaigns and token refreshes instead of
+    paying for DNS, TCP and TLS handshakes on every run.
+
+    The access token is sent per request, so the session itself never needs to be
+    recreated when the token changes.
+
+    Attributes:
+        settings (Settings): The application settings.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        """
+        Initializes the HttpSessionManager instance with settings.
+        """
+        self.settings = settings
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the shared session, creating it on first use.
+
+        Returns:
+            aiohttp.ClientSession: The shared client session.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed:
+            if self._loop is loop:
+                return self._session
+            # aiohttp sessions are bound to the loop that created them
+            logging.warning("Event loop changed, opening a new HTTP session")
+            self._discard_session(self._session, self._loop)
+        connector = aiohttp.TCPConnector(
+            limit=self.settings.AIOHTTP_LIMIT,
+            limit_per_host=self.settings.AIOHTTP_LIMIT_PER_HOST,
+            ttl_dns_cache=self.settings.AIOHTTP_DNS_CACHE_TTL,
+            keepalive_timeout=self.settings.AIOHTTP_KEEPALIVE_TIMEOUT,
+        )
+        self._session = aiohttp.ClientSession(connector=connector)
+        self._loop = loop
+        logging.info("HTTP session opened")
+        return self._session
+
+    async def warm_up(self, connections: Optional[int] = None) -> int:
+        """
+        Pre-opens connections to Graph by issuing concurrent lightweight requests,
+        which leave their connections idle in the pool for the first sends.
+
+        Args:
+            connections (Optional[int]): The number of connections to open. Defaults
+                to AIOHTTP_WARM_UP_CONNECTIONS.
+
+        Returns:
+            int: The number of connections that were opened successfully.
+        """
+        if connections is None:
+            connections = self.settings.AIOHTTP_WARM_UP_CONNECTIONS
+        limit = self.settings.AIOHTTP_LIMIT_PER_HOST or self.settings.AIOHTTP_LIMIT
+        if limit:
+            connections = min(connections, limit)
+        if connections <= 0:
+            return 0
+        session = await self.get_session()
+        results = await asyncio.gather(
+            *(self._open_connection(session) for _ in range(connections))
+        )
+        opened = sum(results)
+        logging.info(f"Warmed up {opened}/{connections} connections to Graph")
+        return opened
+
+    async def close(self) -> None:
+        """
+        Closes the shared session and its connections.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logging.info("HTTP session closed")
+        self._session = None
+        self._loop = None
+
+    @staticmethod
+    def _discard_session(
+        session: aiohttp.ClientSession, loop: asyncio.AbstractEventLoop
+    ) -> None:
+        """
+        Closes a session left behind by another event loop. If that loop is still
+        running, the session is closed on it; otherwise its connector is closed
+        directly, since a session can no longer be awaited on a stopped loop.
+
+        Args:
+            session (aiohttp.ClientSession): The session to close.
+            loop (asyncio.AbstractEventLoop): The loop that created the session.
+        """
+        if loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        elif session.connector is not None:
+            # Closing the connector is synchronous; the awaitable it returns for
+            # backwards compatibility warns when it is not awaited
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", DeprecationWarning)
+                session.connector.close()
+
+    async def _open_connection(self, session: aiohttp.ClientSession) -> bool:
+        """
+        Opens one connection to Graph with a HEAD request. Any HTTP response means the
+        connection is established and can be reused.
+
+        Args:
+            session (aiohttp.ClientSession): The shared client session.
+
+        Returns:
+            bool: True if the connection was opened, False otherwise.
+        """
+        try:
+            async with session.head(self.settings.GRAPH_API_URL) as response:
+                await response.read()
+                return True
+        except aiohttp.ClientError as e:
+            logging.warning(f"Connection warm-up failed: {e}")
+            return False
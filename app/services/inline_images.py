@@ -0,0 +1,43 @@
+import hashlib
+import os
+import re
+from typing import List, Tuple
+
+# Placeholder used in the body cells to embed an image, e.g. {{imagem:C:\logo.png}}
+INLINE_IMAGE_PATTERN = re.compile(r"\{\{\s*imagem\s*:\s*(.+?)\s*\}\}", re.IGNORECASE)
+
+
+def content_id(path: str) -> str:
+    """
+    Returns the Content-ID used to reference an inline image from the email body.
+    The same file always gets the same Content-ID.
+
+    Args:
+        path (str): The image file path.
+
+    Returns:
+        str: The Content-ID.
+    """
+    normalized = os.path.normcase(os.path.abspath(path))
+    return f"img-{hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]}"
+
+
+def render_inline_images(text: str) -> Tuple[str, List[str]]:
+    """
+    Replaces the image placeholders of a body part with cid: references.
+
+    Args:
+        text (str): The body part.
+
+    Returns:
+        Tuple[str, List[str]]: The body part with <img> tags and the paths of the
+        images it references.
+    """
+    paths: List[str] = []
+
+    def replace(match: re.Match) -> str:
+        path = match.group(1)
+        paths.append(path)
+        return f"<img src='cid:{content_id(path)}'>"
+
+    return INLINE_IMAGE_PATTERN.sub(replace, text), paths
@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config.settings import Settings
+from app.enum.job_status import JobStatus
+
+JOB_QUEUE_FILE_NAME = "jobs.sqlite3"
+
+
+class JobQueue:
+    """
+    A durable queue of campaigns kept in a SQLite database, so queued workbooks
+    survive restarts of the application.
+
+    Jobs are claimed by descending priority, then in the order they were queued.
+
+    Attributes:
+        path (str): The path to the SQLite database.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Initializes the JobQueue instance, creating the database if needed.
+
+        Jobs left running by a previous process are marked as failed instead of
+        being queued again, since part of their emails may already have been sent.
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    file_path TEXT NOT NULL,
+                    sender_email TEXT NOT NULL,
+                    formats TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    message TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """)
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_pending "
+                "ON jobs (status, priority DESC, id)"
+            )
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, message = ?, finished_at = ? "
+                "WHERE status = ?",
+                (
+                    JobStatus.FAILED.value,
+                    "Interrompido antes de terminar",
+                    time.time(),
+                    JobStatus.RUNNING.value,
+                ),
+            )
+
+    @classmethod
+    def for_settings(cls, settings: Settings) -> "JobQueue":
+        """
+        Opens the job queue database kept in DATA_DIR.
+
+        Args:
+            settings (Settings): The application settings.
+
+        Returns:
+            JobQueue: The job queue.
+        """
+        return cls(os.path.join(settings.DATA_DIR, JOB_QUEUE_FILE_NAME))
+
+    def enqueue(
+        self,
+        file_path: str,
+        sender_email: str,
+        formats: Dict[str, Dict[str, Any]],
+        priority: int = 1,
+    ) -> int:
+        """
+        Adds a campaign to the queue.
+
+        Args:
+            file_path (str): The path to the workbook.
+            sender_email (str): The sender mailboxes, separated by ';'.
+            formats (Dict[str, Dict[str, Any]]): The formats for each body part.
+            priority (int): The priority of the job; higher priorities are started
+                first and get a larger share of the send concurrency.
+
+        Returns:
+            int: The identifier of the job.
+        """
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO jobs "
+                "(file_path, sender_email, formats, priority, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    file_path,
+                    sender_email,
+                    json.dumps(formats),
+                    max(1, int(priority)),
+                    JobStatus.PENDING.value,
+                    time.time(),
+                ),
+            )
+            return cursor.lastrowid
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """
+        Marks the next pending job as running.
+
+        Returns:
+            Optional[Dict[str, Any]]: The job, or None if no job is pending.
+        """
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY priority DESC, id LIMIT 1",
+                (JobStatus.PENDING.value,),
+            ).fetchone()
+            if row is None:
+                return None
+            started_at = time.time()
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+                (JobStatus.RUNNING.value, started_at, row["id"]),
+            )
+        job = self._to_job(row)
+        job["status"] = JobStatus.RUNNING.value
+        job["started_at"] = started_at
+        return job
+
+    def finish(self, job_id: int, status: JobStatus, message: str) -> None:
+        """
+        Records the outcome of a job.
+
+        Args:
+            job_id (int): The identifier of the job.
+            status (JobStatus): The final status of the job.
+            message (str): The summary of the job.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, message = ?, finished_at = ? WHERE id = ?",
+                (status.value, message, time.time(), job_id),
+            )
+
+    def list_jobs(self, status: Optional[JobStatus] = None) -> List[Dict[str, Any]]:
+        """
+        Lists the jobs in the order they were queued.
+
+        Args:
+            status (Optional[JobStatus]): Only list the jobs with this status.
+
+        Returns:
+            List[Dict[str, Any]]: The jobs.
+        """
+        with self._lock:
+            if status is None:
+                rows = self._connection.execute(
+                    "SELECT * FROM jobs ORDER BY id"
+                ).fetchall()
+            else:
+                rows = self._connection.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY id", (status.value,)
+                ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._connection.close()
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        """
+        Converts a database row to a job dictionary.
+
+        Args:
+            row (sqlite3.Row): The database row.
+
+        Returns:
+            Dict[str, Any]: The job.
+        """
+        job = dict(row)
+        job["formats"] = json.loads(job["formats"])
+        return job
@@ -0,0 +1,96 @@
+import json
+import re
+from typing import Any, List, Union
+
+from aiohttp import payload
+from aiohttp.abc import AbstractStreamWriter
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Placeholder written in the JSON document where a pre-encoded blob goes. NUL
+# characters are removed from the spreadsheet text when it is parsed, so the
+# placeholder is unambiguous.
+BLOB_REFERENCE = "\x00blob:{}\x00"
+_BLOB_PATTERN = re.compile(rb'"\\u0000blob:(\d+)\\u0000"')
+
+
+def blob_reference(index: int) -> str:
+    """
+    Returns the placeholder for a blob, to be used as a JSON string value.
+
+    Args:
+        index (int): The position of the blob in the list given to encode_json.
+
+    Returns:
+        str: The placeholder.
+    """
+    return BLOB_REFERENCE.format(index)
+
+
+class JsonPiecesPayload(payload.Payload):
+    """
+    An aiohttp payload made of several byte pieces written one after the other, so
+    large pre-encoded values can be sent without being copied into one buffer.
+    """
+
+    _default_content_type = "application/json"
+
+    def __init__(self, pieces: List[BytesLike], **kwargs: Any) -> None:
+        """
+        Initializes the JsonPiecesPayload instance with its pieces.
+        """
+        super().__init__(pieces, content_type="application/json", **kwargs)
+        self._size = sum(memoryview(piece).nbytes for piece in pieces)
+
+    def decode(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        """
+        Returns the payload as a string.
+        """
+        return b"".join(self._value).decode(encoding, errors)
+
+    async def write(self, writer: AbstractStreamWriter) -> None:
+        """
+        Writes the pieces to the request body.
+        """
+        for piece in self._value:
+            await writer.write(piece)
+
+
+def encode_json_pieces(document: Any, blobs: List[BytesLike]) -> List[BytesLike]:
+    """
+    Encodes a JSON document whose string values may be blob placeholders into byte
+    pieces, each referenced blob being one of the pieces, uncopied.
+
+    Args:
+        document (Any): The JSON document, containing values from blob_reference.
+        blobs (List[BytesLike]): The pre-encoded blobs. They must be valid JSON string
+            contents, e.g. base64.
+
+    Returns:
+        List[BytesLike]: The pieces, which joined form the encoded document.
+    """
+    encoded = json.dumps(document).encode("utf-8")
+    pieces: List[BytesLike] = []
+    position = 0
+    for match in _BLOB_PATTERN.finditer(encoded):
+        pieces.append(encoded[position : match.start() + 1])
+        pieces.append(blobs[int(match.group(1))])
+        position = match.end() - 1
+    pieces.append(encoded[position:])
+    return pieces
+
+
+def encode_json(document: Any, blobs: List[BytesLike]) -> JsonPiecesPayload:
+    """
+    Encodes a JSON document whose string values may be blob placeholders, splicing
+    each referenced blob in place without copying it.
+
+    Args:
+        document (Any): The JSON document, containing values from blob_reference.
+        blobs (List[BytesLike]): The pre-encoded blobs. They must be valid JSON string
+            contents, e.g. base64.
+
+    Returns:
+        JsonPiecesPayload: The encoded document.
+    """
+    return JsonPiecesPayload(encode_json_pieces(document, blobs))
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from app.services import metrics
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop runs its callbacks and catches the ones that
+    block it.
+
+    A sampling task sleeps for interval and records how much later than asked it
+    woke up in the event_loop_lag_seconds metric. A watchdog thread checks the
+    time of the last sample: when the loop has not run it for longer than
+    block_threshold, the stack of the loop thread, i.e. of the blocking callback,
+    is logged once per stall.
+
+    Attributes:
+        interval (float): The number of seconds between two samples.
+        block_threshold (float): The number of seconds the loop may be blocked
+            before its stack is logged; 0 disables the watchdog.
+        last_lag (float): The lag of the last sample, in seconds.
+    """
+
+    def __init__(self, interval: float, block_threshold: float) -> None:
+        """
+        Initializes the LoopLagMonitor instance without starting it.
+        """
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.last_lag = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread_id: Optional[int] = None
+        self._heartbeat = 0.0
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Starts monitoring the running event loop. Does nothing if it is already
+        monitored. Must be called from the event loop thread.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is self._loop and self._task is not None and not self._task.done():
+            return
+        self.stop()
+        self._loop = loop
+        self._thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = loop.create_task(self._sample())
+        if self.block_threshold:
+            self._stop = threading.Event()
+            self._watchdog = threading.Thread(
+                target=self._watch, name="loop-watchdog", daemon=True
+            )
+            self._watchdog.start()
+        logging.info(
+            f"Monitor do loop de eventos ativo ({type(loop).__module__}."
+            f"{type(loop).__name__})"
+        )
+
+    def stop(self) -> None:
+        """
+        Stops the sampling task and the watchdog.
+        """
+        if self._task is not None and not self._loop.is_closed():
+            self._task.cancel()
+        self._task = None
+        if self._watchdog is not None:
+            self._stop.set()
+            self._watchdog.join()
+            self._watchdog = None
+
+    async def _sample(self) -> None:
+        """
+        Records the lag of the loop every interval.
+        """
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            self.last_lag = max(0.0, now - started - self.interval)
+            metrics.LOOP_LAG.observe(self.last_lag)
+
+    def _watch(self) -> None:
+        """
+        Logs the stack of the loop thread when no sample ran for longer than
+        block_threshold. Runs on the watchdog thread until stop is called.
+        """
+        reported = False
+        while not self._stop.wait(self.block_threshold / 2):
+            blocked = time.monotonic() - self._heartbeat - self.interval
+            if blocked <= self.block_threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+            reported = True
+            metrics.LOOP_BLOCKS.inc()
+            frame = sys._current_frames().get(self._thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            logging.warning(
+                f"Loop de eventos bloqueado há {blocked:.2f}s; pilha da thread do "
+                f"loop:\n{stack}"
+            )
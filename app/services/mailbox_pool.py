@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+import aiohttp
+
+from app.enum.mailbox_balancing_strategy import MailboxBalancingStrategy
+from app.exceptions import SendQuotaExceededError, SenderConfigurationError
+from app.services.send_scheduler import SendScheduler
+
+# Used when Graph throttles a mailbox without telling how long to wait
+DEFAULT_RETRY_AFTER = 10.0
+# Graph answers with these statuses, and a Retry-After header, when it throttles a
+# mailbox
+THROTTLING_STATUSES = (429, 503)
+
+
+def get_retry_after(response: aiohttp.ClientResponse) -> float:
+    """
+    Reads how long Graph asked the client to wait before retrying.
+
+    Args:
+        response (aiohttp.ClientResponse): The throttled response.
+
+    Returns:
+        float: The number of seconds to wait.
+    """
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+class Mailbox:
+    """
+    A sender mailbox and its load and throttle state.
+
+    Attributes:
+        address (str): The email address of the mailbox.
+        weight (int): The relative share of emails sent from this mailbox.
+        in_flight (int): The number of emails currently being sent.
+        sent (int): The number of emails sent successfully.
+        throttled_until (float): The monotonic time until which the mailbox is
+            throttled.
+        current_weight (int): The running weight used by weighted round-robin.
+    """
+
+    def __init__(self, address: str, weight: int = 1) -> None:
+        """
+        Initializes the Mailbox instance with its address and weight.
+        """
+        self.address = address
+        self.weight = weight
+        self.in_flight = 0
+        self.sent = 0
+        self.throttled_until = 0.0
+        self.current_weight = 0
+
+    def is_throttled(self, now: float) -> bool:
+        """
+        Checks if the mailbox is still being throttled.
+
+        Args:
+            now (float): The current monotonic time.
+
+        Returns:
+            bool: True if the mailbox must not be used yet, False otherwise.
+        """
+        return now < self.throttled_until
+
+
+class MailboxPool:
+    """
+    Distributes emails across several sender mailboxes, skipping the ones that
+    Graph is currently throttling or that have no daily quota left.
+
+    Attributes:
+        mailboxes (List[Mailbox]): The sender mailboxes.
+        strategy (MailboxBalancingStrategy): The distribution strategy.
+        scheduler (Optional[SendScheduler]): Paces each mailbox and tracks its
+            daily recipient quota.
+    """
+
+    def __init__(
+        self,
+        mailboxes: List[Mailbox],
+        strategy: MailboxBalancingStrategy,
+        scheduler: Optional[SendScheduler] = None,
+    ) -> None:
+        """
+        Initializes the MailboxPool instance with the mailboxes and strategy.
+
+        Raises:
+            SenderConfigurationError: If no mailbox is given.
+        """
+        if not mailboxes:
+            raise SenderConfigurationError("At least one sender mailbox is required")
+        self.mailboxes = mailboxes
+        self.strategy = strategy
+        self.scheduler = scheduler
+
+    @classmethod
+    def from_string(
+        cls,
+        sender_emails: str,
+        strategy: MailboxBalancingStrategy,
+        scheduler: Optional[SendScheduler] = None,
+    ) -> "MailboxPool":
+        """
+        Builds a pool from a string of sender mailboxes separated by ';'. Each
+        mailbox may be followed by ':' and its weight, e.g. "a@x.com:2;b@x.com".
+
+        Args:
+            sender_emails (str): The sender mailboxes.
+            strategy (MailboxBalancingStrategy): The distribution strategy.
+            scheduler (Optional[SendScheduler]): The send scheduler.
+
+        Returns:
+            MailboxPool: The mailbox pool.
+
+        Raises:
+            SenderConfigurationError: If a weight is not a positive integer.
+        """
+        mailboxes = []
+        for entry in sender_emails.split(";"):
+            address, _, weight = entry.strip().partition(":")
+            if not address:
+                continue
+            try:
+                weight = int(weight) if weight else 1
+            except ValueError:
+                weight = 0
+            if weight < 1:
+                raise SenderConfigurationError(
+                    f"Invalid weight for sender mailbox {address}"
+                )
+            mailboxes.append(Mailbox(address, weight))
+        return cls(mailboxes, strategy, scheduler)
+
+    async def acquire(self, recipients: int = 1) -> Mailbox:
+        """
+        Picks the mailbox for the next email, waiting if every mailbox is throttled,
+        then waits for the scheduler to allow the mailbox to send.
+
+        Args:
+            recipients (int): The recipients of the email, checked against the daily
+                quota of each mailbox.
+
+        Returns:
+            Mailbox: The chosen mailbox, which must be handed back with release.
+
+        Raises:
+            SendQuotaExceededError: If no mailbox has quota left for the email.
+        """
+        while True:
+            with_quota = [
+                m
+                for m in self.mailboxes
+                if not self.scheduler or self.scheduler.has_quota(m.address, recipients)
+            ]
+            if not with_quota:
+                raise SendQuotaExceededError(
+                    f"No sender mailbox has daily quota left for {recipients} recipients"
+                )
+            now = time.monotonic()
+            available = [m for m in with_quota if not m.is_throttled(now)]
+            if available:
+                mailbox = self._choose(available)
+                mailbox.in_flight += 1
+                break
+            wait = min(m.throttled_until for m in with_quota) - now
+            logging.warning(f"All sender mailboxes are throttled, waiting {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+        if self.scheduler:
+            self.scheduler.reserve(mailbox.address, recipients)
+            try:
+                await self.scheduler.wait_for_slot(mailbox.address)
+            except BaseException:
+                self.release(mailbox, recipients=recipients)
+                raise
+        return mailbox
+
+    def release(
+        self, mailbox: Mailbox, sent: bool = False, recipients: int = 1
+    ) -> None:
+        """
+        Hands a mailbox back to the pool.
+
+        Args:
+            mailbox (Mailbox): The mailbox returned by acquire.
+            sent (bool): Whether the email was sent successfully.
+            recipients (int): The recipients of the email, as given to acquire.
+        """
+        mailbox.in_flight -= 1
+        if sent:
+            mailbox.sent += 1
+        if self.scheduler:
+            self.scheduler.release(mailbox.address, recipients, sent)
+
+    def mark_throttled(self, mailbox: Mailbox, retry_after: float) -> None:
+        """
+        Stops using a mailbox until Graph allows it to send again.
+
+        Args:
+            mailbox (Mailbox): The throttled mailbox.
+            retry_after (float): The number of seconds to wait, as told by Graph.
+        """
+        mailbox.throttled_until = max(
+            mailbox.throttled_until, time.monotonic() + retry_after
+        )
+        logging.warning(
+            f"Sender mailbox {mailbox.address} throttled for {retry_after}s"
+        )
+
+    def _choose(self, available: List[Mailbox]) -> Mailbox:
+        """
+        Chooses one of the available mailboxes according to the strategy.
+
+        Args:
+            available (List[Mailbox]): The mailboxes that are not throttled.
+
+        Returns:
+            Mailbox: The chosen mailbox.
+        """
+        if self.strategy == MailboxBalancingStrategy.WEIGHTED_ROUND_ROBIN:
+            # Smooth weighted round-robin: spreads the picks of heavier mailboxes
+            # evenly instead of sending them in bursts
+            total = sum(m.weight for m in available)
+            for m in available:
+                m.current_weight += m.weight
+            mailbox = max(available, key=lambda m: m.current_weight)
+            mailbox.current_weight -= total
+            return mailbox
+        return min(available, key=lambda m: (m.in_flight / m.weight, m.sent / m.weight))
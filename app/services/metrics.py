@@ -0,0 +1,444 @@
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.enum.send_status import SendStatus
+
+# Upper bounds, in seconds, of the Graph request latency buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Upper bounds, in seconds, of the event loop lag buckets
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    """
+    Formats a sample value the way Prometheus expects it.
+
+    Args:
+        value (float): The value.
+
+    Returns:
+        str: The value, without a decimal part when it is whole.
+    """
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """
+    Formats the labels of a sample.
+
+    Args:
+        labels (Dict[str, str]): The label names and values.
+
+    Returns:
+        str: The labels between braces, or an empty string without labels.
+    """
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+
+class _Metric:
+    """
+    A metric updated without locks: each thread writes only to its own cell, and
+    the cells are added up when the metric is read.
+
+    Attributes:
+        name (str): The name of the metric family.
+        documentation (str): The help text of the metric family.
+        labels (Dict[str, str]): The labels of this metric in its family.
+    """
+
+    type_name = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """
+        Initializes the metric without any cell.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels or {}
+        self._local = threading.local()
+        self._cells: List[List[float]] = []
+
+    def _cell(self) -> List[float]:
+        """
+        Returns the cell of the calling thread, creating it on first use.
+
+        Returns:
+            List[float]: The cell.
+        """
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = self._new_cell()
+            # list.append is atomic, so registering a cell needs no lock either
+            self._cells.append(cell)
+            return cell
+
+    def _new_cell(self) -> List[float]:
+        """
+        Creates an empty cell.
+
+        Returns:
+            List[float]: The cell.
+        """
+        return [0.0]
+
+    def _total(self) -> List[float]:
+        """
+        Adds up the cells of every thread.
+
+        Returns:
+            List[float]: The sum of each position of the cells.
+        """
+        total = self._new_cell()
+        for cell in list(self._cells):
+            for position, value in enumerate(cell):
+                total[position] += value
+        return total
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """
+        Returns the samples exposed for this metric.
+
+        Returns:
+            List[Tuple[str, Dict[str, str], float]]: The name, labels and value of
+            each sample.
+        """
+        return [(self.name, self.labels, self._total()[0])]
+
+
+class Counter(_Metric):
+    """
+    A value that only goes up, such as the number of emails sent.
+    """
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Increments the counter.
+
+        Args:
+            amount (float): The increment.
+        """
+        self._cell()[0] += amount
+
+    @property
+    def value(self) -> float:
+        """
+        The current value of the counter.
+
+        Returns:
+            float: The value.
+        """
+        return self._total()[0]
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down, such as the depth of a queue.
+    """
+
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1.0) -> None:
+        """
+        Decrements the gauge.
+
+        Args:
+            amount (float): The decrement.
+        """
+        self._cell()[0] -= amount
+
+
+class Histogram(_Metric):
+    """
+    The distribution of observed values, such as request latencies, counted in
+    cumulative buckets.
+
+    Attributes:
+        buckets (Sequence[float]): The upper bounds of the buckets.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float],
+        labels: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Initializes the histogram with its bucket bounds.
+        """
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labels)
+
+    def _new_cell(self) -> List[float]:
+        """
+        Creates an empty cell: one count per bucket, the +Inf bucket, the sum and
+        the count.
+
+        Returns:
+            List[float]: The cell.
+        """
+        return [0.0] * (len(self.buckets) + 3)
+
+    def observe(self, value: float) -> None:
+        """
+        Records an observed value.
+
+        Args:
+            value (float): The value.
+        """
+        cell = self._cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """
+        Returns the cumulative bucket, sum and count samples.
+
+        Returns:
+            List[Tuple[str, Dict[str, str], float]]: The name, labels and value of
+            each sample.
+        """
+        total = self._total()
+        samples = []
+        cumulative = 0.0
+        for bound, count in zip(self.buckets + (float("inf"),), total):
+            cumulative += count
+            samples.append(
+                (
+                    f"{self.name}_bucket",
+                    {**self.labels, "le": _format_value(bound)},
+                    cumulative,
+                )
+            )
+        samples.append((f"{self.name}_sum", self.labels, total[-2]))
+        samples.append((f"{self.name}_count", self.labels, total[-1]))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    The metrics exposed by the application, rendered in the Prometheus text format.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes the MetricsRegistry instance without metrics.
+        """
+        self._metrics: List[_Metric] = []
+
+    def counter(
+        self, name: str, documentation: str, labels: Optional[Dict[str, str]] = None
+    ) -> Counter:
+        """
+        Registers a counter.
+
+        Args:
+            name (str): The name of the metric family.
+            documentation (str): The help text of the metric family.
+            labels (Optional[Dict[str, str]]): The labels of the counter.
+
+        Returns:
+            Counter: The counter.
+        """
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(
+        self, name: str, documentation: str, labels: Optional[Dict[str, str]] = None
+    ) -> Gauge:
+        """
+        Registers a gauge.
+
+        Args:
+            name (str): The name of the metric family.
+            documentation (str): The help text of the metric family.
+            labels (Optional[Dict[str, str]]): The labels of the gauge.
+
+        Returns:
+            Gauge: The gauge.
+        """
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float],
+        labels: Optional[Dict[str, str]] = None,
+    ) -> Histogram:
+        """
+        Registers a histogram.
+
+        Args:
+            name (str): The name of the metric family.
+            documentation (str): The help text of the metric family.
+            buckets (Sequence[float]): The upper bounds of the buckets.
+            labels (Optional[Dict[str, str]]): The labels of the histogram.
+
+        Returns:
+            Histogram: The histogram.
+        """
+        return self._register(Histogram(name, documentation, buckets, labels))
+
+    def _register(self, metric: _Metric) -> _Metric:
+        """
+        Adds a metric to the registry.
+
+        Args:
+            metric (_Metric): The metric.
+
+        Returns:
+            _Metric: The same metric.
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text.
+        """
+        lines = []
+        described = set()
+        for metric in self._metrics:
+            if metric.name not in described:
+                described.add(metric.name)
+                lines.append(f"# HELP {metric.name} {metric.documentation}")
+                lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+MESSAGES = {
+    status.value: REGISTRY.counter(
+        "email_messages_total",
+        "Emails handed to Graph, by outcome.",
+        {"status": status.value},
+    )
+    for status in (SendStatus.SENT, SendStatus.FAILED, SendStatus.DEFERRED)
+}
+DRY_RUN_MESSAGES = REGISTRY.counter(
+    "email_dry_run_messages_total", "Emails written by dry runs instead of sent."
+)
+SEND_RETRIES = REGISTRY.counter(
+    "email_send_retries_total", "Send attempts repeated after throttling."
+)
+THROTTLED_RESPONSES = REGISTRY.counter(
+    "graph_throttled_responses_total", "Graph responses with HTTP 429 or 503."
+)
+TOKEN_REFRESHES = REGISTRY.counter(
+    "auth_token_refreshes_total", "Access tokens acquired from Microsoft Entra ID."
+)
+GRAPH_LATENCY = REGISTRY.histogram(
+    "graph_request_duration_seconds",
+    "Duration of the sendMail requests.",
+    LATENCY_BUCKETS,
+)
+SEND_QUEUE_DEPTH = REGISTRY.gauge(
+    "email_send_queue_depth", "Formatted emails waiting for a free send slot."
+)
+ROWS_PARSED = REGISTRY.counter(
+    "excel_rows_parsed_total", "Valid spreadsheet rows parsed."
+)
+PARSE_SECONDS = REGISTRY.counter(
+    "excel_parse_seconds_total", "Time spent parsing spreadsheets."
+)
+LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds",
+    "Delay between the scheduled and actual run of the lag samples.",
+    LOOP_LAG_BUCKETS,
+)
+LOOP_BLOCKS = REGISTRY.counter(
+    "event_loop_blocked_total", "Times the event loop was blocked past the threshold."
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Serves the registry of the server at /metrics.
+    """
+
+    def do_GET(self) -> None:
+        """
+        Answers a scrape request.
+        """
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        """
+        Silences the access log of each scrape.
+        """
+
+
+class MetricsServer:
+    """
+    A local HTTP endpoint exposing the metrics at /metrics, served from a daemon
+    thread so scrapes never wait for the event loop.
+
+    Attributes:
+        registry (MetricsRegistry): The metrics exposed.
+        host (str): The address the server listens on.
+        port (int): The port the server listens on; 0 picks a free port.
+    """
+
+    def __init__(self, registry: MetricsRegistry, host: str, port: int) -> None:
+        """
+        Initializes the MetricsServer instance without starting it.
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Starts serving the metrics.
+        """
+        self._server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.registry = self.registry
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics", daemon=True
+        )
+        self._thread.start()
+        logging.info(f"Métricas disponíveis em http://{self.host}:{self.port}/metrics")
+
+    def stop(self) -> None:
+        """
+        Stops serving the metrics.
+        """
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
@@ -0,0 +1,203 @@
+import os
+from typing import Dict, List
+
+import pandas as pd
+
+from app.config.settings import Settings
+from app.enum.recipient_mode import RecipientMode
+from app.services.inline_images import INLINE_IMAGE_PATTERN
+
+# Deliberately loose: catches typos such as missing '@' or domain, spaces and
+# separators other than ';', without rejecting unusual but valid addresses
+EMAIL_ADDRESS_PATTERN = r"[^@\s,<>;]+@[^@\s,<>;]+\.[^@\s,<>;]+"
+# Largest file Graph accepts through an upload session
+MAX_ATTACHMENT_BYTES = 150 * 1024 * 1024
+# Allowance for the JSON envelope and the HTML added by the formatter
+PAYLOAD_OVERHEAD_BYTES = 4096
+# ensure_ascii escapes each non-ASCII character as \uXXXX
+NON_ASCII_EXTRA_BYTES = 5
+
+
+class PreflightValidator:
+    """
+    Checks the parsed spreadsheet rows for problems that would make their sendMail
+    requests fail, before any request is made. Every check works on whole columns
+    at once, so large spreadsheets are validated in a single pass.
+
+    Attributes:
+        settings (Settings): The application settings.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        """
+        Initializes the PreflightValidator instance with settings.
+        """
+        self.settings = settings
+
+    def validate(self, email_data: Dict[str, list]) -> Dict[int, List[str]]:
+        """
+        Validates the raw email data.
+
+        Args:
+            email_data (Dict[str, list]): The raw email data.
+
+        Returns:
+            Dict[int, List[str]]: The problems found, keyed by the position of the
+            row in the email data; valid rows are left out.
+        """
+        index = pd.RangeIndex(len(email_data["rows"]))
+        problems: Dict[int, List[str]] = {}
+
+        # Adds a problem to each row selected by the mask; the message may be a
+        # function of the row position
+        def report(mask: pd.Series, message) -> None:
+            for position in mask.index[mask.to_numpy()]:
+                text = message(position) if callable(message) else message
+                problems.setdefault(int(position), []).append(text)
+
+        subjects = self._to_series(email_data["subjects"], index)
+        report(self._is_empty(subjects), "Assunto vazio")
+
+        counts = {}
+        for field, label in (("recipients", "Para"), ("cc", "CC"), ("cco", "CCO")):
+            addresses = self._split(self._to_series(email_data[field], index))
+            counts[field] = (
+                addresses.groupby(level=0).size().reindex(index, fill_value=0)
+            )
+            invalid = addresses[~addresses.str.fullmatch(EMAIL_ADDRESS_PATTERN)]
+            first_invalid = invalid.groupby(level=0).first()
+            report(
+                pd.Series(True, index=first_invalid.index),
+                lambda position, label=label, first=first_invalid: (
+                    f"Endereço inválido em {label}: {first[position]}"
+                ),
+            )
+        report(counts["recipients"] == 0, "Nenhum destinatário válido em Para")
+        to_count = counts["recipients"]
+        if RecipientMode(self.settings.RECIPIENT_MODE) is RecipientMode.FAN_OUT:
+            # Each copy of a fanned-out row has a single To address, and the
+            # first one the CC and CCO
+            to_count = to_count.clip(upper=1)
+        recipient_count = to_count + counts["cc"] + counts["cco"]
+        limit = self.settings.MAX_RECIPIENTS_PER_MESSAGE
+        if limit:
+            report(
+                recipient_count > limit,
+                lambda position: (
+                    f"{recipient_count[position]} destinatários, acima do limite "
+                    f"de {limit} por email"
+                ),
+            )
+
+        bodies = pd.DataFrame(email_data["bodies"], index=index).astype(str)
+        body_chars = pd.Series(0, index=index)
+        for column in bodies.columns:
+            body_chars += bodies[column].str.len()
+        fixed_bytes = subjects.str.len() + PAYLOAD_OVERHEAD_BYTES + 64 * recipient_count
+        # Non-ASCII characters are only counted for the rows that could exceed the
+        # limit if every character were escaped
+        request_bytes = body_chars + fixed_bytes
+        candidates = (
+            body_chars * (1 + NON_ASCII_EXTRA_BYTES) + fixed_bytes
+            > self.settings.MAX_REQUEST_BYTES
+        )
+        if candidates.any():
+            for column in bodies.columns:
+                request_bytes[candidates] += NON_ASCII_EXTRA_BYTES * bodies.loc[
+                    candidates, column
+                ].str.count(r"[^\x00-\x7f]")
+        report(
+            request_bytes > self.settings.MAX_REQUEST_BYTES,
+            lambda position: (
+                f"Corpo com cerca de {request_bytes[position] // 1024} KB, acima do "
+                f"limite de {self.settings.MAX_REQUEST_BYTES // 1024} KB por "
+                f"requisição"
+            ),
+        )
+
+        files = self._split(self._to_series(email_data["attachments"], index))
+        for column in bodies.columns:
+            text = bodies[column]
+            text = text[text.str.contains("{{", regex=False)]
+            if not text.empty:
+                images = text.str.extractall(INLINE_IMAGE_PATTERN)[0]
+                files = pd.concat([files, images.droplevel(1)])
+        if not files.empty:
+            sizes = {path: self._get_size(path) for path in files.unique()}
+            file_sizes = files.map(sizes)
+            too_large = f"Arquivo acima de {MAX_ATTACHMENT_BYTES // 2**20} MB: {{}}"
+            for mask, message in (
+                (file_sizes.isna(), "Arquivo não encontrado: {}"),
+                (file_sizes > MAX_ATTACHMENT_BYTES, too_large),
+            ):
+                bad = files[mask].groupby(level=0).first()
+                report(
+                    pd.Series(True, index=bad.index),
+                    lambda position, bad=bad, message=message: message.format(
+                        bad[position]
+                    ),
+                )
+        return problems
+
+    @staticmethod
+    def _to_series(values: list, index: pd.Index) -> pd.Series:
+        """
+        Converts a column of the email data to a string Series.
+
+        Args:
+            values (list): The column values; may be shorter than the index when
+                an optional column is missing.
+            index (pd.Index): The positions of the rows.
+
+        Returns:
+            pd.Series: The column, with missing values as empty strings.
+        """
+        return pd.Series(values, dtype=object).reindex(index).fillna("").astype(str)
+
+    @staticmethod
+    def _is_empty(values: pd.Series) -> pd.Series:
+        """
+        Checks which cells are empty, the way pandas renders empty cells.
+
+        Args:
+            values (pd.Series): The column.
+
+        Returns:
+            pd.Series: True for the empty cells.
+        """
+        stripped = values.str.strip()
+        return (stripped == "") | (stripped.str.lower() == "nan")
+
+    def _split(self, values: pd.Series) -> pd.Series:
+        """
+        Splits a column of values separated by ';' into one value per entry,
+        indexed by the position of its row and skipping empty entries.
+
+        Args:
+            values (pd.Series): The column.
+
+        Returns:
+            pd.Series: The entries.
+        """
+        # Most cells hold a single value and skip the split
+        multiple = values.str.contains(";", regex=False)
+        entries = pd.concat(
+            [values[~multiple], values[multiple].str.split(";").explode()]
+        ).str.strip()
+        return entries[~self._is_empty(entries)]
+
+    @staticmethod
+    def _get_size(path: str) -> float:
+        """
+        Returns the size of a file.
+
+        Args:
+            path (str): The file path.
+
+        Returns:
+            float: The size in bytes, or NaN if the file does not exist.
+        """
+        try:
+            return float(os.path.getsize(path))
+        except OSError:
+            return float("nan")
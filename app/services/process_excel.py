@@ -1,16 +1,28 @@
 import logging
-from typing import Dict, List
+import time
+from typing import Dict, List, Optional
 
 import pandas as pd
 
 from app.config.settings import Settings
 from app.enum.excel_columns import ExcelColumns
 from app.exceptions import ExcelReadError
+from app.services import metrics
+from app.services.snapshot_cache import SnapshotCache
+from app.services.table_readers import TableReader, get_reader
+
+# Column of the cleaned rows holding the spreadsheet row number of each email
+ROW_COLUMN = "__row__"
+# Columns without which the emails cannot be built
+REQUIRED_COLUMNS = (ExcelColumns.SUBJECT, ExcelColumns.RECIPIENTS)
 
 
 class ExcelProcessor:
     """
     A class to process Excel files and extract email bodies, subjects, and recipients.
+
+    CSV, Parquet and Arrow files with the same columns are also accepted; the
+    reader is picked by the file extension.
     """
 
     def __init__(self, file_path: str, settings: Settings) -> None:
@@ -19,47 +31,123 @@ class ExcelProcessor:
         """
         self.file_path = file_path
         self.settings = settings
-        self.xls = None
+        self.reader: Optional[TableReader] = None
 
     def process_excel(self) -> Dict[str, List[str]]:
         """
-        Processes the Excel file and extracts email bodies, subjects, and recipients.
+        Processes the Excel file and extracts email bodies, subjects, recipients, and
+        attachments. The attachments column is optional.
 
         Returns:
-            Dict[str, List[str]]: A dictionary with email bodies, subjects, and recipients.
+            Dict[str, List[str]]: A dictionary with email bodies, subjects, recipients,
+            and the spreadsheet row number of each email.
 
         Raises:
             ExcelReadError: If there is an error reading the Excel file.
         """
         try:
-            self.xls = pd.ExcelFile(self.file_path)
             email_data = {
                 "bodies": [],
                 "subjects": [],
                 "recipients": [],
                 "cc": [],
                 "cco": [],
+                "attachments": [],
+                "rows": [],
             }
 
-            df = pd.read_excel(self.xls, sheet_name=self.xls.sheet_names[0])
-            df = self._filter_invalid_rows(df)
+            started = time.perf_counter()
+            df = self._load_rows()
+            metrics.PARSE_SECONDS.inc(time.perf_counter() - started)
+            metrics.ROWS_PARSED.inc(len(df))
             email_data["bodies"] = self._extract_email_bodies(df)
-            email_data["subjects"] = df[ExcelColumns.SUBJECT.value].astype(str).tolist()
-            email_data["recipients"] = (
-                df[ExcelColumns.RECIPIENTS.value].astype(str).tolist()
-            )
-            email_data["cc"] = (
-                df.get(ExcelColumns.CC.value, pd.Series([])).astype(str).tolist()
-            )
-            email_data["cco"] = (
-                df.get(ExcelColumns.CCO.value, pd.Series([])).astype(str).tolist()
+            email_data["subjects"] = df[ExcelColumns.SUBJECT.value].tolist()
+            email_data["recipients"] = df[ExcelColumns.RECIPIENTS.value].tolist()
+            email_data["cc"] = df.get(ExcelColumns.CC.value, pd.Series([])).tolist()
+            email_data["cco"] = df.get(ExcelColumns.CCO.value, pd.Series([])).tolist()
+            email_data["attachments"] = (
+                df[ExcelColumns.ATTACHMENTS.value].tolist()
+                if ExcelColumns.ATTACHMENTS.value in df.columns
+                else [""] * len(df)
             )
+            email_data["rows"] = df[ROW_COLUMN].tolist()
 
             return email_data
         except Exception as e:
             logging.error(f"Error reading Excel file: {e}")
             raise ExcelReadError(f"Error reading Excel file: {e}")
 
+    def _load_rows(self) -> pd.DataFrame:
+        """
+        Loads the cleaned rows of the file, from its snapshot when the same file
+        was already parsed, or by parsing it and storing the snapshot otherwise.
+
+        Returns:
+            pd.DataFrame: The valid rows, with the email columns as strings and the
+            spreadsheet row number of each email.
+
+        Raises:
+            ExcelReadError: If the subject or recipients column is missing.
+        """
+        self.reader = get_reader(self.file_path, self.settings)
+        snapshot_cache = SnapshotCache.for_settings(self.settings)
+        key = None
+        if snapshot_cache.enabled:
+            key = snapshot_cache.key(
+                self.file_path, self.settings.INVALID_VALUES, self.reader.options()
+            )
+            df = snapshot_cache.load(key)
+            if df is not None:
+                logging.info(f"Usando o snapshot em cache de {self.file_path}")
+                return df
+
+        df = self._clean_rows(self._filter_invalid_rows(self.reader.read()))
+        # Only complete tables are stored, so a file parsed with wrong settings
+        # fails again once they are fixed instead of coming back from the cache
+        missing = [
+            column.value
+            for column in REQUIRED_COLUMNS
+            if column.value not in df.columns
+        ]
+        if missing:
+            raise ExcelReadError(f"Missing required columns: {', '.join(missing)}")
+        if key is not None:
+            snapshot_cache.store(key, df)
+        return df
+
+    def _clean_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Keeps the email columns of the valid rows, as strings without NUL
+        characters, along with the spreadsheet row number of each row.
+
+        Args:
+            df (pd.DataFrame): The valid rows.
+
+        Returns:
+            pd.DataFrame: The cleaned rows.
+        """
+        columns = [
+            col
+            for col in df.columns
+            if col.startswith(ExcelColumns.BODY_PREFIX.value)
+            or col
+            in (
+                ExcelColumns.SUBJECT.value,
+                ExcelColumns.RECIPIENTS.value,
+                ExcelColumns.CC.value,
+                ExcelColumns.CCO.value,
+                ExcelColumns.ATTACHMENTS.value,
+            )
+        ]
+        cleaned = df[columns].astype(str)
+        # NUL characters, which CSV files can carry, are reserved for the blob
+        # placeholders of the JSON payloads
+        for column in columns:
+            cleaned[column] = cleaned[column].str.replace("\x00", "", regex=False)
+        # Spreadsheet row numbers: the header is row 1 and data starts at row 2
+        cleaned[ROW_COLUMN] = df.index + 2
+        return cleaned.reset_index(drop=True)
+
     def _filter_invalid_rows(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Filters out rows with invalid values in "CORPO E-MAIL" columns.
@@ -91,11 +179,11 @@ class ExcelProcessor:
         body_columns = [
             col for col in df.columns if col.startswith(ExcelColumns.BODY_PREFIX.value)
         ]
-        return df[body_columns].astype(str).values.tolist()
+        return df[body_columns].values.tolist()
 
     def close(self) -> None:
         """
         Closes the Excel file.
         """
-        if self.xls:
-            self.xls.close()
+        if self.reader:
+            self.reader.close()
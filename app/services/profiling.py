@@ -0,0 +1,281 @@
+import contextlib
+import cProfile
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from app.config.settings import Settings
+from app.enum.profile_mode import ProfileMode
+
+# Number of allocation sites listed in the memory report
+MEMORY_REPORT_LINES = 50
+
+# The session of the campaigns being profiled; None when profiling is off, which
+# makes span a constant-time no-op
+_session: Optional["ProfileSession"] = None
+_session_users = 0
+_session_lock = threading.Lock()
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class ProfileSession:
+    """
+    Collects the time and memory of the pipeline stages while campaigns run.
+
+    In SPANS mode only the duration of each span is recorded. In CAPTURE mode the
+    event loop thread and every span run on other threads are also profiled with
+    cProfile, allocations are traced with tracemalloc, and the reports are written
+    to a directory at the end of the session.
+
+    Attributes:
+        mode (ProfileMode): The profiling mode.
+        output_dir (str): The directory where CAPTURE mode writes its reports.
+        stages (Dict[str, Dict[str, float]]): The count, total and maximum seconds
+            and peak traced memory of each span name.
+    """
+
+    def __init__(self, mode: ProfileMode, output_dir: str) -> None:
+        """
+        Initializes the ProfileSession instance without starting it.
+        """
+        self.mode = mode
+        self.output_dir = output_dir
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._thread_id = threading.get_ident()
+        self._profiler: Optional[cProfile.Profile] = None
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._open_spans = 0
+        self._started = 0.0
+
+    @property
+    def capturing(self) -> bool:
+        """
+        Whether cProfile and tracemalloc are active.
+
+        Returns:
+            bool: True in CAPTURE mode.
+        """
+        return self.mode is ProfileMode.CAPTURE
+
+    def start(self) -> None:
+        """
+        Starts the session and, in CAPTURE mode, the profilers.
+        """
+        self._started = time.perf_counter()
+        if self.capturing:
+            tracemalloc.start()
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self) -> Dict[str, Dict[str, float]]:
+        """
+        Stops the session, logs the summary of each stage and, in CAPTURE mode,
+        writes the reports.
+
+        Returns:
+            Dict[str, Dict[str, float]]: The figures of each stage.
+        """
+        elapsed = time.perf_counter() - self._started
+        if self._profiler is not None:
+            self._profiler.disable()
+        snapshot = None
+        if self.capturing:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        self._log_summary(elapsed)
+        if self.capturing:
+            self._write_reports(snapshot)
+        return self.stages
+
+    def open_span(self) -> Optional[cProfile.Profile]:
+        """
+        Marks a span as started, resetting the memory peak when no other span is
+        open and profiling spans run outside the event loop thread.
+
+        Returns:
+            Optional[cProfile.Profile]: The profiler of the span thread, if any.
+        """
+        if not self.capturing:
+            return None
+        with self._lock:
+            if self._open_spans == 0:
+                tracemalloc.reset_peak()
+            self._open_spans += 1
+        if threading.get_ident() == self._thread_id:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one profiler may be active at a time on newer interpreters
+            return None
+        return profiler
+
+    def close_span(
+        self, name: str, seconds: float, profiler: Optional[cProfile.Profile]
+    ) -> None:
+        """
+        Records a finished span.
+
+        Args:
+            name (str): The name of the span.
+            seconds (float): The duration of the span.
+            profiler (Optional[cProfile.Profile]): The profiler of the span thread.
+        """
+        peak = 0
+        if self.capturing:
+            peak = tracemalloc.get_traced_memory()[1]
+            if profiler is not None:
+                profiler.disable()
+        with self._lock:
+            stage = self.stages.setdefault(
+                name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "peak_mb": 0.0}
+            )
+            stage["count"] += 1
+            stage["seconds"] += seconds
+            stage["max_seconds"] = max(stage["max_seconds"], seconds)
+            stage["peak_mb"] = max(stage["peak_mb"], peak / 1024 / 1024)
+            if self.capturing:
+                self._open_spans -= 1
+                if profiler is not None:
+                    self._thread_profiles.append(profiler)
+
+    def _log_summary(self, elapsed: float) -> None:
+        """
+        Logs the figures of each stage.
+
+        Args:
+            elapsed (float): The duration of the session.
+        """
+        logging.info(f"Perfil da campanha: {elapsed:.3f}s no total")
+        for name, stage in sorted(
+            self.stages.items(), key=lambda item: -item[1]["seconds"]
+        ):
+            logging.info(
+                f"  {name:<16} {stage['count']:>7}x {stage['seconds']:>9.3f}s "
+                f"(média {stage['seconds'] / stage['count'] * 1000:.2f}ms, "
+                f"máx {stage['max_seconds'] * 1000:.2f}ms"
+                + (f", pico {stage['peak_mb']:.1f} MB)" if self.capturing else ")")
+            )
+
+    def _write_reports(self, snapshot: tracemalloc.Snapshot) -> None:
+        """
+        Writes the merged cProfile statistics, the allocation report and the stage
+        summary.
+
+        Args:
+            snapshot (tracemalloc.Snapshot): The allocations at the end of the run.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        stats = pstats.Stats(self._profiler)
+        for profiler in self._thread_profiles:
+            stats.add(profiler)
+        stats.dump_stats(os.path.join(self.output_dir, "profile.prof"))
+        with open(
+            os.path.join(self.output_dir, "memory.txt"), "w", encoding="utf-8"
+        ) as report:
+            for statistic in snapshot.statistics("lineno")[:MEMORY_REPORT_LINES]:
+                report.write(f"{statistic}\n")
+        with open(
+            os.path.join(self.output_dir, "summary.json"), "w", encoding="utf-8"
+        ) as summary:
+            json.dump(self.stages, summary, indent=2)
+        logging.info(f"Perfil gravado em {self.output_dir}")
+
+
+class _Span:
+    """
+    Times a block of code and records it in the profile session.
+    """
+
+    __slots__ = ("session", "name", "started", "profiler")
+
+    def __init__(self, session: ProfileSession, name: str) -> None:
+        """
+        Initializes the _Span instance with the session and the stage name.
+        """
+        self.session = session
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        """
+        Starts timing the block.
+
+        Returns:
+            _Span: The span.
+        """
+        self.profiler = self.session.open_span()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Records the duration of the block, whether or not it raised.
+        """
+        self.session.close_span(
+            self.name, time.perf_counter() - self.started, self.profiler
+        )
+
+
+def span(name: str) -> contextlib.AbstractContextManager:
+    """
+    Returns a context manager that times a stage of the pipeline. It does nothing
+    when no profile session is active.
+
+    Args:
+        name (str): The name of the stage.
+
+    Returns:
+        contextlib.AbstractContextManager: The span.
+    """
+    session = _session
+    if session is None:
+        return _NULL_SPAN
+    return _Span(session, name)
+
+
+@contextlib.contextmanager
+def profile_session(settings: Settings) -> Iterator[Optional[ProfileSession]]:
+    """
+    Profiles the pipeline according to PROFILE_MODE while the block runs.
+    Campaigns that run at the same time share one session, which ends with the
+    last of them.
+
+    Args:
+        settings (Settings): The application settings.
+
+    Yields:
+        Optional[ProfileSession]: The session, or None if profiling is off.
+    """
+    global _session, _session_users
+    mode = ProfileMode(settings.PROFILE_MODE)
+    if mode is ProfileMode.OFF:
+        yield None
+        return
+    with _session_lock:
+        if _session is None:
+            output_dir = os.path.join(
+                settings.DATA_DIR,
+                "profiles",
+                datetime.now().strftime("%Y%m%d-%H%M%S-%f"),
+            )
+            _session = ProfileSession(mode, output_dir)
+            _session.start()
+        _session_users += 1
+        session = _session
+    try:
+        yield session
+    finally:
+        with _session_lock:
+            _session_users -= 1
+            if _session_users == 0:
+                _session = None
+                session.stop()
+
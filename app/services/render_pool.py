@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Deque, Dict, Optional, Tuple
+
+from app.config.settings import Settings
+from app.services import profiling
+from app.services.email_formatter import EmailFormatter
+from app.services.runtime_knobs import RuntimeKnobs
+
+# Campaigns with fewer rows are rendered in the workbook thread, where starting
+# the worker processes would cost more than it saves
+POOL_MIN_ROWS = 2000
+# Rendering time aimed at for each chunk: long enough to amortize the transfer of
+# the rows to a worker, short enough for the first emails to be sent early
+TARGET_CHUNK_SECONDS = 0.1
+MIN_CHUNK_ROWS = 16
+MAX_CHUNK_ROWS = 20_000
+# Weight of the last chunk in the moving average of the render cost per row
+COST_SMOOTHING = 0.3
+
+
+def render_chunk(
+    settings: Settings, email_data: Dict[str, list], formats: Dict[str, Dict[str, str]]
+) -> Tuple[Dict[str, list], float]:
+    """
+    Formats a chunk of rows. Runs in the worker processes or in the workbook thread.
+
+    Args:
+        settings (Settings): The application settings.
+        email_data (Dict[str, list]): The raw email data of the chunk.
+        formats (Dict[str, Dict[str, str]]): The formats of each body part.
+
+    Returns:
+        Tuple[Dict[str, list], float]: The formatted email data of the chunk and the
+        seconds spent formatting it.
+    """
+    started = time.perf_counter()
+    with profiling.span("format"):
+        formatted = EmailFormatter(settings).format_emails(email_data, formats)
+    return formatted, time.perf_counter() - started
+
+
+class RenderJob:
+    """
+    The rendering of one campaign, streamed back chunk by chunk in row order.
+
+    A window of chunks is kept in flight on the executor. The size of each new
+    chunk is derived from the render cost per row measured on the previous ones,
+    so chunks take about TARGET_CHUNK_SECONDS whatever the size of the bodies,
+    unless the chunk size of the knobs is set.
+
+    Attributes:
+        settings (Settings): The application settings.
+        executor (Executor): The executor the chunks are rendered on.
+        window (int): The number of chunks kept in flight.
+        chunk_size (int): The number of rows of the next chunk.
+        knobs (Optional[RuntimeKnobs]): The tuning values changed while rendering.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        executor: Executor,
+        window: int,
+        email_data: Dict[str, list],
+        formats: Dict[str, Dict[str, str]],
+        knobs: Optional[RuntimeKnobs] = None,
+    ) -> None:
+        """
+        Initializes the RenderJob instance and submits the first chunks right
+        away, so rendering overlaps with whatever the caller awaits next.
+        """
+        self.settings = settings
+        self.executor = executor
+        self.window = window
+        self.chunk_size = max(MIN_CHUNK_ROWS, settings.FORMAT_CHUNK_SIZE)
+        self.knobs = knobs
+        self._email_data = email_data
+        self._formats = formats
+        self._total = len(email_data["bodies"])
+        self._next_row = 0
+        self._row_cost: Optional[float] = None
+        self._pending: Deque[Tuple[asyncio.Future, int]] = deque()
+        self._loop = asyncio.get_running_loop()
+        self._submit()
+
+    def __aiter__(self) -> "RenderJob":
+        """
+        Returns the job itself, which iterates over its formatted chunks.
+
+        Returns:
+            RenderJob: The job.
+        """
+        return self
+
+    async def __anext__(self) -> Dict[str, list]:
+        """
+        Waits for the next chunk in row order and submits new chunks to refill the
+        window.
+
+        Returns:
+            Dict[str, list]: The formatted email data of the chunk.
+
+        Raises:
+            StopAsyncIteration: When every chunk was returned.
+        """
+        if not self._pending:
+            raise StopAsyncIteration
+        future, rows = self._pending.popleft()
+        formatted, seconds = await future
+        self._update_chunk_size(seconds / rows)
+        self._submit()
+        return formatted
+
+    def cancel(self) -> None:
+        """
+        Cancels the chunks that have not started rendering.
+        """
+        for future, _ in self._pending:
+            future.cancel()
+        self._pending.clear()
+
+    def _submit(self) -> None:
+        """
+        Submits chunks until the window is full or every row was submitted.
+        """
+        chunk_size = self.chunk_size
+        if self.knobs is not None and self.knobs.chunk_size:
+            chunk_size = self.knobs.chunk_size
+        while len(self._pending) < self.window and self._next_row < self._total:
+            # The remaining rows are spread over the window, so the last chunks
+            # still keep every worker busy
+            remaining = self._total - self._next_row
+            size = max(MIN_CHUNK_ROWS, min(chunk_size, -(-remaining // self.window)))
+            start, end = self._next_row, self._next_row + size
+            chunk = {key: values[start:end] for key, values in self._email_data.items()}
+            future = self._loop.run_in_executor(
+                self.executor, render_chunk, self.settings, chunk, self._formats
+            )
+            self._pending.append((future, len(chunk["bodies"])))
+            self._next_row = end
+
+    def _update_chunk_size(self, row_cost: float) -> None:
+        """
+        Folds the cost per row of a finished chunk into the moving average and
+        sizes the next chunks from it.
+
+        Args:
+            row_cost (float): The seconds spent per row on the finished chunk.
+        """
+        if self._row_cost is None:
+            self._row_cost = row_cost
+        else:
+            self._row_cost += COST_SMOOTHING * (row_cost - self._row_cost)
+        if self._row_cost > 0:
+            self.chunk_size = int(
+                min(
+                    MAX_CHUNK_ROWS,
+                    max(MIN_CHUNK_ROWS, TARGET_CHUNK_SECONDS / self._row_cost),
+                )
+            )
+
+
+class RenderPool:
+    """
+    Renders email bodies on RENDER_WORKERS worker processes, so formatting large
+    campaigns uses every core and leaves the event loop thread free to handle the
+    HTTP responses. The processes are started on first use and kept across
+    campaigns.
+
+    Attributes:
+        settings (Settings): The application settings.
+        workers (int): The number of worker processes.
+        knobs (Optional[RuntimeKnobs]): The tuning values changed while rendering.
+    """
+
+    def __init__(
+        self, settings: Settings, knobs: Optional[RuntimeKnobs] = None
+    ) -> None:
+        """
+        Initializes the RenderPool instance without starting any process.
+        """
+        self.settings = settings
+        self.workers = settings.RENDER_WORKERS
+        self.knobs = knobs
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(
+        self,
+        email_data: Dict[str, list],
+        formats: Dict[str, Dict[str, str]],
+        fallback: Executor,
+    ) -> RenderJob:
+        """
+        Starts rendering the rows of a campaign.
+
+        Args:
+            email_data (Dict[str, list]): The raw email data.
+            formats (Dict[str, Dict[str, str]]): The formats of each body part.
+            fallback (Executor): The executor used when the campaign is too small
+                for the worker processes or they are disabled.
+
+        Returns:
+            RenderJob: The rendering, iterated chunk by chunk.
+        """
+        if self.workers > 1 and len(email_data["bodies"]) >= POOL_MIN_ROWS:
+            return RenderJob(
+                self.settings,
+                self._get_executor(),
+                self.workers * 2,
+                email_data,
+                formats,
+                self.knobs,
+            )
+        return RenderJob(self.settings, fallback, 2, email_data, formats, self.knobs)
+
+    async def render_all(
+        self,
+        email_data: Dict[str, list],
+        formats: Dict[str, Dict[str, str]],
+        fallback: Executor,
+    ) -> Dict[str, list]:
+        """
+        Renders every row of a campaign and joins the chunks.
+
+        Args:
+            email_data (Dict[str, list]): The raw email data.
+            formats (Dict[str, Dict[str, str]]): The formats of each body part.
+            fallback (Executor): The executor used when the campaign is too small
+                for the worker processes or they are disabled.
+
+        Returns:
+            Dict[str, list]: The formatted email data.
+        """
+        job = self.start(email_data, formats, fallback)
+        try:
+            chunks = [chunk async for chunk in job]
+        finally:
+            job.cancel()
+        if not chunks:
+            return render_chunk(self.settings, email_data, formats)[0]
+        return {
+            key: [value for chunk in chunks for value in chunk[key]]
+            for key in chunks[0]
+        }
+
+    def close(self) -> None:
+        """
+        Stops the worker processes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """
+        Returns the process pool, starting it on first use.
+
+        Returns:
+            ProcessPoolExecutor: The process pool.
+        """
+        if self._executor is None:
+            logging.info(f"Iniciando {self.workers} processos de formatação")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
@@ -0,0 +1,177 @@
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from openpyxl import Workbook, load_workbook
+
+from app.enum.result_write_back import ResultWriteBack
+from app.enum.send_status import SendStatus
+
+# Columns appended to the rows of the workbook
+RESULT_COLUMNS = ["STATUS ENVIO", "ERRO ENVIO", "REMETENTE", "DATA ENVIO"]
+# First column of the sidecar sheet, holding the spreadsheet row of each result
+ROW_COLUMN = "LINHA"
+RESULT_SUFFIX = "_resultado"
+# Workbooks openpyxl can stream; the other inputs get a sidecar sheet
+ANNOTATABLE_EXTENSIONS = (".xlsx", ".xlsm")
+# Largest text Excel accepts in a cell
+MAX_CELL_CHARS = 32767
+
+ResultCells = Tuple[str, Optional[str], Optional[str], Optional[datetime]]
+
+
+class ResultWriter:
+    """
+    Writes the result of each row of a campaign to <file>_resultado.xlsx, next to
+    the spreadsheet.
+
+    In ANNOTATE mode, the first sheet of the workbook is streamed row by row from
+    openpyxl read-only mode into a write-only workbook, with the result columns
+    appended, so memory stays flat however large the workbook is. Only the values
+    are copied, not the formatting. Inputs openpyxl cannot read, such as CSV, and
+    SIDECAR mode get a sheet holding only the row number and the result columns.
+
+    Attributes:
+        mode (ResultWriteBack): Where the results are written.
+    """
+
+    def __init__(self, mode: ResultWriteBack) -> None:
+        """
+        Initializes the ResultWriter instance with the write-back mode.
+        """
+        self.mode = mode
+
+    def write(self, file_path: str, results: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Writes the results of a campaign.
+
+        Args:
+            file_path (str): The path to the spreadsheet of the campaign.
+            results (List[Dict[str, Any]]): The result of each email.
+
+        Returns:
+            Optional[str]: The path of the written workbook, or None if write-back
+            is off.
+        """
+        if self.mode is ResultWriteBack.OFF:
+            return None
+        stem, extension = os.path.splitext(file_path)
+        output_path = f"{stem}{RESULT_SUFFIX}.xlsx"
+        cells = self._group(results)
+        if (
+            self.mode is ResultWriteBack.ANNOTATE
+            and extension.lower() in ANNOTATABLE_EXTENSIONS
+        ):
+            self._annotate(file_path, output_path, cells)
+        else:
+            self._write_sidecar(output_path, cells)
+        logging.info(f"Resultado de {len(cells)} linhas gravado em {output_path}")
+        return output_path
+
+    @staticmethod
+    def _group(results: List[Dict[str, Any]]) -> Dict[int, ResultCells]:
+        """
+        Merges the results of each row into its result cells. The copies of a
+        fanned-out row have one result each; their statuses and senders are
+        joined, and each error is prefixed with its recipients. A missing error,
+        sender or finish time leaves its cell empty.
+
+        Args:
+            results (List[Dict[str, Any]]): The result of each email.
+
+        Returns:
+            Dict[int, ResultCells]: The status, error, sender and finish time of
+            each row.
+        """
+        by_row: Dict[int, List[Dict[str, Any]]] = {}
+        for result in results:
+            by_row.setdefault(result["row"], []).append(result)
+
+        cells = {}
+        for row, row_results in by_row.items():
+            if len(row_results) == 1:
+                result = row_results[0]
+                status = result["status"]
+                error = result.get("error")
+                sender = result.get("sender")
+            else:
+                statuses = {result["status"] for result in row_results}
+                status = ", ".join(
+                    send_status.value
+                    for send_status in SendStatus
+                    if send_status.value in statuses
+                )
+                error = "; ".join(
+                    f"{result['recipients']}: {result['error']}"
+                    for result in row_results
+                    if result.get("error")
+                )
+                sender = ", ".join(
+                    dict.fromkeys(
+                        result["sender"]
+                        for result in row_results
+                        if result.get("sender")
+                    )
+                )
+            finished = [
+                result["finished_at"]
+                for result in row_results
+                if result.get("finished_at") is not None
+            ]
+            cells[row] = (
+                status,
+                error[:MAX_CELL_CHARS] if error else None,
+                sender or None,
+                datetime.fromtimestamp(max(finished)) if finished else None,
+            )
+        return cells
+
+    @staticmethod
+    def _annotate(
+        source_path: str, output_path: str, cells: Dict[int, ResultCells]
+    ) -> None:
+        """
+        Copies the first sheet of a workbook with the result columns appended.
+
+        Args:
+            source_path (str): The path to the workbook.
+            output_path (str): The path of the annotated copy.
+            cells (Dict[int, ResultCells]): The result cells of each row.
+        """
+        source = load_workbook(source_path, read_only=True, data_only=True)
+        try:
+            sheet = source.worksheets[0]
+            output = Workbook(write_only=True)
+            output_sheet = output.create_sheet(sheet.title)
+            width = sheet.max_column or 0
+            empty = (None,) * len(RESULT_COLUMNS)
+            for row, values in enumerate(sheet.iter_rows(values_only=True), start=1):
+                if row == 1:
+                    # Workbooks saved without their dimensions report no width
+                    width = max(width, len(values))
+                # Short rows are padded so the result columns stay aligned
+                values = values + (None,) * (width - len(values))
+                if row == 1:
+                    output_sheet.append(values + tuple(RESULT_COLUMNS))
+                else:
+                    output_sheet.append(values + cells.get(row, empty))
+            output.save(output_path)
+        finally:
+            source.close()
+
+    @staticmethod
+    def _write_sidecar(output_path: str, cells: Dict[int, ResultCells]) -> None:
+        """
+        Writes a sheet holding the row number and the result cells of each row.
+
+        Args:
+            output_path (str): The path of the results workbook.
+            cells (Dict[int, ResultCells]): The result cells of each row.
+        """
+        output = Workbook(write_only=True)
+        sheet = output.create_sheet("Resultado")
+        sheet.append([ROW_COLUMN] + RESULT_COLUMNS)
+        for row in sorted(cells):
+            sheet.append((row,) + cells[row])
+        output.save(output_path)
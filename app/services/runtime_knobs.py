@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from app.config.settings import Settings
+from app.exceptions import RuntimeKnobError
+
+# Number of emails in flight when AIOHTTP_LIMIT is 0 (no connection limit)
+DEFAULT_CONCURRENCY = 100
+# Type and smallest accepted value of each knob
+KNOBS: Dict[str, Tuple[type, float]] = {
+    "concurrency": (int, 1),
+    "messages_per_minute": (float, 0),
+    "chunk_size": (int, 0),
+}
+
+
+class RuntimeKnobs:
+    """
+    The tuning values that can be changed while campaigns run, from the UI or from
+    the watched runtime config file. They start from the settings.
+
+    The send engine reads them between sends instead of being notified, so a
+    change never interrupts a request in flight: extra consumers start or idle
+    ones retire after their current email, and the mailbox rate applies to the
+    next slot taken.
+
+    Attributes:
+        concurrency (int): The number of emails in flight per campaign, within
+            the connection pool of AIOHTTP_LIMIT.
+        messages_per_minute (float): The send rate of each mailbox; 0 disables it.
+        chunk_size (int): The number of rows formatted per chunk; 0 sizes the
+            chunks from the measured formatting cost.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        """
+        Initializes the RuntimeKnobs instance from the settings.
+        """
+        self.concurrency = settings.AIOHTTP_LIMIT or DEFAULT_CONCURRENCY
+        self.messages_per_minute = settings.MAILBOX_MESSAGES_PER_MINUTE
+        self.chunk_size = 0
+        self._lock = threading.Lock()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Returns the current value of each knob.
+
+        Returns:
+            Dict[str, Any]: The values, keyed by knob name.
+        """
+        return {name: getattr(self, name) for name in KNOBS}
+
+    def update(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validates and applies new knob values. Either every value is applied or
+        none is.
+
+        Args:
+            values (Dict[str, Any]): The new values, keyed by knob name.
+
+        Returns:
+            Dict[str, Any]: The knobs whose value changed, with their new value.
+
+        Raises:
+            RuntimeKnobError: If a knob is unknown or a value is invalid.
+        """
+        parsed = {}
+        for name, value in values.items():
+            if name not in KNOBS:
+                raise RuntimeKnobError(f"Unknown runtime knob: {name}")
+            knob_type, minimum = KNOBS[name]
+            try:
+                parsed[name] = knob_type(value)
+            except (TypeError, ValueError):
+                raise RuntimeKnobError(f"Invalid value for {name}: {value!r}")
+            if parsed[name] < minimum:
+                raise RuntimeKnobError(f"{name} must be at least {minimum}")
+
+        changed = {}
+        with self._lock:
+            for name, value in parsed.items():
+                if getattr(self, name) != value:
+                    logging.info(
+                        f"Ajuste em execução: {name} de {getattr(self, name)} "
+                        f"para {value}"
+                    )
+                    setattr(self, name, value)
+                    changed[name] = value
+        return changed
+
+
+class RuntimeConfigWatcher:
+    """
+    Applies the runtime config file to the knobs whenever it changes. The file is
+    a JSON object with any of the knob names, for example
+    {"concurrency": 20, "messages_per_minute": 15}. It is polled from a daemon
+    thread, comparing its modification time, so editing it from any tool works.
+
+    Attributes:
+        knobs (RuntimeKnobs): The knobs to update.
+        path (str): The path to the runtime config file.
+        interval (float): The number of seconds between two checks of the file.
+    """
+
+    def __init__(self, knobs: RuntimeKnobs, path: str, interval: float) -> None:
+        """
+        Initializes the RuntimeConfigWatcher instance without starting it.
+        """
+        self.knobs = knobs
+        self.path = path
+        self.interval = interval
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Applies the current file, if any, and starts watching it.
+        """
+        self.check()
+        self._thread = threading.Thread(
+            target=self._run, name="runtime-config", daemon=True
+        )
+        self._thread.start()
+        logging.info(f"Ajustes em execução lidos de {self.path}")
+
+    def stop(self) -> None:
+        """
+        Stops watching the file.
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def check(self) -> bool:
+        """
+        Applies the file if it changed since the last check. Invalid files are
+        logged and ignored, leaving the knobs as they were.
+
+        Returns:
+            bool: True if the file changed, False otherwise.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._stamp = None
+            return False
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                values = json.load(file)
+            if not isinstance(values, dict):
+                raise RuntimeKnobError("The runtime config must be a JSON object")
+            self.knobs.update(values)
+        except (OSError, ValueError, RuntimeKnobError) as e:
+            logging.error(f"Erro ao ler os ajustes em execução de {self.path}: {e}")
+        return True
+
+    def _run(self) -> None:
+        """
+        Checks the file every interval until stop is called.
+        """
+        while not self._stop.wait(self.interval):
+            self.check()
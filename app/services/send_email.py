@@ -1,12 +1,39 @@
 import asyncio
 import logging
-from typing import List
+import time
+from typing import (
+    Any,
+    AsyncIterable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Union,
+)
 
 import aiohttp
 
 from app.config.settings import Settings
 from app.enum.email_recipient_type import EmailRecipientType
-from app.exceptions import EmailSendError
+from app.enum.mailbox_balancing_strategy import MailboxBalancingStrategy
+from app.enum.send_status import SendStatus
+from app.exceptions import EmailSendError, SendQuotaExceededError
+from app.services.attachment_cache import AttachmentCache
+from app.services.attachment_uploader import AttachmentUploader
+from app.services.fair_share import JobShare
+from app.services.http_session import HttpSessionManager
+from app.services.json_payload import blob_reference, encode_json
+from app.services import metrics, profiling
+from app.services.mailbox_pool import (
+    THROTTLING_STATUSES,
+    MailboxPool,
+    get_retry_after,
+)
+from app.services.runtime_knobs import DEFAULT_CONCURRENCY, RuntimeKnobs
+from app.services.send_scheduler import SendScheduler, count_recipients
 
 
 class EmailSender:
@@ -20,29 +47,70 @@ class EmailSender:
     api_scope : str
         The API scope for authentication.
     user_email : str
-        The user email for authentication.
+        The sender mailboxes, separated by ';', each optionally followed by ':' and
+        its weight.
     settings : Settings
         The application settings.
+    session_manager : Optional[HttpSessionManager]
+        The long-lived HTTP session shared across campaigns.
+    attachment_cache : AttachmentCache
+        The base64 encodings of the attachments, shared by every row of the campaign.
+    attachment_uploader : AttachmentUploader
+        Encodes small attachments and uploads large ones through upload sessions.
+    mailbox_pool : MailboxPool
+        The pool that distributes emails across the sender mailboxes.
+    job_share : Optional[JobShare]
+        The share of the campaign in the concurrency budget of the job queue.
+    knobs : Optional[RuntimeKnobs]
+        The tuning values changed while the campaign runs.
 
     Methods
     -------
-    __init__(access_token: str, api_scope: str, user_email: str, settings: Settings):
+    __init__(access_token: str, api_scope: str, user_email: str, settings: Settings, session_manager: Optional[HttpSessionManager], scheduler: Optional[SendScheduler], job_share: Optional[JobShare], knobs: Optional[RuntimeKnobs]):
         Initializes the EmailSender instance with the access token, API scope, user email, and settings.
 
-    async send_emails(bodies: List[str], subjects: List[str], recipients: List[str], cc: List[str], cco: List[str]) -> None:
-        Sends emails asynchronously using aiohttp.
+    async send_emails(bodies: List[str], subjects: List[str], recipients: List[str], cc: List[str], cco: List[str], rows: Optional[List[int]], progress_callback: Optional[Callable], attachments: Optional[List[str]], inline_images: Optional[List[List[str]]]) -> List[Dict[str, Any]]:
+        Sends emails asynchronously using aiohttp and returns the result of each row.
+
+    async send_messages(messages: Union[Iterable, AsyncIterable], progress_callback: Optional[Callable]) -> List[Dict[str, Any]]:
+        Sends a lazily consumed stream of emails and returns the result of each row.
+
+    build_payload(body: str, subject: str, recipients: str, cc: str, cco: str) -> Dict[str, Any]:
+        Builds the Graph API sendMail payload for a single email.
     """
 
     def __init__(
-        self, access_token: str, api_scope: str, user_email: str, settings: Settings
+        self,
+        access_token: str,
+        api_scope: str,
+        user_email: str,
+        settings: Settings,
+        session_manager: Optional[HttpSessionManager] = None,
+        scheduler: Optional[SendScheduler] = None,
+        job_share: Optional[JobShare] = None,
+        knobs: Optional[RuntimeKnobs] = None,
     ) -> None:
         """
         Initializes the EmailSender instance with the access token, API scope, user email, and settings.
+        Without a session manager, each call to send_emails opens and closes its own session.
+        Without a scheduler, emails are sent as fast as Graph accepts them.
+        With a job share, each send also holds a slot of the concurrency budget shared
+        with the other queued campaigns.
+        With knobs, the number of emails in flight follows their concurrency while
+        sending; otherwise it is fixed by AIOHTTP_LIMIT.
         """
         self.access_token = access_token
         self.api_scope = api_scope
         self.user_email = user_email
         self.settings = settings
+        self.session_manager = session_manager
+        self.job_share = job_share
+        self.knobs = knobs
+        self.attachment_cache = AttachmentCache(settings.ATTACHMENT_CACHE_MAX_BYTES)
+        self.attachment_uploader = AttachmentUploader(settings, self.attachment_cache)
+        self.mailbox_pool = MailboxPool.from_string(
+            user_email, MailboxBalancingStrategy(settings.MAILBOX_BALANCING), scheduler
+        )
 
     async def send_emails(
         self,
@@ -51,28 +119,237 @@ class EmailSender:
         recipients: List[str],
         cc: List[str],
         cco: List[str],
-    ) -> None:
+        rows: Optional[List[int]] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        attachments: Optional[List[str]] = None,
+        inline_images: Optional[List[List[str]]] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Sends emails asynchronously using aiohttp.
 
+        A failure to send one email does not stop the others; it is recorded in the
+        result of its row instead.
+
         Args:
             bodies (List[str]): The list of email bodies.
             subjects (List[str]): The list of email subjects.
             recipients (List[str]): The list of email recipients.
             cc (List[str]): The list of email CC recipients.
             cco (List[str]): The list of email CCO recipients.
+            rows (Optional[List[int]]): The spreadsheet row number of each email.
+                Defaults to the position of the email in the lists.
+            progress_callback (Optional[Callable[[Dict[str, Any]], None]]): Called
+                with the result of each row as soon as it is known.
+            attachments (Optional[List[str]]): The attachment file paths of each
+                email, separated by ';'.
+            inline_images (Optional[List[List[str]]]): The paths of the images
+                embedded in each email body.
 
-        Raises:
-            EmailSendError: If there is an error sending the emails.
+        Returns:
+            List[Dict[str, Any]]: The result of each row, ordered by row number, with
+            the keys "row", "status", "recipients", "sender" and "error".
+        """
+        if rows is None:
+            rows = list(range(len(bodies)))
+        if attachments is None:
+            attachments = [""] * len(bodies)
+        if inline_images is None:
+            inline_images = [[] for _ in bodies]
+        messages = (
+            {
+                "row": rows[i],
+                "body": body,
+                "subject": subject,
+                "recipients": recipient,
+                "cc": cc[i],
+                "cco": cco[i],
+                "attachments": attachments[i],
+                "inline_images": inline_images[i],
+            }
+            for i, (body, subject, recipient) in enumerate(
+                zip(bodies, subjects, recipients)
+            )
+        )
+        return await self.send_messages(messages, progress_callback)
+
+    async def send_messages(
+        self,
+        messages: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Sends a stream of emails, consuming it lazily so that sending starts as soon
+        as the first message is available. At most AIOHTTP_LIMIT emails, or the
+        concurrency of the knobs, are in flight at once.
+
+        Each consumer task sends one email at a time. Between two emails, consumers
+        are added when the concurrency was raised, and retired when it was lowered,
+        so no request in flight is interrupted.
+
+        Args:
+            messages (Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]):
+                The emails to send, each with the keys "row", "body", "subject",
+                "recipients", "cc", "cco" and, optionally, "attachments",
+                "inline_images" and "body_blob".
+            progress_callback (Optional[Callable[[Dict[str, Any]], None]]): Called
+                with the result of each row as soon as it is known.
+
+        Returns:
+            List[Dict[str, Any]]: The result of each row, ordered by row number.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._concurrency() * 2)
+        results: List[Dict[str, Any]] = []
+        consumers: Set[asyncio.Task] = set()
+
+        async def produce() -> None:
+            try:
+                if hasattr(messages, "__aiter__"):
+                    async for message in messages:
+                        await queue.put(message)
+                        metrics.SEND_QUEUE_DEPTH.inc()
+                else:
+                    for message in messages:
+                        await queue.put(message)
+                        metrics.SEND_QUEUE_DEPTH.inc()
+            finally:
+                await queue.put(None)
+
+        async def consume(session: aiohttp.ClientSession) -> None:
+            try:
+                while (message := await queue.get()) is not None:
+                    metrics.SEND_QUEUE_DEPTH.dec()
+                    results.append(
+                        await self._send_row(session, message, progress_callback)
+                    )
+                    if len(consumers) > self._concurrency():
+                        return
+                    resize(session)
+                # The end marker is passed on to the next consumer
+                queue.put_nowait(None)
+            finally:
+                consumers.discard(asyncio.current_task())
+
+        def resize(session: aiohttp.ClientSession) -> None:
+            concurrency = self._concurrency()
+            if self.job_share is not None:
+                self.job_share.limiter.resize(concurrency)
+            while len(consumers) < concurrency:
+                consumers.add(asyncio.create_task(consume(session)))
+
+        session_manager = self.session_manager or HttpSessionManager(self.settings)
+        try:
+            session = await session_manager.get_session()
+            producer = asyncio.create_task(produce())
+            resize(session)
+            try:
+                while consumers or not producer.done():
+                    waiting = set(consumers)
+                    if not producer.done():
+                        waiting.add(producer)
+                    done, _ = await asyncio.wait(
+                        waiting, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        task.result()
+                producer.result()
+            except BaseException:
+                for task in [producer, *consumers]:
+                    task.cancel()
+                raise
+        finally:
+            if session_manager is not self.session_manager:
+                await session_manager.close()
+        results.sort(key=lambda result: result["row"])
+        return results
+
+    def _concurrency(self) -> int:
+        """
+        Returns the number of emails to keep in flight.
+
+        Returns:
+            int: The concurrency of the knobs, or AIOHTTP_LIMIT without knobs.
+        """
+        if self.knobs is not None:
+            return self.knobs.concurrency
+        return self.settings.AIOHTTP_LIMIT or DEFAULT_CONCURRENCY
+
+    async def _send_row(
+        self,
+        session: aiohttp.ClientSession,
+        message: Dict[str, Any],
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]],
+    ) -> Dict[str, Any]:
+        """
+        Sends the email of a single row and records its outcome.
+
+        Args:
+            session (aiohttp.ClientSession): The aiohttp client session.
+            message (Dict[str, Any]): The email to send.
+            progress_callback (Optional[Callable[[Dict[str, Any]], None]]): Called
+                with the result of the row.
+
+        Returns:
+            Dict[str, Any]: The result of the row.
+        """
+        result = {
+            "row": message["row"],
+            "status": SendStatus.SENT.value,
+            "recipients": message["recipients"],
+            "sender": None,
+            "error": None,
+            "finished_at": None,
+        }
+        try:
+            if self.job_share is None:
+                result["sender"] = await self._send_message(session, message)
+            else:
+                async with self.job_share:
+                    result["sender"] = await self._send_message(session, message)
+        except EmailSendError as e:
+            result["status"] = SendStatus.FAILED.value
+            result["error"] = str(e)
+        except SendQuotaExceededError as e:
+            result["status"] = SendStatus.DEFERRED.value
+            result["error"] = str(e)
+        result["finished_at"] = time.time()
+        self._count_result(result)
+        if progress_callback:
+            progress_callback(result)
+        return result
+
+    def _count_result(self, result: Dict[str, Any]) -> None:
         """
-        async with aiohttp.ClientSession() as session:
-            tasks = [
-                self._send_email(session, body, subject, recipient, cc[i], cco[i])
-                for i, (body, subject, recipient) in enumerate(
-                    zip(bodies, subjects, recipients)
-                )
-            ]
-            await asyncio.gather(*tasks)
+        Counts the outcome of a row in the metrics.
+
+        Args:
+            result (Dict[str, Any]): The result of the row.
+        """
+        metrics.MESSAGES[result["status"]].inc()
+
+    async def _send_message(
+        self, session: aiohttp.ClientSession, message: Dict[str, Any]
+    ) -> str:
+        """
+        Sends the email of a message dictionary.
+
+        Args:
+            session (aiohttp.ClientSession): The aiohttp client session.
+            message (Dict[str, Any]): The email to send.
+
+        Returns:
+            str: The address of the mailbox that sent the email.
+        """
+        return await self._send_email(
+            session,
+            message["body"],
+            message["subject"],
+            message["recipients"],
+            message["cc"],
+            message["cco"],
+            message.get("attachments", ""),
+            message.get("inline_images", ()),
+            message.get("body_blob"),
+        )
 
     async def _send_email(
         self,
@@ -82,9 +359,16 @@ class EmailSender:
         recipients: str,
         cc: str,
         cco: str,
-    ) -> None:
+        attachments: str = "",
+        inline_images: Sequence[str] = (),
+        body_blob: Optional[bytes] = None,
+    ) -> str:
         """
-        Sends a single email using aiohttp.
+        Sends a single email using aiohttp, from the least busy sender mailbox that
+        is not being throttled. Throttled attempts are retried on another mailbox.
+
+        Attachments that fit within ATTACHMENT_INLINE_LIMIT are sent inline in the
+        sendMail request; larger ones are uploaded through the AttachmentUploader.
 
         Args:
             session (aiohttp.ClientSession): The aiohttp client session.
@@ -93,15 +377,149 @@ class EmailSender:
             recipients (str): The email recipients, separated by ';'.
             cc (str): The email CC recipients, separated by ';'.
             cco (str): The email CCO recipients, separated by ';'.
+            attachments (str): The attachment file paths, separated by ';'.
+            inline_images (Sequence[str]): The paths of the images embedded in the body.
+            body_blob (Optional[bytes]): The body already encoded as the contents of
+                a JSON string, shared by the copies of a fanned-out row.
+
+        Returns:
+            str: The address of the mailbox that sent the email.
 
         Raises:
             EmailSendError: If there is an error sending the email.
         """
-        url = f"{self.settings.GRAPH_API_URL}/users/{self.user_email}/sendMail"
         headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json",
         }
+        payload = self.build_payload(body, subject, recipients, cc, cco)
+        # Rendering the payload costs as much as the body, once per fanned-out
+        # copy, so it is only logged at DEBUG
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f"Payload: {payload}")
+
+        paths = self._parse_attachments(attachments)
+        inline = self.attachment_uploader.fits_inline(paths, body, inline_images)
+        blobs = []
+        if (paths or inline_images) and inline:
+            payload["message"]["attachments"], blobs = (
+                await self.attachment_uploader.build_attachments(paths, inline_images)
+            )
+        if body_blob is not None and inline:
+            # The shared encoding is spliced in instead of escaping the body again
+            payload["message"]["body"]["content"] = blob_reference(len(blobs))
+            blobs.append(body_blob)
+
+        recipient_count = count_recipients(recipients, cc, cco)
+        for attempt in range(self.settings.MAX_SEND_RETRIES + 1):
+            if attempt:
+                metrics.SEND_RETRIES.inc()
+            mailbox = await self.mailbox_pool.acquire(recipient_count)
+            sent = False
+            try:
+                if inline:
+                    retry_after = await self._post_send_mail(
+                        session, mailbox.address, headers, payload, blobs
+                    )
+                else:
+                    with profiling.span("graph_upload_session"):
+                        retry_after = (
+                            await self.attachment_uploader.send_with_upload_session(
+                                session,
+                                mailbox.address,
+                                headers,
+                                payload,
+                                paths,
+                                inline_images,
+                            )
+                        )
+                if retry_after is not None:
+                    metrics.THROTTLED_RESPONSES.inc()
+                    self.mailbox_pool.mark_throttled(mailbox, retry_after)
+                    continue
+                sent = True
+                logging.info(f"Email sent to {recipients} from {mailbox.address}")
+                return mailbox.address
+            except Exception as e:
+                logging.error(f"Error sending email to {recipients}: {e}")
+                raise EmailSendError(f"Error sending email to {recipients}: {e}")
+            finally:
+                self.mailbox_pool.release(mailbox, sent, recipient_count)
+
+        logging.error(f"Error sending email to {recipients}: throttled by Graph")
+        raise EmailSendError(
+            f"Error sending email to {recipients}: throttled by Graph after "
+            f"{self.settings.MAX_SEND_RETRIES + 1} attempts"
+        )
+
+    async def _post_send_mail(
+        self,
+        session: aiohttp.ClientSession,
+        mailbox: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        blobs: List[bytes],
+    ) -> Optional[float]:
+        """
+        Sends an email with a single sendMail request. The encoded attachments are
+        spliced into the request body without being copied.
+
+        Args:
+            session (aiohttp.ClientSession): The aiohttp client session.
+            mailbox (str): The address of the sender mailbox.
+            headers (Dict[str, str]): The authenticated request headers.
+            payload (Dict[str, Any]): The sendMail payload.
+            blobs (List[bytes]): The encoded attachments referenced by the payload.
+
+        Returns:
+            Optional[float]: None if the email was sent, or the number of seconds to
+            wait if Graph throttled the mailbox.
+        """
+        url = f"{self.settings.GRAPH_API_URL}/users/{mailbox}/sendMail"
+        with profiling.span("json_encode"):
+            data = encode_json(payload, blobs)
+        with profiling.span("graph_request"):
+            started = time.perf_counter()
+            async with session.post(url, headers=headers, data=data) as response:
+                metrics.GRAPH_LATENCY.observe(time.perf_counter() - started)
+                if response.status in THROTTLING_STATUSES:
+                    return get_retry_after(response)
+                response.raise_for_status()
+                return None
+
+    @staticmethod
+    def _parse_attachments(attachments: str) -> List[str]:
+        """
+        Splits the attachments cell into file paths.
+
+        Args:
+            attachments (str): The attachment file paths, separated by ';'.
+
+        Returns:
+            List[str]: The attachment file paths.
+        """
+        return [
+            path.strip()
+            for path in (attachments or "").split(";")
+            if path.strip() and path.strip().lower() != "nan"
+        ]
+
+    def build_payload(
+        self, body: str, subject: str, recipients: str, cc: str, cco: str
+    ) -> Dict[str, Any]:
+        """
+        Builds the Graph API sendMail payload for a single email.
+
+        Args:
+            body (str): The email body.
+            subject (str): The email subject.
+            recipients (str): The email recipients, separated by ';'.
+            cc (str): The email CC recipients, separated by ';'.
+            cco (str): The email CCO recipients, separated by ';'.
+
+        Returns:
+            Dict[str, Any]: The sendMail request payload.
+        """
         to_recipients = self._format_recipients(recipients)
         cc_recipients = self._format_recipients(cc)
         cco_recipients = self._format_recipients(cco)
@@ -121,15 +539,7 @@ class EmailSender:
             payload["message"][EmailRecipientType.CC.value] = cc_recipients
         if cco_recipients:
             payload["message"][EmailRecipientType.BCC.value] = cco_recipients
-
-        logging.info(f"Payload: {payload}")
-        try:
-            async with session.post(url, headers=headers, json=payload) as response:
-                response.raise_for_status()
-                logging.info(f"Email sent to {recipients}")
-        except Exception as e:
-            logging.error(f"Error sending email to {recipients}: {e}")
-            raise EmailSendError(f"Error sending email to {recipients}: {e}")
+        return payload
 
     def _format_recipients(self, recipients: str) -> List[dict]:
         """
@@ -0,0 +1,450 @@
+import asyncio
+import copy
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Hashable, List, Optional
+
+from app.config.settings import Settings
+from app.services.runtime_knobs import RuntimeKnobs
+
+# Exchange counts the recipients of a mailbox over a rolling 24 hour window
+QUOTA_WINDOW_SECONDS = 24 * 60 * 60
+# Minimum interval between two writes of the ledger file
+LEDGER_SAVE_INTERVAL = 5.0
+LEDGER_FILE_NAME = "recipient_ledger.json"
+
+
+def count_recipients(*fields: str) -> int:
+    """
+    Counts the addresses of recipient fields separated by ';', ignoring empty
+    values the same way EmailSender does.
+
+    Args:
+        *fields (str): The To, CC and CCO fields.
+
+    Returns:
+        int: The number of recipients.
+    """
+    return sum(
+        1
+        for field in fields
+        for email in (field or "").split(";")
+        if email.strip() and email.strip().lower() != "nan"
+    )
+
+
+class TokenBucket:
+    """
+    Paces sends to a fixed rate. Callers take a token each; when the bucket is empty
+    they wait in arrival order until their token has been refilled.
+
+    Attributes:
+        rate (float): The number of tokens added per second.
+        capacity (float): The maximum number of tokens, i.e. the allowed burst.
+        tokens (float): The available tokens; negative when callers are waiting.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        """
+        Initializes the TokenBucket instance full.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        """
+        Takes one token, waiting until it is available.
+        """
+        self._refill()
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+    def set_rate(self, rate: float) -> None:
+        """
+        Changes the rate for the tokens taken from now on. Callers already waiting
+        keep the delay computed at the previous rate.
+
+        Args:
+            rate (float): The number of tokens added per second.
+        """
+        self._refill()
+        self.rate = rate
+
+    def _refill(self) -> None:
+        """
+        Adds the tokens accrued since the last update at the current rate.
+        """
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+
+class RecipientLedger:
+    """
+    Counts the recipients sent from each mailbox over the last 24 hours, persisted
+    to a JSON file so the daily quota survives restarts.
+
+    Counts are grouped in one-minute buckets to keep the file small.
+
+    Attributes:
+        path (Optional[str]): The path to the ledger file, or None to keep it in
+            memory only.
+        persist (bool): Whether save writes the ledger file.
+    """
+
+    def __init__(self, path: Optional[str], persist: bool = True) -> None:
+        """
+        Initializes the RecipientLedger instance, loading the ledger file if it
+        exists.
+        """
+        self.path = path
+        self.persist = persist
+        self._buckets: Dict[str, Dict[int, int]] = {}
+        self._last_save = 0.0
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as file:
+                    stored = json.load(file)
+                self._buckets = {
+                    mailbox: {int(minute): count for minute, count in buckets.items()}
+                    for mailbox, buckets in stored.items()
+                }
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable recipient ledger {path}: {e}")
+
+    @classmethod
+    def for_settings(
+        cls, settings: Settings, persist: bool = True
+    ) -> "RecipientLedger":
+        """
+        Opens the ledger file kept in DATA_DIR.
+
+        Args:
+            settings (Settings): The application settings.
+            persist (bool): Whether save writes the ledger file.
+
+        Returns:
+            RecipientLedger: The recipient ledger.
+        """
+        return cls(os.path.join(settings.DATA_DIR, LEDGER_FILE_NAME), persist)
+
+    def used(self, mailbox: str) -> int:
+        """
+        Returns the recipients sent from a mailbox over the last 24 hours.
+
+        Args:
+            mailbox (str): The address of the mailbox.
+
+        Returns:
+            int: The number of recipients.
+        """
+        buckets = self._buckets.get(mailbox, {})
+        oldest = int((time.time() - QUOTA_WINDOW_SECONDS) // 60)
+        for minute in [minute for minute in buckets if minute <= oldest]:
+            del buckets[minute]
+        return sum(buckets.values())
+
+    def record(self, mailbox: str, recipients: int) -> None:
+        """
+        Records recipients sent from a mailbox.
+
+        Args:
+            mailbox (str): The address of the mailbox.
+            recipients (int): The number of recipients.
+        """
+        minute = int(time.time() // 60)
+        buckets = self._buckets.setdefault(mailbox, {})
+        buckets[minute] = buckets.get(minute, 0) + recipients
+        if time.monotonic() - self._last_save >= LEDGER_SAVE_INTERVAL:
+            self.save()
+
+    def save(self) -> None:
+        """
+        Writes the ledger file.
+        """
+        if not self.path or not self.persist:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(self._buckets, file)
+        os.replace(temp_path, self.path)
+        self._last_save = time.monotonic()
+
+
+class SendScheduler:
+    """
+    Plans and paces sends around the Exchange sending limits: a token bucket per
+    mailbox keeps each one at MAILBOX_MESSAGES_PER_MINUTE, and the recipient ledger
+    keeps each one under MAILBOX_RECIPIENTS_PER_DAY over a rolling 24 hours.
+
+    Campaigns running at once share one scheduler through for_campaign. The quota
+    each campaign planned stays reserved for it until it is sent or the campaign
+    finishes, so a campaign planned later only plans against what is left.
+
+    Attributes:
+        settings (Settings): The application settings.
+        ledger (RecipientLedger): The recipients sent from each mailbox.
+        messages_per_minute (float): The send rate of each mailbox; 0 disables it.
+        recipients_per_day (int): The daily recipient quota of each mailbox; 0
+            disables it.
+        quota_share (float): The fraction of the remaining quota this scheduler may
+            use, when several processes share the mailboxes.
+        rate_share (float): The fraction of the send rate this scheduler may use.
+        knobs (Optional[RuntimeKnobs]): The tuning values changed while sending,
+            whose send rate replaces MAILBOX_MESSAGES_PER_MINUTE.
+        campaign_id (Optional[Hashable]): The campaign whose plan this scheduler
+            holds.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        ledger: RecipientLedger,
+        rate_share: float = 1.0,
+        quota_share: float = 1.0,
+        knobs: Optional[RuntimeKnobs] = None,
+    ) -> None:
+        """
+        Initializes the SendScheduler instance with settings and the ledger.
+        """
+        self.settings = settings
+        self.ledger = ledger
+        self.rate_share = rate_share
+        self.knobs = knobs
+        self.messages_per_minute = (
+            knobs.messages_per_minute
+            if knobs is not None
+            else settings.MAILBOX_MESSAGES_PER_MINUTE
+        ) * rate_share
+        self.recipients_per_day = settings.MAILBOX_RECIPIENTS_PER_DAY
+        self.quota_share = quota_share
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._quotas: Dict[str, int] = {}
+        self._reserved: Dict[str, int] = {}
+        self._planned: Dict[Optional[Hashable], Dict[str, int]] = {}
+        self.campaign_id: Optional[Hashable] = None
+
+    def for_campaign(self, campaign_id: Hashable) -> "SendScheduler":
+        """
+        Returns the scheduler of one of several campaigns running at once. It shares
+        the rates, quotas and reservations of this scheduler, and holds the plan of
+        the campaign.
+
+        Args:
+            campaign_id (Hashable): The identifier of the campaign.
+
+        Returns:
+            SendScheduler: The scheduler of the campaign.
+        """
+        # The shallow copy shares the buckets, quotas and reservations
+        scheduler = copy.copy(self)
+        scheduler.campaign_id = campaign_id
+        return scheduler
+
+    def finish(self) -> None:
+        """
+        Gives back the quota the campaign planned but did not send.
+        """
+        self._planned.pop(self.campaign_id, None)
+
+    @staticmethod
+    def is_enabled(settings: Settings) -> bool:
+        """
+        Checks if any sending limit is configured.
+
+        Args:
+            settings (Settings): The application settings.
+
+        Returns:
+            bool: True if sends must be scheduled, False otherwise.
+        """
+        return bool(
+            settings.MAILBOX_MESSAGES_PER_MINUTE or settings.MAILBOX_RECIPIENTS_PER_DAY
+        )
+
+    def remaining(self, mailbox: str) -> Optional[int]:
+        """
+        Returns the recipients a mailbox can still send to in this run, leaving
+        out the quota planned by the other campaigns.
+
+        Args:
+            mailbox (str): The address of the mailbox.
+
+        Returns:
+            Optional[int]: The remaining recipients, or None if there is no quota.
+        """
+        if not self.recipients_per_day:
+            return None
+        if mailbox not in self._quotas:
+            # The share of the quota is fixed when the mailbox is first used, so
+            # the recipients recorded during the run are not divided again
+            available = max(0, self.recipients_per_day - self.ledger.used(mailbox))
+            self._quotas[mailbox] = int(available * self.quota_share)
+        planned_elsewhere = sum(
+            planned.get(mailbox, 0)
+            for campaign_id, planned in self._planned.items()
+            if campaign_id != self.campaign_id
+        )
+        return (
+            self._quotas[mailbox] - self._reserved.get(mailbox, 0) - planned_elsewhere
+        )
+
+    def has_quota(self, mailbox: str, recipients: int) -> bool:
+        """
+        Checks if a mailbox can send an email without exceeding its daily quota.
+
+        Args:
+            mailbox (str): The address of the mailbox.
+            recipients (int): The recipients of the email.
+
+        Returns:
+            bool: True if the email fits in the remaining quota.
+        """
+        remaining = self.remaining(mailbox)
+        return remaining is None or recipients <= remaining
+
+    def reserve(self, mailbox: str, recipients: int) -> None:
+        """
+        Sets aside quota for an email that is about to be sent.
+
+        Args:
+            mailbox (str): The address of the mailbox.
+            recipients (int): The recipients of the email.
+        """
+        self._reserved[mailbox] = self._reserved.get(mailbox, 0) + recipients
+
+    def release(self, mailbox: str, recipients: int, sent: bool) -> None:
+        """
+        Settles a reservation: the quota is consumed, along with the same amount of
+        the plan of the campaign, if the email was sent, and given back otherwise.
+
+        Args:
+            mailbox (str): The address of the mailbox.
+            recipients (int): The recipients of the email.
+            sent (bool): Whether the email was sent.
+        """
+        self._reserved[mailbox] = self._reserved.get(mailbox, 0) - recipients
+        if sent:
+            if mailbox in self._quotas:
+                self._quotas[mailbox] -= recipients
+            planned = self._planned.get(self.campaign_id)
+            if planned and mailbox in planned:
+                planned[mailbox] = max(0, planned[mailbox] - recipients)
+            self.ledger.record(mailbox, recipients)
+
+    async def wait_for_slot(self, mailbox: str) -> None:
+        """
+        Waits until the mailbox may send its next email at the configured rate.
+        Returns right away while the rate is 0, the knobs being checked again on
+        every call.
+
+        Args:
+            mailbox (str): The address of the mailbox.
+        """
+        if self.knobs is not None:
+            self._apply_rate(self.knobs.messages_per_minute * self.rate_share)
+        if not self.messages_per_minute:
+            return
+        if mailbox not in self._buckets:
+            self._buckets[mailbox] = TokenBucket(self.messages_per_minute / 60)
+        await self._buckets[mailbox].acquire()
+
+    def _apply_rate(self, messages_per_minute: float) -> None:
+        """
+        Switches the mailboxes to a new send rate, if it changed.
+
+        Args:
+            messages_per_minute (float): The send rate of each mailbox.
+        """
+        if messages_per_minute == self.messages_per_minute:
+            return
+        self.messages_per_minute = messages_per_minute
+        if messages_per_minute:
+            for bucket in self._buckets.values():
+                bucket.set_rate(messages_per_minute / 60)
+
+    def plan(
+        self,
+        recipient_counts: List[int],
+        mailboxes: List[str],
+        message_counts: Optional[List[int]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Computes the send plan of a campaign before it starts: which emails fit in
+        the remaining daily quota of the mailboxes and how long sending them takes at
+        the configured rate.
+
+        Emails are assigned in order to the mailbox with the fewest messages that
+        still has quota for them; the ones that fit nowhere are deferred, so the
+        quota is never exhausted halfway through the run. The quota of the
+        scheduled emails is reserved for the campaign until they are sent or the
+        campaign finishes.
+
+        Args:
+            recipient_counts (List[int]): The number of recipients of each email.
+            mailboxes (List[str]): The addresses of the sender mailboxes.
+            message_counts (Optional[List[int]]): The number of messages each email
+                is sent as, e.g. one per To address when fanned out. Defaults to
+                one message per email.
+
+        Returns:
+            Dict[str, Any]: The plan, with the positions of the "scheduled" and
+            "deferred" emails, the "eta_seconds" (None without a rate limit) and the
+            figures "per_mailbox".
+        """
+        remaining = {mailbox: self.remaining(mailbox) for mailbox in mailboxes}
+        per_mailbox = {
+            mailbox: {"messages": 0, "recipients": 0, "remaining": remaining[mailbox]}
+            for mailbox in mailboxes
+        }
+        if message_counts is None:
+            message_counts = [1] * len(recipient_counts)
+        scheduled, deferred = [], []
+        for position, (recipients, messages) in enumerate(
+            zip(recipient_counts, message_counts)
+        ):
+            candidates = [
+                mailbox
+                for mailbox in mailboxes
+                if remaining[mailbox] is None or recipients <= remaining[mailbox]
+            ]
+            if not candidates:
+                deferred.append(position)
+                continue
+            mailbox = min(candidates, key=lambda m: per_mailbox[m]["messages"])
+            per_mailbox[mailbox]["messages"] += messages
+            per_mailbox[mailbox]["recipients"] += recipients
+            if remaining[mailbox] is not None:
+                remaining[mailbox] -= recipients
+            scheduled.append(position)
+        if self.recipients_per_day:
+            self._planned[self.campaign_id] = {
+                mailbox: figures["recipients"]
+                for mailbox, figures in per_mailbox.items()
+            }
+
+        eta_seconds = None
+        if self.messages_per_minute:
+            eta_seconds = max(
+                (
+                    figures["messages"] / self.messages_per_minute * 60
+                    for figures in per_mailbox.values()
+                ),
+                default=0.0,
+            )
+        return {
+            "scheduled": scheduled,
+            "deferred": deferred,
+            "eta_seconds": eta_seconds,
+            "per_mailbox": per_mailbox,
+        }
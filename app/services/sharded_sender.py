@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config.settings import Settings
+from app.enum.send_status import SendStatus
+from app.services import async_runner
+from app.services.send_email import EmailSender
+from app.services.send_scheduler import RecipientLedger, SendScheduler
+
+EMAIL_DATA_KEYS = (
+    "bodies",
+    "subjects",
+    "recipients",
+    "cc",
+    "cco",
+    "attachments",
+    "inline_images",
+    "rows",
+)
+
+
+def _run_shard(
+    shard_id: int,
+    access_token: str,
+    api_scope: str,
+    sender_email: str,
+    settings: Settings,
+    shard_data: Dict[str, list],
+    events: multiprocessing.Queue,
+    workers: int,
+) -> None:
+    """
+    Sends the emails of one shard in a worker process.
+
+    The worker runs its own event loop and EmailSender session, and reports the
+    result of each row to the coordinator through the events queue.
+
+    Args:
+        shard_id (int): The index of the shard.
+        access_token (str): The access token acquired by the parent process.
+        api_scope (str): The API scope for authentication.
+        sender_email (str): The email address of the sender.
+        settings (Settings): The application settings.
+        shard_data (Dict[str, list]): The formatted email data of the shard.
+        events (multiprocessing.Queue): The queue used to report results.
+        workers (int): The number of workers, each of which gets an equal share of
+            the send rate and daily quota of the mailboxes.
+    """
+    scheduler = None
+    if SendScheduler.is_enabled(settings):
+        # The coordinator records the sent recipients in the ledger file
+        scheduler = SendScheduler(
+            settings,
+            RecipientLedger.for_settings(settings, persist=False),
+            rate_share=1 / workers,
+            quota_share=1 / workers,
+        )
+    email_sender = EmailSender(
+        access_token, api_scope, sender_email, settings, scheduler=scheduler
+    )
+    try:
+        async_runner.run(
+            email_sender.send_emails(
+                shard_data["bodies"],
+                shard_data["subjects"],
+                shard_data["recipients"],
+                shard_data["cc"],
+                shard_data["cco"],
+                rows=shard_data["rows"],
+                attachments=shard_data["attachments"],
+                inline_images=shard_data["inline_images"],
+                progress_callback=lambda result: events.put(("row", shard_id, result)),
+            )
+        )
+    finally:
+        events.put(("done", shard_id, None))
+
+
+class ShardedEmailSender:
+    """
+    Sends emails from several worker processes, each one with its own event loop and
+    HTTP session, so JSON encoding, HTML rendering and TLS use more than one core.
+
+    Attributes:
+        access_token (str): The access token shared with every worker.
+        api_scope (str): The API scope for authentication.
+        sender_email (str): The email address of the sender.
+        settings (Settings): The application settings.
+        workers (int): The number of worker processes.
+    """
+
+    def __init__(
+        self,
+        access_token: str,
+        api_scope: str,
+        sender_email: str,
+        settings: Settings,
+        workers: int,
+    ) -> None:
+        """
+        Initializes the ShardedEmailSender instance with the shared token and the
+        number of worker processes.
+        """
+        self.access_token = access_token
+        self.api_scope = api_scope
+        self.sender_email = sender_email
+        self.settings = settings
+        self.workers = workers
+
+    async def send_emails(
+        self,
+        email_data: Dict[str, list],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Partitions the rows across the worker processes and aggregates their results.
+
+        Args:
+            email_data (Dict[str, list]): The formatted email data.
+            progress_callback (Optional[Callable[[int, int], None]]): Called with the
+                number of finished rows and the total number of rows.
+
+        Returns:
+            List[Dict[str, Any]]: The result of each row, ordered by row number.
+        """
+        total = len(email_data["bodies"])
+        shards = self._partition(email_data)
+        context = multiprocessing.get_context("spawn")
+        events = context.Queue()
+        processes = {
+            shard_id: context.Process(
+                target=_run_shard,
+                args=(
+                    shard_id,
+                    self.access_token,
+                    self.api_scope,
+                    self.sender_email,
+                    self.settings,
+                    shard,
+                    events,
+                    len(shards),
+                ),
+                daemon=True,
+            )
+            for shard_id, shard in enumerate(shards)
+        }
+        logging.info(f"Sending {total} emails from {len(processes)} worker processes")
+        for process in processes.values():
+            process.start()
+
+        loop = asyncio.get_running_loop()
+        results: Dict[int, Dict[str, Any]] = {}
+        pending = set(processes)
+        try:
+            while pending:
+                event = await loop.run_in_executor(None, self._next_event, events)
+                if event is None:
+                    pending -= self._collect_dead_shards(processes, pending)
+                    continue
+                kind, shard_id, result = event
+                if kind == "done":
+                    pending.discard(shard_id)
+                    continue
+                results[result["row"]] = result
+                if progress_callback:
+                    progress_callback(len(results), total)
+        except BaseException:
+            for process in processes.values():
+                process.terminate()
+            raise
+        finally:
+            for process in processes.values():
+                process.join()
+
+        self._fail_missing_rows(shards, results)
+        return [results[row] for row in sorted(results)]
+
+    def _partition(self, email_data: Dict[str, list]) -> List[Dict[str, list]]:
+        """
+        Splits the email data into one shard per worker, interleaving the rows so each
+        shard gets a similar mix of small and large bodies.
+
+        Args:
+            email_data (Dict[str, list]): The formatted email data.
+
+        Returns:
+            List[Dict[str, list]]: The non-empty shards.
+        """
+        workers = max(1, min(self.workers, len(email_data["bodies"])))
+        return [
+            {key: email_data[key][shard_id::workers] for key in EMAIL_DATA_KEYS}
+            for shard_id in range(workers)
+        ]
+
+    @staticmethod
+    def _next_event(events: multiprocessing.Queue) -> Optional[tuple]:
+        """
+        Waits briefly for the next event from the workers.
+
+        Args:
+            events (multiprocessing.Queue): The queue used by the workers.
+
+        Returns:
+            Optional[tuple]: The event, or None if no event arrived in time.
+        """
+        try:
+            return events.get(timeout=1)
+        except queue.Empty:
+            return None
+
+    @staticmethod
+    def _collect_dead_shards(
+        processes: Dict[int, multiprocessing.Process], pending: set
+    ) -> set:
+        """
+        Finds the shards whose worker process exited without reporting completion.
+
+        Args:
+            processes (Dict[int, multiprocessing.Process]): The worker processes.
+            pending (set): The shards that have not finished yet.
+
+        Returns:
+            set: The shards whose worker died.
+        """
+        dead = {shard_id for shard_id in pending if not processes[shard_id].is_alive()}
+        for shard_id in dead:
+            logging.error(
+                f"Worker {shard_id} exited with code {processes[shard_id].exitcode}"
+            )
+        return dead
+
+    @staticmethod
+    def _fail_missing_rows(
+        shards: List[Dict[str, list]], results: Dict[int, Dict[str, Any]]
+    ) -> None:
+        """
+        Marks the rows that no worker reported, e.g. because its process crashed, as
+        failed.
+
+        Args:
+            shards (List[Dict[str, list]]): The shards sent to the workers.
+            results (Dict[int, Dict[str, Any]]): The results collected so far.
+        """
+        for shard in shards:
+            for row, recipients in zip(shard["rows"], shard["recipients"]):
+                if row not in results:
+                    results[row] = {
+                        "row": row,
+                        "status": SendStatus.FAILED.value,
+                        "recipients": recipients,
+                        "sender": None,
+                        "error": "Worker process exited before sending this email",
+                        "finished_at": None,
+                    }
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, List, Optional
+
+import pandas as pd
+
+from app.config.settings import Settings
+
+try:
+    import pyarrow
+    import pyarrow.feather
+except ImportError:  # Optional: without it every load parses the source file
+    pyarrow = None
+
+# Bumped whenever the layout of the snapshots changes, so old ones are ignored
+SNAPSHOT_FORMAT_VERSION = 2
+SNAPSHOT_EXTENSION = ".arrow"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class SnapshotCache:
+    """
+    Keeps the cleaned rows of parsed spreadsheets as uncompressed Arrow IPC
+    (Feather) files, so loading the same file again memory-maps the snapshot
+    instead of parsing it.
+
+    Snapshots are keyed by the hash of the file contents, of the reader and of the
+    settings that affect the parsing and the cleaning, so they are invalidated as
+    soon as the file or any of those settings changes.
+
+    Attributes:
+        directory (str): The directory holding the snapshots.
+        max_files (int): The number of snapshots kept; 0 disables the cache.
+    """
+
+    def __init__(self, directory: str, max_files: int) -> None:
+        """
+        Initializes the SnapshotCache instance with its directory and size.
+        """
+        self.directory = directory
+        self.max_files = max_files
+
+    @classmethod
+    def for_settings(cls, settings: Settings) -> "SnapshotCache":
+        """
+        Opens the snapshot cache kept in DATA_DIR.
+
+        Args:
+            settings (Settings): The application settings.
+
+        Returns:
+            SnapshotCache: The snapshot cache.
+        """
+        return cls(
+            os.path.join(settings.DATA_DIR, "snapshots"),
+            settings.SNAPSHOT_CACHE_MAX_FILES,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether snapshots are read and written.
+
+        Returns:
+            bool: True if the cache is enabled and pyarrow is installed.
+        """
+        return pyarrow is not None and self.max_files > 0
+
+    def key(
+        self, file_path: str, invalid_values: List[str], reader_options: List[Any]
+    ) -> str:
+        """
+        Computes the key of a file snapshot.
+
+        Args:
+            file_path (str): The path to the source file.
+            invalid_values (List[str]): The values that filter out rows.
+            reader_options (List[Any]): The reader and the settings it parses the
+                file with, from TableReader.options.
+
+        Returns:
+            str: The key of the snapshot.
+        """
+        digest = hashlib.sha256()
+        digest.update(
+            json.dumps(
+                [SNAPSHOT_FORMAT_VERSION, sorted(invalid_values), reader_options]
+            ).encode()
+        )
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def load(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Loads a snapshot by memory-mapping it.
+
+        Args:
+            key (str): The key of the snapshot.
+
+        Returns:
+            Optional[pd.DataFrame]: The cleaned rows, or None if there is no
+            snapshot.
+        """
+        path = self._path(key)
+        try:
+            table = pyarrow.feather.read_table(path, memory_map=True)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable snapshot {path}: {e}")
+            return None
+        # Mark the snapshot as recently used, so pruning keeps it
+        os.utime(path)
+        return table.to_pandas()
+
+    def store(self, key: str, df: pd.DataFrame) -> None:
+        """
+        Writes a snapshot and prunes the least recently used ones. Failures are
+        logged and ignored, since the cache is only an optimization.
+
+        Args:
+            key (str): The key of the snapshot.
+            df (pd.DataFrame): The cleaned rows.
+        """
+        path = self._path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Uncompressed, so the columns can be memory-mapped without a copy
+            pyarrow.feather.write_feather(
+                df, temporary_path, compression="uncompressed"
+            )
+            os.replace(temporary_path, path)
+            self._prune()
+        except Exception as e:
+            logging.warning(f"Could not write snapshot {path}: {e}")
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def _prune(self) -> None:
+        """
+        Removes the least recently used snapshots beyond max_files.
+        """
+        snapshots = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(SNAPSHOT_EXTENSION)
+        ]
+        snapshots.sort(key=os.path.getmtime, reverse=True)
+        for path in snapshots[self.max_files :]:
+            os.remove(path)
+
+    def _path(self, key: str) -> str:
+        """
+        Returns the path of a snapshot.
+
+        Args:
+            key (str): The key of the snapshot.
+
+        Returns:
+            str: The path to the snapshot file.
+        """
+        return os.path.join(self.directory, key + SNAPSHOT_EXTENSION)
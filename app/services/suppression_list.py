@@ -0,0 +1,403 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+from typing import BinaryIO, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config.settings import Settings
+
+# Addresses are stored as fixed-size digests, so the index is a flat sorted array
+DIGEST_SIZE = 16
+DIGEST_DTYPE = f"S{DIGEST_SIZE}"
+INDEX_FILE_NAME = "suppression.idx"
+LOG_FILE_NAME = "suppression.log"
+STATE_FILE_NAME = "suppression.json"
+# Number of pending digests in the log that triggers a merge into the index
+COMPACT_THRESHOLD = 100_000
+IMPORT_BATCH_SIZE = 50_000
+# Bytes before the sync position compared to tell an appended source file from a
+# rewritten one
+TAIL_SIZE = 4096
+
+
+def address_digest(address: str) -> bytes:
+    """
+    Returns the digest that identifies an address in the suppression list.
+
+    Args:
+        address (str): The email address.
+
+    Returns:
+        bytes: The digest of the normalized address.
+    """
+    return hashlib.blake2b(
+        address.strip().lower().encode("utf-8"), digest_size=DIGEST_SIZE
+    ).digest()
+
+
+class SuppressionList:
+    """
+    The addresses that must never receive emails, such as unsubscribed or bounced
+    ones, kept on disk as a sorted array of address digests.
+
+    The index is memory-mapped, so opening it costs nothing regardless of its size,
+    and each lookup is a binary search. New addresses are appended to a log and
+    merged into the index once COMPACT_THRESHOLD of them are pending.
+
+    Attributes:
+        directory (str): The directory holding the index files.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        Initializes the SuppressionList instance, mapping the index and reading
+        the pending log.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, INDEX_FILE_NAME)
+        self._log_path = os.path.join(directory, LOG_FILE_NAME)
+        self._state_path = os.path.join(directory, STATE_FILE_NAME)
+        self._mmap: Optional[mmap.mmap] = None
+        self._index = np.empty(0, dtype=DIGEST_DTYPE)
+        self._pending: Set[bytes] = set()
+        self._open_index()
+        self._read_log()
+
+    @classmethod
+    def for_settings(cls, settings: Settings) -> "SuppressionList":
+        """
+        Opens the suppression list kept in DATA_DIR.
+
+        Args:
+            settings (Settings): The application settings.
+
+        Returns:
+            SuppressionList: The suppression list.
+        """
+        return cls(os.path.join(settings.DATA_DIR, "suppression"))
+
+    def __len__(self) -> int:
+        """
+        Returns the number of suppressed addresses.
+
+        Returns:
+            int: The number of addresses in the index and in the log.
+        """
+        return len(self._index) + len(self._pending)
+
+    def contains(self, address: str) -> bool:
+        """
+        Checks if an address is suppressed.
+
+        Args:
+            address (str): The email address.
+
+        Returns:
+            bool: True if the address is suppressed.
+        """
+        digest = address_digest(address)
+        if digest in self._pending:
+            return True
+        # Compared as fixed-size arrays: numpy drops trailing null bytes from
+        # scalar elements
+        key = np.array(digest, dtype=DIGEST_DTYPE)
+        position = np.searchsorted(self._index, key)
+        return bool(
+            position < len(self._index) and self._index[position : position + 1] == key
+        )
+
+    def contains_many(self, addresses: List[str]) -> np.ndarray:
+        """
+        Checks a batch of addresses with a single vectorized search.
+
+        Args:
+            addresses (List[str]): The email addresses.
+
+        Returns:
+            np.ndarray: True for each suppressed address.
+        """
+        return self._lookup([address_digest(address) for address in addresses])
+
+    def add(self, addresses: Iterable[str]) -> int:
+        """
+        Suppresses addresses, appending the new ones to the log.
+
+        Args:
+            addresses (Iterable[str]): The email addresses.
+
+        Returns:
+            int: The number of addresses that were not suppressed yet.
+        """
+        digests = [address_digest(address) for address in addresses if address.strip()]
+        new_digests = []
+        for digest, found in zip(digests, self._lookup(digests)):
+            if not found and digest not in self._pending:
+                self._pending.add(digest)
+                new_digests.append(digest)
+        if new_digests:
+            with open(self._log_path, "ab") as log:
+                log.write(b"".join(new_digests))
+                log.flush()
+                os.fsync(log.fileno())
+            if len(self._pending) >= COMPACT_THRESHOLD:
+                self.compact()
+        return len(new_digests)
+
+    def compact(self) -> None:
+        """
+        Merges the pending log into the sorted index and empties the log. Only the
+        pending digests are sorted; they are then inserted into the index in one
+        linear pass.
+        """
+        if not self._pending:
+            return
+        pending = np.sort(np.array(list(self._pending), dtype=DIGEST_DTYPE))
+        positions = np.searchsorted(self._index, pending)
+        # A log left behind by an interrupted compaction may repeat indexed entries
+        in_range = positions < len(self._index)
+        duplicated = np.zeros(len(pending), dtype=bool)
+        duplicated[in_range] = self._index[positions[in_range]] == pending[in_range]
+        merged = np.insert(self._index, positions[~duplicated], pending[~duplicated])
+        temporary_path = f"{self._index_path}.tmp"
+        with open(temporary_path, "wb") as index:
+            index.write(merged.tobytes())
+            index.flush()
+            os.fsync(index.fileno())
+        self._close_index()
+        os.replace(temporary_path, self._index_path)
+        # The log is only emptied once the index holding its entries is in place
+        open(self._log_path, "wb").close()
+        self._pending.clear()
+        self._open_index()
+        logging.info(f"Lista de supressão compactada: {len(self._index)} endereços")
+
+    def sync_source(self, source_path: str) -> int:
+        """
+        Imports the addresses appended to a text file, one per line, since the last
+        sync. Only the new bytes are read; if the file was truncated or replaced,
+        it is read again from the start.
+
+        A last line without a line break is imported too, but the sync position
+        stays before it, so it is read again next time in case it was still being
+        written.
+
+        Args:
+            source_path (str): The path to the source file.
+
+        Returns:
+            int: The number of newly suppressed addresses.
+        """
+        state = self._read_state()
+        stat = os.stat(source_path)
+        offset = self._resume_offset(state, source_path, stat)
+        added = 0
+        with open(source_path, "rb") as source:
+            source.seek(offset)
+            batch = []
+            for line in source:
+                if line.endswith(b"\n"):
+                    offset += len(line)
+                batch.append(line.decode("utf-8", errors="ignore").strip(" \r\n,;"))
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    added += self.add(batch)
+                    batch = []
+            added += self.add(batch)
+            tail = self._tail_digest(source, offset)
+        self._write_state(
+            {
+                "path": source_path,
+                "offset": offset,
+                "inode": stat.st_ino,
+                "mtime": stat.st_mtime_ns,
+                "tail": tail,
+            }
+        )
+        if added:
+            logging.info(f"{added} endereços adicionados à lista de supressão")
+        return added
+
+    def _resume_offset(
+        self, state: dict, source_path: str, stat: os.stat_result
+    ) -> int:
+        """
+        Finds where the last sync of a source file stopped. The file is read from
+        the start when it is another file, has another inode, is smaller than the
+        imported part, is older than at the last sync, or when the bytes before
+        the sync position changed, as when it is rewritten in place.
+
+        Args:
+            state (dict): The state of the last sync.
+            source_path (str): The path to the source file.
+            stat (os.stat_result): The status of the source file.
+
+        Returns:
+            int: The offset to resume reading from.
+        """
+        offset = state.get("offset", 0)
+        if (
+            state.get("path") != source_path
+            or state.get("inode") != stat.st_ino
+            or offset > stat.st_size
+            or stat.st_mtime_ns < state.get("mtime", 0)
+        ):
+            return 0
+        with open(source_path, "rb") as source:
+            if self._tail_digest(source, offset) != state.get("tail"):
+                return 0
+        return offset
+
+    @staticmethod
+    def _tail_digest(source: BinaryIO, offset: int) -> str:
+        """
+        Hashes the TAIL_SIZE bytes of a source file that precede an offset, to
+        recognize the imported part of the file on the next sync.
+
+        Args:
+            source (BinaryIO): The source file.
+            offset (int): The end of the imported part.
+
+        Returns:
+            str: The digest of the bytes before the offset.
+        """
+        start = max(0, offset - TAIL_SIZE)
+        source.seek(start)
+        return hashlib.blake2b(source.read(offset - start)).hexdigest()
+
+    def filter_cells(self, cells: List[str]) -> Tuple[List[str], int]:
+        """
+        Removes the suppressed addresses from recipient cells separated by ';'.
+
+        Args:
+            cells (List[str]): The recipient cells.
+
+        Returns:
+            Tuple[List[str], int]: The cells without the suppressed addresses and
+            the number of addresses removed.
+        """
+        if not len(self):
+            return cells, 0
+        addresses = list(
+            {
+                address.strip()
+                for cell in cells
+                for address in str(cell).split(";")
+                if address.strip()
+            }
+        )
+        suppressed = {
+            address.lower()
+            for address, found in zip(addresses, self.contains_many(addresses))
+            if found
+        }
+        if not suppressed:
+            return cells, 0
+        removed = 0
+        filtered = []
+        for cell in cells:
+            kept = []
+            for address in str(cell).split(";"):
+                if address.strip().lower() in suppressed:
+                    removed += 1
+                else:
+                    kept.append(address)
+            filtered.append(";".join(kept))
+        return filtered, removed
+
+    def _lookup(self, digests: List[bytes]) -> np.ndarray:
+        """
+        Checks a batch of digests against the index and the pending log.
+
+        Args:
+            digests (List[bytes]): The address digests.
+
+        Returns:
+            np.ndarray: True for each suppressed digest.
+        """
+        found = np.zeros(len(digests), dtype=bool)
+        if not digests:
+            return found
+        if len(self._index):
+            keys = np.array(digests, dtype=DIGEST_DTYPE)
+            positions = np.searchsorted(self._index, keys)
+            in_range = positions < len(self._index)
+            found[in_range] = self._index[positions[in_range]] == keys[in_range]
+        if self._pending:
+            found |= np.fromiter(
+                (digest in self._pending for digest in digests),
+                dtype=bool,
+                count=len(digests),
+            )
+        return found
+
+    def close(self) -> None:
+        """
+        Unmaps the index.
+        """
+        self._close_index()
+
+    def _open_index(self) -> None:
+        """
+        Memory-maps the index file, if it exists and is not empty.
+        """
+        self._index = np.empty(0, dtype=DIGEST_DTYPE)
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, "rb") as index:
+            if os.fstat(index.fileno()).st_size < DIGEST_SIZE:
+                return
+            self._mmap = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index = np.frombuffer(self._mmap, dtype=DIGEST_DTYPE)
+
+    def _close_index(self) -> None:
+        """
+        Releases the memory map of the index.
+        """
+        self._index = np.empty(0, dtype=DIGEST_DTYPE)
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _read_log(self) -> None:
+        """
+        Loads the digests appended since the last compaction, ignoring a partial
+        record left by an interrupted write.
+        """
+        if not os.path.exists(self._log_path):
+            return
+        with open(self._log_path, "rb") as log:
+            data = log.read()
+        usable = len(data) - len(data) % DIGEST_SIZE
+        self._pending = {
+            data[start : start + DIGEST_SIZE] for start in range(0, usable, DIGEST_SIZE)
+        }
+
+    def _read_state(self) -> dict:
+        """
+        Reads the position of the last source sync.
+
+        Returns:
+            dict: The source path, the offset already imported, and the inode,
+            modification time and tail digest of the file at that point.
+        """
+        try:
+            with open(self._state_path, encoding="utf-8") as state:
+                return json.load(state)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self, state: dict) -> None:
+        """
+        Writes the position of the last source sync.
+
+        Args:
+            state (dict): The source path, the offset already imported, and the
+                inode, modification time and tail digest of the file.
+        """
+        temporary_path = f"{self._state_path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+        os.replace(temporary_path, self._state_path)
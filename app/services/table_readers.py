@@ -0,0 +1,257 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Type
+
+import numpy as np
+import pandas as pd
+
+from app.config.settings import Settings
+from app.exceptions import UnsupportedFileFormatError
+
+try:
+    import pyarrow
+    import pyarrow.csv
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:  # Optional: CSV falls back to pandas, Parquet/Arrow need it
+    pyarrow = None
+
+# Position of the sheet read from workbooks and the pandas engine that reads it;
+# None lets pandas pick the engine from the file extension
+EXCEL_SHEET = 0
+EXCEL_ENGINE = None
+
+
+class TableReader(ABC):
+    """
+    Base class of the readers that load a spreadsheet file into a DataFrame with
+    the columns described by ExcelColumns, one row per email, in file order.
+
+    Subclasses declare the file extensions they handle and are picked by
+    get_reader.
+
+    Attributes:
+        file_path (str): The path to the file.
+        settings (Settings): The application settings.
+    """
+
+    extensions: tuple = ()
+
+    def __init__(self, file_path: str, settings: Settings) -> None:
+        """
+        Initializes the reader with the path to the file and settings.
+        """
+        self.file_path = file_path
+        self.settings = settings
+
+    @abstractmethod
+    def read(self) -> pd.DataFrame:
+        """
+        Reads the first table of the file.
+
+        Returns:
+            pd.DataFrame: The rows of the file, with empty cells as NaN.
+        """
+
+    def options(self) -> List[Any]:
+        """
+        Returns the reader and the settings that change how the file is parsed, so
+        rows parsed with other options are not reused.
+
+        Returns:
+            List[Any]: The name of the reader and its parsing options.
+        """
+        return [type(self).__name__]
+
+    def close(self) -> None:
+        """
+        Releases the file handles kept by the reader.
+        """
+
+    @staticmethod
+    def _require_pyarrow(file_format: str) -> None:
+        """
+        Checks that pyarrow is installed.
+
+        Args:
+            file_format (str): The name of the file format, for the error message.
+
+        Raises:
+            UnsupportedFileFormatError: If pyarrow is not installed.
+        """
+        if pyarrow is None:
+            raise UnsupportedFileFormatError(
+                f"Reading {file_format} files requires pyarrow to be installed"
+            )
+
+    @staticmethod
+    def _to_dataframe(table: "pyarrow.Table") -> pd.DataFrame:
+        """
+        Converts an Arrow table to a DataFrame, with nulls as NaN like read_excel.
+
+        Args:
+            table (pyarrow.Table): The Arrow table.
+
+        Returns:
+            pd.DataFrame: The DataFrame.
+        """
+        df = table.to_pandas()
+        return df.where(df.notna(), np.nan)
+
+
+class ExcelReader(TableReader):
+    """
+    Reads the first sheet of an Excel workbook with pandas and openpyxl.
+    """
+
+    extensions = (".xlsx", ".xlsm", ".xls")
+
+    def __init__(self, file_path: str, settings: Settings) -> None:
+        """
+        Initializes the reader without opening the workbook.
+        """
+        super().__init__(file_path, settings)
+        self.xls: Optional[pd.ExcelFile] = None
+
+    def read(self) -> pd.DataFrame:
+        """
+        Reads the first sheet of the workbook.
+
+        Returns:
+            pd.DataFrame: The rows of the sheet.
+        """
+        self.xls = pd.ExcelFile(self.file_path, engine=EXCEL_ENGINE)
+        return pd.read_excel(self.xls, sheet_name=self.xls.sheet_names[EXCEL_SHEET])
+
+    def options(self) -> List[Any]:
+        """
+        Returns the reader, the sheet read and the pandas engine.
+
+        Returns:
+            List[Any]: The name of the reader and its parsing options.
+        """
+        return super().options() + [EXCEL_SHEET, EXCEL_ENGINE]
+
+    def close(self) -> None:
+        """
+        Closes the workbook.
+        """
+        if self.xls:
+            self.xls.close()
+
+
+class CsvReader(TableReader):
+    """
+    Reads a CSV file with the multithreaded pyarrow parser, or the pandas C parser
+    when pyarrow is not installed.
+    """
+
+    extensions = (".csv", ".txt")
+
+    def read(self) -> pd.DataFrame:
+        """
+        Reads the CSV file using CSV_DELIMITER and CSV_ENCODING.
+
+        Returns:
+            pd.DataFrame: The rows of the file.
+        """
+        if pyarrow is None:
+            return pd.read_csv(
+                self.file_path,
+                sep=self.settings.CSV_DELIMITER,
+                encoding=self.settings.CSV_ENCODING,
+            )
+        table = pyarrow.csv.read_csv(
+            self.file_path,
+            read_options=pyarrow.csv.ReadOptions(
+                use_threads=True, encoding=self.settings.CSV_ENCODING
+            ),
+            # Email bodies may span several lines inside quoted values
+            parse_options=pyarrow.csv.ParseOptions(
+                delimiter=self.settings.CSV_DELIMITER, newlines_in_values=True
+            ),
+            convert_options=pyarrow.csv.ConvertOptions(strings_can_be_null=True),
+        )
+        return self._to_dataframe(table)
+
+    def options(self) -> List[Any]:
+        """
+        Returns the reader, the delimiter, the encoding and the parser used.
+
+        Returns:
+            List[Any]: The name of the reader and its parsing options.
+        """
+        return super().options() + [
+            self.settings.CSV_DELIMITER,
+            self.settings.CSV_ENCODING,
+            "pandas" if pyarrow is None else "pyarrow",
+        ]
+
+
+class ParquetReader(TableReader):
+    """
+    Reads a Parquet file with pyarrow, decoding the column chunks in parallel.
+    """
+
+    extensions = (".parquet", ".pq")
+
+    def read(self) -> pd.DataFrame:
+        """
+        Reads the Parquet file.
+
+        Returns:
+            pd.DataFrame: The rows of the file.
+        """
+        self._require_pyarrow("Parquet")
+        table = pyarrow.parquet.read_table(self.file_path, use_threads=True)
+        # Drop an index stored by pandas, so rows are numbered by file position
+        return self._to_dataframe(table).reset_index(drop=True)
+
+
+class ArrowReader(TableReader):
+    """
+    Reads an Arrow IPC (Feather) file with pyarrow, memory-mapping it.
+    """
+
+    extensions = (".arrow", ".feather", ".ipc")
+
+    def read(self) -> pd.DataFrame:
+        """
+        Reads the Arrow IPC file.
+
+        Returns:
+            pd.DataFrame: The rows of the file.
+        """
+        self._require_pyarrow("Arrow")
+        table = pyarrow.feather.read_table(self.file_path, memory_map=True)
+        return self._to_dataframe(table).reset_index(drop=True)
+
+
+READERS: Dict[str, Type[TableReader]] = {
+    extension: reader
+    for reader in (ExcelReader, CsvReader, ParquetReader, ArrowReader)
+    for extension in reader.extensions
+}
+
+
+def get_reader(file_path: str, settings: Settings) -> TableReader:
+    """
+    Picks the reader of a file by its extension.
+
+    Args:
+        file_path (str): The path to the file.
+        settings (Settings): The application settings.
+
+    Returns:
+        TableReader: The reader of the file.
+
+    Raises:
+        UnsupportedFileFormatError: If no reader handles the file extension.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in READERS:
+        raise UnsupportedFileFormatError(
+            f"Unsupported file format '{extension}', expected one of: "
+            f"{', '.join(READERS)}"
+        )
+    return READERS[extension](file_path, settings)
@@ -1,13 +1,32 @@
-import asyncio
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, Optional
 
+from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.checkbox import CheckBox
 from kivy.uix.label import Label
 from kivy.uix.spinner import Spinner
 from kivy.uix.textinput import TextInput
+from kivy.utils import escape_markup
 
 from app.controller.home_controller import HomeController
+from app.enum.email_format_type import EmailFormatType
+from app.enum.format_flag import FormatFlag
+from app.services.async_runner import AsyncRunner
+from app.services.body_format import BodyFormatPlan
+
+# Interval of the status refresh while a campaign runs
+STATUS_POLL_SECONDS = 0.5
+PREVIEW_TEXT = "Pré-visualização"
+# Kivy markup showing each format in the preview label, from the innermost
+PREVIEW_TAGS = [
+    (FormatFlag.NEGRITO, "[b]", "[/b]"),
+    (FormatFlag.ITALICO, "[i]", "[/i]"),
+    (FormatFlag.SUBLINHADO, "[u]", "[/u]"),
+    (FormatFlag.AUMENTAR_FONTE, "[size=20sp]", "[/size]"),
+    (FormatFlag.HYPERLINK, "[color=#3399ff]", "[/color]"),
+]
 
 
 class MainScreen(BoxLayout):
@@ -16,12 +35,21 @@ class MainScreen(BoxLayout):
 
     Attributes:
         controller (HomeController): The controller to handle the business logic.
+        runner (AsyncRunner): The long-lived event loop that runs the campaigns.
         title_label (Label): The label for the title.
         file_box (BoxLayout): The layout for file selection.
         select_button (Button): The button to select the Excel file.
         file_label (Label): The label to display the selected file.
         sender_input (TextInput): The input field for the sender email.
         send_button (Button): The button to send emails.
+        queue_box (BoxLayout): The layout for the job queue controls.
+        enqueue_button (Button): The button to add the spreadsheet to the job queue.
+        priority_spinner (Spinner): The spinner to select the priority of the job.
+        run_queue_button (Button): The button to run the queued campaigns.
+        knobs_box (BoxLayout): The layout for the tuning values changed while
+            campaigns run.
+        knob_inputs (Dict[str, TextInput]): The input field of each tuning value.
+        apply_knobs_button (Button): The button to apply the tuning values.
         status_label (Label): The label to display the status message.
         body_spinner (Spinner): The spinner to select the email body.
         formats (Dict[str, Dict[str, str]]): The dictionary to store the formats for each body part.
@@ -40,6 +68,8 @@ class MainScreen(BoxLayout):
         self.padding = [30, 30, 30, 30]
 
         self.controller = HomeController()
+        self.runner = AsyncRunner()
+        self._running: Optional[Future] = None
         self.formats = {}
         self.hyperlink_checkboxes = {}
         self.line_breaks = {}
@@ -69,7 +99,7 @@ class MainScreen(BoxLayout):
         self.add_widget(self.file_box)
 
         self.sender_input = TextInput(
-            hint_text="Remetente",
+            hint_text="Remetentes (separar com ;)",
             size_hint_y=None,
             height=50,
             multiline=False,
@@ -98,7 +128,7 @@ class MainScreen(BoxLayout):
             text="B",
             font_size="20sp",
             bold=True,
-            on_press=lambda _: self.apply_format("Negrito"),
+            on_press=lambda _: self.apply_format(EmailFormatType.NEGRITO),
             background_color=(0.2, 0.6, 1, 1),
             color=(1, 1, 1, 1),
         )
@@ -106,7 +136,7 @@ class MainScreen(BoxLayout):
             text="I",
             font_size="20sp",
             italic=True,
-            on_press=lambda _: self.apply_format("Itálico"),
+            on_press=lambda _: self.apply_format(EmailFormatType.ITALICO),
             background_color=(0.2, 0.6, 1, 1),
             color=(1, 1, 1, 1),
         )
@@ -114,14 +144,14 @@ class MainScreen(BoxLayout):
             text="U",
             font_size="20sp",
             underline=True,
-            on_press=lambda _: self.apply_format("Sublinhado"),
+            on_press=lambda _: self.apply_format(EmailFormatType.SUBLINHADO),
             background_color=(0.2, 0.6, 1, 1),
             color=(1, 1, 1, 1),
         )
         self.increase_font_button = Button(
             text="A+",
             font_size="20sp",
-            on_press=lambda _: self.apply_format("Aumentar Fonte"),
+            on_press=lambda _: self.apply_format(EmailFormatType.AUMENTAR_FONTE),
             background_color=(0.2, 0.6, 1, 1),
             color=(1, 1, 1, 1),
         )
@@ -163,7 +193,8 @@ class MainScreen(BoxLayout):
         self.add_widget(self.link_break_box)
 
         self.preview_label = Label(
-            text="Pré-visualização",
+            text=PREVIEW_TEXT,
+            markup=True,
             size_hint_y=None,
             height=50,
             font_size="16sp",
@@ -182,6 +213,61 @@ class MainScreen(BoxLayout):
         )
         self.add_widget(self.send_button)
 
+        self.queue_box = BoxLayout(
+            orientation="horizontal", size_hint_y=None, height=50, spacing=10
+        )
+        self.enqueue_button = Button(
+            text="Adicionar à fila",
+            background_color=(0.2, 0.6, 1, 1),
+            color=(1, 1, 1, 1),
+            on_press=self.enqueue_job,
+        )
+        self.priority_spinner = Spinner(
+            text="1",
+            values=["1", "2", "3", "4", "5"],
+            size_hint_x=0.4,
+            background_color=(0.2, 0.2, 0.2, 1),
+            color=(1, 1, 1, 1),
+        )
+        self.run_queue_button = Button(
+            text="Processar fila",
+            background_color=(0.2, 0.6, 1, 1),
+            color=(1, 1, 1, 1),
+            on_press=self.schedule_run_jobs,
+        )
+        self.queue_box.add_widget(self.enqueue_button)
+        self.queue_box.add_widget(self.priority_spinner)
+        self.queue_box.add_widget(self.run_queue_button)
+        self.add_widget(self.queue_box)
+
+        self.knobs_box = BoxLayout(
+            orientation="horizontal", size_hint_y=None, height=50, spacing=10
+        )
+        self.knob_inputs = {}
+        for name, hint in (
+            ("concurrency", "Envios simultâneos"),
+            ("messages_per_minute", "Emails/min por caixa"),
+            ("chunk_size", "Linhas por bloco (0 = auto)"),
+        ):
+            self.knob_inputs[name] = TextInput(
+                hint_text=hint,
+                text=str(self.controller.knobs.as_dict()[name]),
+                multiline=False,
+                input_filter="float" if name == "messages_per_minute" else "int",
+                padding=[10, 10],
+                background_color=(0.2, 0.2, 0.2, 1),
+                foreground_color=(1, 1, 1, 1),
+            )
+            self.knobs_box.add_widget(self.knob_inputs[name])
+        self.apply_knobs_button = Button(
+            text="Aplicar ajustes",
+            background_color=(0.2, 0.6, 1, 1),
+            color=(1, 1, 1, 1),
+            on_press=self.apply_knobs,
+        )
+        self.knobs_box.add_widget(self.apply_knobs_button)
+        self.add_widget(self.knobs_box)
+
         self.status_label = Label(
             text="", size_hint_y=None, height=50, color=(1, 1, 1, 1)
         )
@@ -223,20 +309,20 @@ class MainScreen(BoxLayout):
         self.line_break_spinner.text = str(self.line_breaks.get(value, 0))
         self.update_format_buttons()
 
-    def apply_format(self, format_type: str) -> None:
+    def apply_format(self, format_type: EmailFormatType) -> None:
         """
-        Applies the selected format to the selected email body.
+        Toggles the selected format on the selected email body.
 
         Args:
-            format_type (str): The format type to apply.
+            format_type (EmailFormatType): The format type to toggle.
         """
         selected_body = self.body_spinner.text
         if selected_body != "Selecione":
             if selected_body not in self.formats:
                 self.formats[selected_body] = {}
-            self.formats[selected_body][format_type] = not self.formats[
+            self.formats[selected_body][format_type.value] = not self.formats[
                 selected_body
-            ].get(format_type, False)
+            ].get(format_type.value, False)
             self.update_preview()
             self.update_format_buttons()
 
@@ -268,46 +354,36 @@ class MainScreen(BoxLayout):
 
     def update_preview(self, *args) -> None:
         """
-        Updates the preview label to reflect the selected format.
+        Updates the preview label to reflect the selected format. The flags come
+        from the same format plan as the emails, but the label shows Kivy markup
+        rather than HTML, so they are drawn with the matching markup tags.
         """
-        selected_body = self.body_spinner.text
-        format_info = self.formats.get(selected_body, {})
-        is_hyperlink = self.hyperlink_checkboxes.get(selected_body, False)
-        line_breaks = self.line_breaks.get(selected_body, 0)
-
-        preview_text = "Pré-visualização"
-        if "Negrito" in format_info:
-            preview_text = f"<b>{preview_text}</b>"
-        if "Itálico" in format_info:
-            preview_text = f"<i>{preview_text}</i>"
-        if "Sublinhado" in format_info:
-            preview_text = f"<u>{preview_text}</u>"
-        if "Aumentar Fonte" in format_info:
-            preview_text = f"<font size='5'>{preview_text}</font>"
-        if is_hyperlink:
-            preview_text = f"<a href='#'>{preview_text}</a>"
-        preview_text += "<br>" * line_breaks
-
-        self.preview_label.text = preview_text
+        plan = BodyFormatPlan(self.controller.settings, self.get_body_formats())
+        flags = plan.flags(self.body_spinner.text)
+        text = escape_markup(PREVIEW_TEXT)
+        for flag, opening, closing in PREVIEW_TAGS:
+            if flags & flag:
+                text = f"{opening}{text}{closing}"
+        self.preview_label.text = text
 
     def update_format_buttons(self) -> None:
         """
         Updates the visual feedback of the format buttons based on the selected email body.
         """
-        selected_body = self.body_spinner.text
-        format_info = self.formats.get(selected_body, {})
+        plan = BodyFormatPlan(self.controller.settings, self.get_body_formats())
+        flags = plan.flags(self.body_spinner.text)
 
         self.bold_button.background_color = (
-            (0.2, 0.6, 1, 1) if format_info.get("Negrito") else (1, 1, 1, 1)
+            (0.2, 0.6, 1, 1) if flags & FormatFlag.NEGRITO else (1, 1, 1, 1)
         )
         self.italic_button.background_color = (
-            (0.2, 0.6, 1, 1) if format_info.get("Itálico") else (1, 1, 1, 1)
+            (0.2, 0.6, 1, 1) if flags & FormatFlag.ITALICO else (1, 1, 1, 1)
         )
         self.underline_button.background_color = (
-            (0.2, 0.6, 1, 1) if format_info.get("Sublinhado") else (1, 1, 1, 1)
+            (0.2, 0.6, 1, 1) if flags & FormatFlag.SUBLINHADO else (1, 1, 1, 1)
         )
         self.increase_font_button.background_color = (
-            (0.2, 0.6, 1, 1) if format_info.get("Aumentar Fonte") else (1, 1, 1, 1)
+            (0.2, 0.6, 1, 1) if flags & FormatFlag.AUMENTAR_FONTE else (1, 1, 1, 1)
         )
 
     def schedule_send_emails(self, instance: Button) -> None:
@@ -318,13 +394,102 @@ class MainScreen(BoxLayout):
             instance (Button): The button instance that triggered this method.
         """
         sender_email = self.sender_input.text
-        formats = {
+        self._start(self.controller.send_emails(sender_email, self.get_body_formats()))
+
+    def enqueue_job(self, instance: Button) -> None:
+        """
+        Adds the selected spreadsheet to the job queue with the chosen priority.
+
+        Args:
+            instance (Button): The button instance that triggered this method.
+        """
+        self.controller.enqueue_job(
+            self.sender_input.text,
+            self.get_body_formats(),
+            int(self.priority_spinner.text),
+        )
+        self.status_label.text = self.controller.status_message
+
+    def schedule_run_jobs(self, instance: Button) -> None:
+        """
+        Runs the queued campaigns.
+
+        Args:
+            instance (Button): The button instance that triggered this method.
+        """
+        self._start(self.controller.run_jobs())
+
+    def apply_knobs(self, instance: Button) -> None:
+        """
+        Applies the tuning values typed in the knob fields, to the running
+        campaigns too.
+
+        Args:
+            instance (Button): The button instance that triggered this method.
+        """
+        self.controller.update_knobs(
+            {name: field.text for name, field in self.knob_inputs.items() if field.text}
+        )
+        self.status_label.text = self.controller.status_message
+
+    def _start(self, coro: Coroutine) -> None:
+        """
+        Runs a campaign coroutine on the event loop without blocking the UI, which
+        keeps showing the live status until it finishes.
+
+        Args:
+            coro (Coroutine): The coroutine of the campaign.
+        """
+        if self._running is not None and not self._running.done():
+            coro.close()
+            self.status_label.text = "Aguarde o término da execução atual"
+            return
+        self._running = self.runner.submit(coro)
+        self.send_button.disabled = True
+        self.run_queue_button.disabled = True
+        Clock.schedule_interval(self._poll_running, STATUS_POLL_SECONDS)
+
+    def _poll_running(self, dt: float) -> bool:
+        """
+        Refreshes the status label while a campaign runs.
+
+        Args:
+            dt (float): The seconds since the last call.
+
+        Returns:
+            bool: False once the campaign finished, to stop polling.
+        """
+        if not self._running.done():
+            self.status_label.text = self.controller.get_live_status()
+            return True
+        self.send_button.disabled = False
+        self.run_queue_button.disabled = False
+        self.status_label.text = self.controller.status_message
+        return False
+
+    def get_body_formats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Collects the formats, hyperlink status and line breaks of each email body.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The formats for each body part.
+        """
+        return {
             body: {
-                "formats": fmt,
+                "formats": self.formats.get(body, {}),
                 "hyperlink": self.hyperlink_checkboxes.get(body, False),
                 "line_breaks": self.line_breaks.get(body, 0),
             }
-            for body, fmt in self.formats.items()
+            for body in {
+                **self.formats,
+                **self.hyperlink_checkboxes,
+                **self.line_breaks,
+            }
         }
-        asyncio.run(self.controller.send_emails(sender_email, formats))
-        self.status_label.text = self.controller.status_message
+
+    def shutdown(self) -> None:
+        """
+        Closes the controller resources and stops the event loop.
+        """
+        self.runner.run(self.controller.close())
+        self.runner.stop()
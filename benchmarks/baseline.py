@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List
+
+
+class BaselineStore:
+    """
+    Stores benchmark results as JSON baselines and compares new runs against them.
+
+    Attributes:
+        path (str): The path to the baseline JSON file.
+        threshold (float): The relative change that is considered a regression.
+    """
+
+    # Metrics where a higher value is better; every other compared metric is
+    # considered better when lower.
+    HIGHER_IS_BETTER = ("throughput",)
+    COMPARED_METRICS = ("throughput", "alloc_peak_mb")
+
+    def __init__(self, path: str, threshold: float = 0.10) -> None:
+        """
+        Initializes the BaselineStore instance with the baseline path and threshold.
+        """
+        self.path = path
+        self.threshold = threshold
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Loads the stored baseline.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The baseline results keyed by benchmark name,
+            or an empty dictionary if there is no baseline yet.
+        """
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def save(self, results: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Saves the results as the new baseline.
+
+        Args:
+            results (Dict[str, Dict[str, Any]]): The results keyed by benchmark name.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        logging.info(f"Baseline saved to {self.path}")
+
+    def compare(self, results: Dict[str, Dict[str, Any]]) -> List[str]:
+        """
+        Compares the results with the stored baseline.
+
+        Args:
+            results (Dict[str, Dict[str, Any]]): The results keyed by benchmark name.
+
+        Returns:
+            List[str]: A description of each regression beyond the threshold.
+        """
+        baseline = self.load()
+        regressions = []
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if not previous:
+                continue
+            for metric in self.COMPARED_METRICS:
+                old, new = previous.get(metric), result.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                if metric in self.HIGHER_IS_BETTER:
+                    change = -change
+                if change > self.threshold:
+                    regressions.append(
+                        f"{name}: {metric} went from {old} to {new} "
+                        f"({change:+.1%} worse, threshold {self.threshold:.0%})"
+                    )
+        return regressions
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import threading
+from typing import Optional
+
+from aiohttp import web
+
+
+class FakeGraphServer:
+    """
+    A local HTTP server that mimics the Microsoft Graph sendMail endpoint, so the
+    send stage can be benchmarked without touching the real API.
+
+    Attributes:
+        host (str): The interface the server binds to.
+        port (int): The port the server binds to (0 picks a free port).
+        latency (float): The artificial latency, in seconds, added to each response.
+        requests_received (int): The number of sendMail requests received.
+        bytes_received (int): The total size of the received request bodies.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        """
+        Initializes the FakeGraphServer instance with the bind address and latency.
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.requests_received = 0
+        self.bytes_received = 0
+        self._runner: Optional[web.AppRunner] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """
+        Returns the base URL to be used as GRAPH_API_URL.
+        """
+        return f"http://{self.host}:{self.port}/v1.0"
+
+    async def start(self) -> None:
+        """
+        Starts the server and resolves the bound port.
+        """
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/v1.0/users/{user}/sendMail", self._handle_send_mail)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logging.info(f"Fake Graph server listening on {self.url}")
+
+    async def stop(self) -> None:
+        """
+        Stops the server.
+        """
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_background(self) -> None:
+        """
+        Starts the server on its own event loop in a daemon thread, so that
+        benchmarks can drive the client side with asyncio.run.
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.start(), self._loop).result()
+
+    def stop_background(self) -> None:
+        """
+        Stops a server started with start_in_background.
+        """
+        if not self._loop:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+    async def _handle_send_mail(self, request: web.Request) -> web.Response:
+        """
+        Handles a sendMail request, accepting it like Graph does.
+
+        Args:
+            request (web.Request): The incoming request.
+
+        Returns:
+            web.Response: An empty 202 Accepted response.
+        """
+        body = await request.read()
+        self.requests_received += 1
+        self.bytes_received += len(body)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.Response(status=202)
@@ -0,0 +1,69 @@
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Returns the peak resident set size of the current process in megabytes.
+
+    Returns:
+        Optional[float]: The peak RSS, or None if the platform does not expose it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 2)
+
+
+def measure(
+    name: str, func: Callable[[], Any], items: int, repeat: int = 3
+) -> Dict[str, Any]:
+    """
+    Measures the wall time, throughput and allocations of a benchmark stage.
+
+    Timing runs are executed without tracemalloc, which would distort them. A final
+    run is traced to collect the allocation figures.
+
+    Args:
+        name (str): The name of the stage.
+        func (Callable[[], Any]): The stage to measure.
+        items (int): The number of items processed by one call, used for throughput.
+        repeat (int): The number of timing runs; the fastest one is reported.
+
+    Returns:
+        Dict[str, Any]: The measured figures for the stage.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    blocks_after = sys.getallocatedblocks()
+
+    return {
+        "stage": name,
+        "items": items,
+        "seconds": round(best, 6),
+        "throughput": round(items / best, 2) if best else None,
+        "alloc_peak_mb": round(peak / (1024 * 1024), 3),
+        "alloc_net_blocks": blocks_after - blocks_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
@@ -0,0 +1,231 @@
+"""
+Benchmark suite for the parse, format, payload build and send stages.
+
+Usage:
+    python -m benchmarks.run_benchmarks --rows 1000 10000 --body-columns 3 --body-size 500
+    python -m benchmarks.run_benchmarks --save-baseline
+    python -m benchmarks.run_benchmarks --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import copy
+import itertools
+import json
+import logging
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+# Settings requires the credentials to be defined; the benchmarks never reach the
+# real API, so placeholders are enough.
+for _name in ("CLIENT_ID", "TENANT_ID", "CLIENT_SECRET", "USER_EMAIL", "API_SCOPE"):
+    os.environ.setdefault(_name, "benchmark")
+for _name in ("EXCEL_FILE_PATH", "APP_TITLE", "APP_ICON_PATH"):
+    os.environ.setdefault(_name, "")
+# The parse stage measures the readers; the snapshot cache has its own stage
+os.environ.setdefault("SNAPSHOT_CACHE_MAX_FILES", "0")
+
+from app.config.settings import Settings  # noqa: E402
+from app.enum.email_format_type import EmailFormatType  # noqa: E402
+from app.services.email_formatter import EmailFormatter  # noqa: E402
+from app.services.process_excel import ExcelProcessor  # noqa: E402
+from app.services.send_email import EmailSender  # noqa: E402
+from benchmarks.baseline import BaselineStore  # noqa: E402
+from benchmarks.fake_graph_server import FakeGraphServer  # noqa: E402
+from benchmarks.measurement import measure  # noqa: E402
+from benchmarks.workbook_generator import WorkbookGenerator  # noqa: E402
+
+DEFAULT_BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baselines", "baseline.json"
+)
+SENDER_EMAIL = "sender@example.com"
+
+
+def build_formats(body_columns: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Builds a format configuration that exercises every formatting option.
+
+    Args:
+        body_columns (int): The number of body columns in the workbook.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The formats for each body part.
+    """
+    format_types = [
+        EmailFormatType.NEGRITO.value,
+        EmailFormatType.ITALICO.value,
+        EmailFormatType.SUBLINHADO.value,
+        EmailFormatType.AUMENTAR_FONTE.value,
+    ]
+    return {
+        f"CORPO E-MAIL {i + 1}": {
+            "formats": {format_types[i % len(format_types)]: True},
+            "hyperlink": False,
+            "line_breaks": 1,
+        }
+        for i in range(body_columns)
+    }
+
+
+def run_scenario(
+    settings: Settings,
+    workdir: str,
+    rows: int,
+    body_columns: int,
+    body_size: int,
+    repeat: int,
+) -> List[Dict[str, Any]]:
+    """
+    Runs every stage benchmark for one workbook shape.
+
+    Args:
+        settings (Settings): The application settings, pointing at the fake server.
+        workdir (str): The directory where the synthetic workbook is written.
+        rows (int): The number of email rows.
+        body_columns (int): The number of body columns.
+        body_size (int): The number of characters in each body cell.
+        repeat (int): The number of timing runs per stage.
+
+    Returns:
+        List[Dict[str, Any]]: The measured figures for each stage.
+    """
+    file_path = os.path.join(workdir, f"bench_{rows}_{body_columns}_{body_size}.xlsx")
+    WorkbookGenerator().generate(file_path, rows, body_columns, body_size)
+    formats = build_formats(body_columns)
+    processor = ExcelProcessor(file_path, settings)
+    snapshot_settings = copy.copy(settings)
+    snapshot_settings.DATA_DIR = workdir
+    snapshot_settings.SNAPSHOT_CACHE_MAX_FILES = 1
+    snapshot_processor = ExcelProcessor(file_path, snapshot_settings)
+    formatter = EmailFormatter(settings)
+    sender = EmailSender("benchmark-token", settings.API_SCOPE, SENDER_EMAIL, settings)
+
+    email_data = processor.process_excel()
+    snapshot_processor.process_excel()  # Writes the snapshot
+    formatted = formatter.format_emails(email_data, formats)
+
+    def build_payloads() -> None:
+        for i, body in enumerate(formatted["bodies"]):
+            payload = sender.build_payload(
+                body,
+                formatted["subjects"][i],
+                formatted["recipients"][i],
+                formatted["cc"][i],
+                formatted["cco"][i],
+            )
+            json.dumps(payload)
+
+    def send(data: Dict[str, list]) -> None:
+        asyncio.run(
+            sender.send_emails(
+                data["bodies"],
+                data["subjects"],
+                data["recipients"],
+                data["cc"],
+                data["cco"],
+            )
+        )
+
+    def end_to_end() -> None:
+        data = formatter.format_emails(processor.process_excel(), formats)
+        send(data)
+
+    stages = [
+        ("parse", processor.process_excel),
+        ("parse_snapshot", snapshot_processor.process_excel),
+        ("format", lambda: formatter.format_emails(email_data, formats)),
+        ("payload_build", build_payloads),
+        ("send", lambda: send(formatted)),
+        ("end_to_end", end_to_end),
+    ]
+    results = []
+    for stage, func in stages:
+        result = measure(stage, func, rows, repeat)
+        result.update(rows=rows, body_columns=body_columns, body_size=body_size)
+        results.append(result)
+        print(
+            f"{stage:<14} rows={rows} cols={body_columns} size={body_size}: "
+            f"{result['seconds']:.4f}s, {result['throughput']} rows/s, "
+            f"alloc peak {result['alloc_peak_mb']} MB, "
+            f"peak RSS {result['peak_rss_mb']} MB"
+        )
+    processor.close()
+    return results
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+
+    Args:
+        argv (List[str]): The command line arguments.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000])
+    parser.add_argument("--body-columns", type=int, nargs="+", default=[3])
+    parser.add_argument("--body-size", type=int, nargs="+", default=[500])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    """
+    Runs the benchmark suite.
+
+    Args:
+        argv (List[str]): The command line arguments.
+
+    Returns:
+        int: The exit code; 1 when a regression beyond the threshold is found.
+    """
+    # Keep per-request logging from dominating the measurements
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args(argv)
+
+    server = FakeGraphServer(latency=args.latency)
+    server.start_in_background()
+    settings = Settings()
+    settings.GRAPH_API_URL = server.url
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for rows, body_columns, body_size in itertools.product(
+                args.rows, args.body_columns, args.body_size
+            ):
+                for result in run_scenario(
+                    settings, workdir, rows, body_columns, body_size, args.repeat
+                ):
+                    name = (
+                        f"{result['stage']}[rows={rows},cols={body_columns},"
+                        f"size={body_size}]"
+                    )
+                    results[name] = result
+    finally:
+        server.stop_background()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+    store = BaselineStore(args.baseline, args.threshold)
+    regressions = store.compare(results)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if args.save_baseline:
+        store.save(results)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,89 @@
+import os
+import random
+import string
+from typing import Dict, List
+
+import pandas as pd
+
+from app.enum.excel_columns import ExcelColumns
+
+
+class WorkbookGenerator:
+    """
+    Generates synthetic Excel workbooks that follow the spreadsheet schema expected
+    by the ExcelProcessor.
+
+    Attributes:
+        seed (int): The seed used for the pseudo-random text generator.
+    """
+
+    def __init__(self, seed: int = 42) -> None:
+        """
+        Initializes the WorkbookGenerator instance with a deterministic random seed.
+        """
+        self.seed = seed
+
+    def generate(
+        self, file_path: str, rows: int, body_columns: int, body_size: int
+    ) -> str:
+        """
+        Writes a workbook with the given shape to disk.
+
+        Args:
+            file_path (str): The path where the workbook will be written.
+            rows (int): The number of email rows.
+            body_columns (int): The number of "CORPO E-MAIL" columns.
+            body_size (int): The number of characters in each body cell.
+
+        Returns:
+            str: The path to the generated workbook.
+        """
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        df = pd.DataFrame(self.build_columns(rows, body_columns, body_size))
+        df.to_excel(file_path, index=False)
+        return file_path
+
+    def build_columns(
+        self, rows: int, body_columns: int, body_size: int
+    ) -> Dict[str, List[str]]:
+        """
+        Builds the column data for a synthetic workbook.
+
+        Args:
+            rows (int): The number of email rows.
+            body_columns (int): The number of "CORPO E-MAIL" columns.
+            body_size (int): The number of characters in each body cell.
+
+        Returns:
+            Dict[str, List[str]]: The workbook columns keyed by header.
+        """
+        rng = random.Random(self.seed)
+        columns = {
+            ExcelColumns.SUBJECT.value: [f"Assunto {i}" for i in range(rows)],
+            ExcelColumns.RECIPIENTS.value: [
+                f"para{i}@example.com;para{i}.b@example.com" for i in range(rows)
+            ],
+            ExcelColumns.CC.value: [f"cc{i}@example.com" for i in range(rows)],
+            ExcelColumns.CCO.value: [f"cco{i}@example.com" for i in range(rows)],
+        }
+        for column in range(body_columns):
+            header = f"{ExcelColumns.BODY_PREFIX.value} {column + 1}"
+            columns[header] = [self._random_text(rng, body_size) for _ in range(rows)]
+        return columns
+
+    @staticmethod
+    def _random_text(rng: random.Random, size: int) -> str:
+        """
+        Generates a pseudo-random text with words and line breaks.
+
+        Args:
+            rng (random.Random): The random generator.
+            size (int): The number of characters to generate.
+
+        Returns:
+            str: The generated text.
+        """
+        alphabet = string.ascii_letters + "     \n"
+        return "".join(rng.choices(alphabet, k=size)).strip() or "a"
@@ -23,6 +23,12 @@ class HomeApp(App):
         self.icon = self.settings.APP_ICON_PATH
         return MainScreen()
 
+    def on_stop(self) -> None:
+        """
+        Releases the resources of the main screen when the application closes.
+        """
+        self.root.shutdown()
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
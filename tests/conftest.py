@@ -0,0 +1,26 @@
+import pytest
+
+from app.config.settings import Settings
+
+# Variables Settings requires, with placeholder values
+REQUIRED_ENV_VARS = [
+    "CLIENT_ID",
+    "TENANT_ID",
+    "CLIENT_SECRET",
+    "USER_EMAIL",
+    "API_SCOPE",
+    "EXCEL_FILE_PATH",
+    "APP_TITLE",
+    "APP_ICON_PATH",
+]
+
+
+@pytest.fixture
+def settings(monkeypatch, tmp_path) -> Settings:
+    """
+    Settings with placeholder credentials and DATA_DIR in a temporary directory.
+    """
+    for name in REQUIRED_ENV_VARS:
+        monkeypatch.setenv(name, "test")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path / "data"))
+    return Settings()
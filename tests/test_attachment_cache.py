@@ -0,0 +1,87 @@
+import asyncio
+import base64
+import os
+
+import pytest
+
+from app.exceptions import EmailSendError
+from app.services import attachment_cache
+from app.services.attachment_cache import AttachmentCache
+
+
+def _write(path, content):
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_file_is_encoded_once(tmp_path):
+    cache = AttachmentCache(max_bytes=1024)
+    path = _write(tmp_path / "a.txt", b"hello")
+
+    first = cache.get_encoded(path)
+    second = cache.get_encoded(path)
+
+    assert first == base64.b64encode(b"hello")
+    assert second is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_same_content_under_another_path_is_shared(tmp_path):
+    cache = AttachmentCache(max_bytes=1024)
+    first = cache.get_encoded(_write(tmp_path / "a.txt", b"hello"))
+    other = _write(tmp_path / "b.txt", b"hello")
+    os.utime(other, ns=(1, 1))
+
+    assert cache.get_encoded(other) is first
+    assert cache.size == len(first)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_changed_file_is_read_again(tmp_path):
+    cache = AttachmentCache(max_bytes=1024)
+    path = _write(tmp_path / "a.txt", b"hello")
+    cache.get_encoded(path)
+    _write(tmp_path / "a.txt", b"changed content")
+
+    assert cache.get_encoded(path) == base64.b64encode(b"changed content")
+    assert cache.misses == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = AttachmentCache(max_bytes=10)
+    first = _write(tmp_path / "a.txt", b"aaaaaa")
+    second = _write(tmp_path / "b.txt", b"bbbbbb")
+    cache.get_encoded(first)
+    cache.get_encoded(second)
+
+    assert cache.size == 8
+    assert cache.lookup(first) is None
+    assert cache.lookup(second) is not None
+
+
+def test_missing_file_raises(tmp_path):
+    cache = AttachmentCache(max_bytes=1024)
+
+    with pytest.raises(EmailSendError):
+        cache.get_encoded(str(tmp_path / "missing.txt"))
+
+
+def test_async_lookup_encodes_misses_in_a_thread(tmp_path, monkeypatch):
+    cache = AttachmentCache(max_bytes=1024)
+    path = _write(tmp_path / "a.txt", b"hello")
+    calls = []
+    to_thread = asyncio.to_thread
+
+    async def recording_to_thread(function, *args):
+        calls.append(function)
+        return await to_thread(function, *args)
+
+    monkeypatch.setattr(attachment_cache.asyncio, "to_thread", recording_to_thread)
+
+    async def get_twice():
+        return await cache.get_encoded_async(path), await cache.get_encoded_async(path)
+
+    first, second = asyncio.run(get_twice())
+
+    assert first == second == base64.b64encode(b"hello")
+    assert calls == [cache.get_encoded]
@@ -0,0 +1,54 @@
+from app.enum.format_flag import FormatFlag
+from app.services.body_format import (
+    FLAG_COMBINATIONS,
+    BodyFormatPlan,
+    format_flags,
+    tag_table,
+)
+
+
+def test_format_flags_ignore_formats_toggled_off():
+    format_info = {
+        "formats": {"Negrito": True, "Itálico": False, "Aumentar Fonte": True},
+        "hyperlink": True,
+    }
+    assert format_flags(format_info) == (
+        FormatFlag.NEGRITO | FormatFlag.AUMENTAR_FONTE | FormatFlag.HYPERLINK
+    )
+    assert format_flags({}) == FormatFlag(0)
+
+
+def test_tag_table_covers_every_combination():
+    table = tag_table(1.0, 0.5)
+    assert len(table) == FLAG_COMBINATIONS
+    opening, closing = table[FormatFlag.NEGRITO | FormatFlag.SUBLINHADO]
+    assert opening == "<span style='font-size: 1.0em;'><u><b>"
+    assert closing == "</b></u></span>"
+    assert table[FormatFlag.AUMENTAR_FONTE][0].startswith(
+        "<span style='font-size: 1.5em;'>"
+    )
+
+
+def test_render_part_applies_column_formats_and_line_breaks(settings):
+    plan = BodyFormatPlan(
+        settings,
+        {"CORPO E-MAIL 2": {"formats": {"Itálico": True}, "line_breaks": 2}},
+    )
+    size = settings.DEFAULT_FONT_SIZE
+    assert plan.render_part(0, "a") == f"<span style='font-size: {size}em;'>a</span>"
+    assert plan.render_part(1, "b") == (
+        f"<span style='font-size: {size}em;'><i>b</i></span><br><br>"
+    )
+    assert plan.render("CORPO E-MAIL 2", "b") == plan.render_part(1, "b")
+
+
+def test_hyperlink_target_is_escaped(settings):
+    plan = BodyFormatPlan(settings, {"CORPO E-MAIL 1": {"hyperlink": True}})
+    href = "http://x/?q='1'&r=\"2\"><script>"
+
+    rendered = plan.render_part(0, "link", href=href)
+
+    assert (
+        '<a href="http://x/?q=&#x27;1&#x27;&amp;r=&quot;2&quot;&gt;&lt;script&gt;">'
+        "link</a>"
+    ) in rendered
@@ -0,0 +1,116 @@
+from app.controller.home_controller import HomeController
+from app.enum.duplicate_policy import DuplicatePolicy
+from app.services.dedup_index import (
+    EMPTY_SLOT,
+    DuplicateDetector,
+    FingerprintIndex,
+    fingerprint,
+)
+
+
+def _message(row, recipients="a@x.com", body="Corpo", **fields):
+    message = {
+        "row": row,
+        "subject": "Assunto",
+        "body": body,
+        "recipients": recipients,
+        "cc": "",
+        "cco": "",
+        "attachments": "",
+    }
+    message.update(fields)
+    return message
+
+
+def _email_data(rows):
+    return {
+        "rows": [row for row, _, _ in rows],
+        "recipients": [recipients for _, recipients, _ in rows],
+        "bodies": [bodies for _, _, bodies in rows],
+        "subjects": ["Assunto"] * len(rows),
+        "cc": [""] * len(rows),
+        "cco": [""] * len(rows),
+        "attachments": [""] * len(rows),
+    }
+
+
+def test_index_returns_first_row_of_repeated_fingerprint():
+    index = FingerprintIndex()
+    assert index.add(42, row=2) is None
+    assert index.add(43, row=3) is None
+    assert index.add(42, row=7) == 2
+    assert index.count == 2
+
+
+def test_index_grows_and_keeps_entries():
+    index = FingerprintIndex(capacity=4)
+    initial_slots = len(index._keys)
+    for key in range(1, 1001):
+        assert index.add(key * 7919, row=key) is None
+
+    assert len(index._keys) > initial_slots
+    assert index.count <= len(index._keys) * 0.5
+    for key in range(1, 1001):
+        assert index.add(key * 7919, row=0) == key
+
+
+def test_index_probes_past_colliding_slots():
+    index = FingerprintIndex(capacity=4)
+    slots = len(index._keys)
+    # Same low bits, so the same home slot
+    colliding = [5 + slots * multiple for multiple in range(1, 6)]
+    for row, key in enumerate(colliding):
+        assert index.add(key, row) is None
+
+    assert [index.add(key, 99) for key in colliding] == list(range(5))
+    assert index.add(5 + slots * 100, 99) is None
+
+
+def test_fingerprint_normalizes_recipients_and_is_never_empty():
+    first = _message(2, recipients="B@x.com; a@x.com;a@x.com")
+    second = _message(3, recipients="a@x.com;b@x.com")
+    assert fingerprint(first) == fingerprint(second)
+    assert fingerprint(first) != fingerprint(_message(4, body="Outro corpo"))
+    assert fingerprint(first) != EMPTY_SLOT
+
+
+def test_drop_policy_drops_repeats():
+    detector = DuplicateDetector(DuplicatePolicy.DROP)
+    assert detector.should_send(_message(2))
+    assert not detector.should_send(_message(3))
+    assert detector.should_send(_message(4, recipients="c@x.com"))
+    assert detector.duplicates == {3: 2}
+
+
+def test_flag_policy_sends_and_records_repeats():
+    detector = DuplicateDetector(DuplicatePolicy.FLAG)
+    assert detector.should_send(_message(2))
+    assert detector.should_send(_message(3))
+    assert detector.duplicates == {3: 2}
+
+
+def test_off_policy_records_nothing():
+    detector = DuplicateDetector(DuplicatePolicy.OFF)
+    assert detector.should_send(_message(2))
+    assert detector.should_send(_message(3))
+    assert detector.duplicates == {}
+    assert detector.index.count == 0
+
+
+def test_duplicate_rows_are_dropped_before_planning():
+    email_data = _email_data(
+        [
+            (2, "a@x.com", ["Olá", "Até"]),
+            (3, "a@x.com", ["Olá", "Até"]),
+            (4, "b@x.com", ["Olá", "Até"]),
+            (5, "a@x.com", ["OláAté", ""]),
+        ]
+    )
+    detector = DuplicateDetector(DuplicatePolicy.DROP, len(email_data["rows"]))
+
+    kept, duplicate_results = HomeController._drop_duplicates(email_data, detector)
+
+    assert kept["rows"] == [2, 4, 5]
+    assert kept["bodies"][1] == ["Olá", "Até"]
+    assert [result["row"] for result in duplicate_results] == [3]
+    assert duplicate_results[0]["error"] == "Duplicado da linha 2"
@@ -0,0 +1,135 @@
+import asyncio
+import json
+from email import message_from_bytes
+from email.policy import default
+
+import pytest
+
+from app.enum.dry_run_format import DryRunFormat
+from app.enum.send_status import SendStatus
+from app.services import metrics
+from app.services.dry_run import JSONL_FILE_NAME, DryRunEmailSender, DryRunWriter
+from app.services.fan_out import fan_out
+
+
+def _campaign(tmp_path):
+    small = tmp_path / "small.txt"
+    small.write_bytes(b"anexo pequeno")
+    large = tmp_path / "large.bin"
+    large.write_bytes(b"\x01" * 1000)
+    return [
+        {
+            "row": 2,
+            "body": '<p>"Olá"</p>',
+            "subject": "Assunto",
+            "recipients": "a@x.com;b@x.com",
+            "cc": "c@x.com",
+            "cco": "",
+            "attachments": str(small),
+        },
+        {
+            "row": 3,
+            "body": "<p>Relatório</p>",
+            "subject": "Relatório",
+            "recipients": "d@x.com",
+            "cc": "",
+            "cco": "",
+            "attachments": str(large),
+        },
+    ]
+
+
+async def _stream(messages):
+    for message in messages:
+        yield message
+
+
+def _dry_run(settings, tmp_path, output_format):
+    # The small file fits in the sendMail request, the large one would be uploaded
+    settings.ATTACHMENT_INLINE_LIMIT = 200
+    directory = tmp_path / "dry_run"
+    writer = DryRunWriter(str(directory), output_format)
+    sender = DryRunEmailSender("s@x.com", settings, writer)
+    sent = metrics.MESSAGES[SendStatus.SENT.value].value
+    dry_run = metrics.DRY_RUN_MESSAGES.value
+    try:
+        results = asyncio.run(
+            sender.send_messages(fan_out(_stream(_campaign(tmp_path))))
+        )
+    finally:
+        writer.close()
+
+    assert [(result["row"], result["status"]) for result in results] == [
+        (2, SendStatus.SENT.value),
+        (2, SendStatus.SENT.value),
+        (3, SendStatus.SENT.value),
+    ]
+    assert writer.written == 3
+    # Dry runs are counted apart from the sent emails
+    assert metrics.DRY_RUN_MESSAGES.value - dry_run == 3
+    assert metrics.MESSAGES[SendStatus.SENT.value].value == sent
+    return directory
+
+
+def test_jsonl_records_the_payload_of_each_email(settings, tmp_path):
+    directory = _dry_run(settings, tmp_path, DryRunFormat.JSONL)
+
+    with open(directory / JSONL_FILE_NAME, encoding="utf-8") as file:
+        records = [json.loads(line) for line in file]
+    records.sort(key=lambda record: (record["row"], record["copy"] or 0))
+
+    assert [(record["row"], record["copy"]) for record in records] == [
+        (2, 0),
+        (2, 1),
+        (3, None),
+    ]
+    assert all(record["sender"] == "s@x.com" for record in records)
+    first, second, upload = (record["payload"]["message"] for record in records)
+    assert first["toRecipients"] == [{"emailAddress": {"address": "a@x.com"}}]
+    assert first["ccRecipients"] == [{"emailAddress": {"address": "c@x.com"}}]
+    assert "ccRecipients" not in second
+    assert first["body"]["content"] == second["body"]["content"] == '<p>"Olá"</p>'
+    assert first["attachments"][0]["name"] == "small.txt"
+    assert first["attachments"][0]["contentBytes"] == "YW5leG8gcGVxdWVubw=="
+    assert "attachments" not in upload
+    assert records[2]["uploads"] == [
+        {"path": str(tmp_path / "large.bin"), "size": 1000, "content_id": None}
+    ]
+
+
+def test_eml_writes_one_file_per_email(settings, tmp_path):
+    directory = _dry_run(settings, tmp_path, DryRunFormat.EML)
+
+    assert sorted(path.name for path in directory.iterdir()) == [
+        "row_2_0.eml",
+        "row_2_1.eml",
+        "row_3.eml",
+    ]
+    first = message_from_bytes((directory / "row_2_0.eml").read_bytes(), policy=default)
+    second = message_from_bytes(
+        (directory / "row_2_1.eml").read_bytes(), policy=default
+    )
+    upload = message_from_bytes((directory / "row_3.eml").read_bytes(), policy=default)
+    assert (first["From"], first["To"], first["Cc"]) == (
+        "s@x.com",
+        "a@x.com",
+        "c@x.com",
+    )
+    assert (second["To"], second["Cc"]) == ("b@x.com", None)
+    assert first.get_body(("html",)).get_content().strip() == '<p>"Olá"</p>'
+    [attachment] = first.iter_attachments()
+    assert attachment.get_filename() == "small.txt"
+    assert attachment.get_content() == "anexo pequeno"
+    [uploaded] = upload.iter_attachments()
+    assert uploaded.get_filename() == "large.bin"
+    assert uploaded.get_content() == b"\x01" * 1000
+
+
+def test_writer_failure_is_raised_on_close(tmp_path):
+    writer = DryRunWriter(str(tmp_path), DryRunFormat.EML)
+
+    asyncio.run(writer.write({"row": 2, "copy": None, "payload": {}}))
+
+    with pytest.raises(KeyError):
+        writer.close()
+    assert writer.written == 0
@@ -0,0 +1,138 @@
+import asyncio
+
+from app.services.fair_share import FairShareLimiter
+
+
+async def _waiting(limiter: FairShareLimiter, job_id: str) -> asyncio.Task:
+    """
+    Starts an acquire for a job and lets it reach the wait.
+    """
+    task = asyncio.ensure_future(limiter.acquire(job_id))
+    await asyncio.sleep(0)
+    return task
+
+
+def test_acquire_within_capacity_is_immediate():
+    async def scenario():
+        limiter = FairShareLimiter(2)
+        limiter.share("a")
+        await limiter.acquire("a")
+        await limiter.acquire("a")
+        assert limiter.in_use == 2
+        limiter.release("a")
+        assert limiter.in_use == 1
+
+    asyncio.run(scenario())
+
+
+def test_freed_slot_goes_to_job_with_smallest_share():
+    async def scenario():
+        limiter = FairShareLimiter(2)
+        limiter.share("big")
+        limiter.share("small")
+        await limiter.acquire("big")
+        await limiter.acquire("big")
+        big = await _waiting(limiter, "big")
+        small = await _waiting(limiter, "small")
+
+        limiter.release("big")
+        await asyncio.sleep(0)
+        assert small.done() and not big.done()
+        assert limiter._held == {"big": 1, "small": 1}
+
+        limiter.release("small")
+        await asyncio.sleep(0)
+        assert big.done()
+
+    asyncio.run(scenario())
+
+
+def test_weight_gives_larger_share():
+    async def scenario():
+        limiter = FairShareLimiter(3)
+        limiter.share("heavy", weight=2)
+        limiter.share("light", weight=1)
+        await limiter.acquire("heavy")
+        await limiter.acquire("light")
+        await limiter.acquire("light")
+        light = await _waiting(limiter, "light")
+        heavy = await _waiting(limiter, "heavy")
+
+        # heavy holds 1/2 of its weight, light 2/1
+        limiter.release("light")
+        await asyncio.sleep(0)
+        assert heavy.done() and not light.done()
+        light.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        limiter = FairShareLimiter(1)
+        limiter.share("a")
+        await limiter.acquire("a")
+        waiter = await _waiting(limiter, "a")
+        waiter.cancel()
+        await asyncio.sleep(0)
+        limiter.release("a")
+        assert limiter.in_use == 0
+        await limiter.acquire("a")
+        assert limiter.in_use == 1
+
+    asyncio.run(scenario())
+
+
+def test_resize_up_grants_waiters_and_down_keeps_holders():
+    async def scenario():
+        limiter = FairShareLimiter(1)
+        limiter.share("a")
+        await limiter.acquire("a")
+        waiters = [await _waiting(limiter, "a") for _ in range(3)]
+
+        limiter.resize(3)
+        await asyncio.sleep(0)
+        assert [waiter.done() for waiter in waiters] == [True, True, False]
+        assert limiter.in_use == 3
+
+        limiter.resize(1)
+        assert limiter.in_use == 3
+        limiter.release("a")
+        limiter.release("a")
+        await asyncio.sleep(0)
+        assert not waiters[2].done()
+        limiter.release("a")
+        await asyncio.sleep(0)
+        assert waiters[2].done()
+        assert limiter.in_use == 1
+
+    asyncio.run(scenario())
+
+
+def test_unregister_keeps_jobs_holding_slots():
+    async def scenario():
+        limiter = FairShareLimiter(1)
+        limiter.share("a")
+        await limiter.acquire("a")
+        limiter.unregister("a")
+        assert "a" in limiter._held
+        limiter.release("a")
+        limiter.unregister("a")
+        assert "a" not in limiter._held
+
+    asyncio.run(scenario())
+
+
+def test_job_share_context_releases_on_error():
+    async def scenario():
+        limiter = FairShareLimiter(1)
+        share = limiter.share("a")
+        try:
+            async with share:
+                assert limiter.in_use == 1
+                raise ValueError
+        except ValueError:
+            pass
+        assert limiter.in_use == 0
+
+    asyncio.run(scenario())
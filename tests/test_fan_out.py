@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+from app.enum.send_status import SendStatus
+from app.services.fan_out import encode_body, fan_out, split_recipients
+from app.services.json_payload import encode_json_pieces
+from app.services.result_writer import ResultWriter
+from app.services.send_email import EmailSender
+
+
+def _message(row, recipients, cc="", cco="", body="<p>Olá</p>"):
+    return {
+        "row": row,
+        "body": body,
+        "subject": "Assunto",
+        "recipients": recipients,
+        "cc": cc,
+        "cco": cco,
+    }
+
+
+async def _stream(messages):
+    for message in messages:
+        yield message
+
+
+def _expand(messages):
+    async def scenario():
+        return [copy async for copy in fan_out(_stream(messages))]
+
+    return asyncio.run(scenario())
+
+
+def test_split_recipients_ignores_empty_values():
+    assert split_recipients(" a@x.com ;; nan;b@x.com; ") == ["a@x.com", "b@x.com"]
+    assert split_recipients(None) == []
+
+
+def test_one_copy_per_to_address():
+    message = _message(2, "a@x.com; b@x.com;c@x.com", body='<p>"Olá"</p>')
+
+    copies = _expand([message])
+
+    assert [copy["recipients"] for copy in copies] == ["a@x.com", "b@x.com", "c@x.com"]
+    assert [copy["copy"] for copy in copies] == [0, 1, 2]
+    assert all(copy["row"] == 2 for copy in copies)
+    assert copies[0]["body_blob"] == encode_body(message["body"])
+    # The copies share the body and its encoding, made once per row
+    assert all(copy["body_blob"] is copies[0]["body_blob"] for copy in copies)
+    assert all(copy["body"] is message["body"] for copy in copies)
+
+
+def test_single_address_is_not_copied():
+    message = _message(2, "a@x.com", cc="c@x.com")
+
+    assert _expand([message]) == [message]
+
+
+def test_cc_and_cco_only_on_first_copy():
+    copies = _expand([_message(2, "a@x.com;b@x.com", cc="c@x.com", cco="d@x.com")])
+
+    assert (copies[0]["cc"], copies[0]["cco"]) == ("c@x.com", "d@x.com")
+    assert (copies[1]["cc"], copies[1]["cco"]) == ("", "")
+
+
+def test_copies_are_sent_separately_and_merged_per_row(settings):
+    class RecordingSender(EmailSender):
+        def __init__(self):
+            super().__init__("token", "scope", "s@x.com", settings)
+            self.sent = []
+
+        async def _post_send_mail(self, session, mailbox, headers, payload, blobs):
+            pieces = encode_json_pieces(payload, blobs)
+            message = json.loads(b"".join(bytes(piece) for piece in pieces))["message"]
+            to = [r["emailAddress"]["address"] for r in message["toRecipients"]]
+            if to == ["b@x.com"]:
+                raise RuntimeError("Erro 500")
+            self.sent.append((to, message.get("ccRecipients"), message["body"]))
+            return None
+
+    sender = RecordingSender()
+    messages = [
+        _message(2, "a@x.com;b@x.com", cc="c@x.com", body='<p>"Olá"</p>'),
+        _message(3, "d@x.com"),
+    ]
+
+    results = asyncio.run(sender.send_messages(fan_out(_stream(messages))))
+
+    # One result per copy, ordered by row
+    assert sorted(result["recipients"] for result in results[:2]) == [
+        "a@x.com",
+        "b@x.com",
+    ]
+    assert [result["row"] for result in results] == [2, 2, 3]
+    sent = {to[0]: (cc, body) for to, cc, body in sender.sent}
+    assert sent["a@x.com"][0] == [{"emailAddress": {"address": "c@x.com"}}]
+    assert sent["a@x.com"][1]["content"] == '<p>"Olá"</p>'
+    assert sent["d@x.com"][0] is None
+
+    cells = ResultWriter._group(results)
+    assert cells[2][0] == f"{SendStatus.SENT.value}, {SendStatus.FAILED.value}"
+    assert cells[2][1].startswith("b@x.com: ")
+    assert cells[2][2] == "s@x.com"
+    assert cells[3][0] == SendStatus.SENT.value
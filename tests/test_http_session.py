@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import time
+
+from app.services.http_session import HttpSessionManager
+
+
+def test_session_of_a_finished_loop_is_closed(settings):
+    manager = HttpSessionManager(settings)
+    first = asyncio.run(manager.get_session())
+
+    async def replace():
+        second = await manager.get_session()
+        replaced = second is not first and first.closed and not second.closed
+        await manager.close()
+        return replaced
+
+    assert asyncio.run(replace())
+
+
+def test_session_of_a_running_loop_is_closed_on_that_loop(settings):
+    manager = HttpSessionManager(settings)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        first = asyncio.run_coroutine_threadsafe(manager.get_session(), loop).result()
+
+        async def replace():
+            second = await manager.get_session()
+            deadline = time.monotonic() + 5
+            while not first.closed and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            await manager.close()
+            return second is not first
+
+        assert asyncio.run(replace())
+        assert first.closed
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def test_session_is_reused_on_the_same_loop(settings):
+    manager = HttpSessionManager(settings)
+
+    async def get_twice():
+        first = await manager.get_session()
+        second = await manager.get_session()
+        await manager.close()
+        return first, second
+
+    first, second = asyncio.run(get_twice())
+
+    assert first is second
+    assert first.closed
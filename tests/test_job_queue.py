@@ -0,0 +1,80 @@
+import pytest
+
+from app.enum.job_status import JobStatus
+from app.services.job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs" / "jobs.sqlite3"))
+    yield queue
+    queue.close()
+
+
+def test_claims_by_priority_then_queue_order(queue):
+    first = queue.enqueue("a.xlsx", "a@x.com", {}, priority=1)
+    urgent = queue.enqueue("b.xlsx", "a@x.com", {}, priority=5)
+    second = queue.enqueue("c.xlsx", "a@x.com", {}, priority=1)
+
+    claimed = [queue.claim_next()["id"] for _ in range(3)]
+
+    assert claimed == [urgent, first, second]
+    assert queue.claim_next() is None
+
+
+def test_claim_marks_job_running(queue):
+    formats = {"CORPO E-MAIL 1": {"formats": {"Negrito": True}, "line_breaks": 1}}
+    job_id = queue.enqueue("a.xlsx", "a@x.com;b@x.com", formats, priority=0)
+
+    job = queue.claim_next()
+
+    assert job["id"] == job_id
+    assert job["status"] == JobStatus.RUNNING.value
+    assert job["started_at"] is not None
+    assert job["formats"] == formats
+    assert job["priority"] == 1
+    assert queue.list_jobs(JobStatus.RUNNING)[0]["id"] == job_id
+    assert queue.list_jobs(JobStatus.PENDING) == []
+
+
+def test_finish_records_outcome(queue):
+    done = queue.enqueue("a.xlsx", "a@x.com", {})
+    failed = queue.enqueue("b.xlsx", "a@x.com", {})
+    queue.claim_next()
+    queue.claim_next()
+
+    queue.finish(done, JobStatus.DONE, "10 emails enviados")
+    queue.finish(failed, JobStatus.FAILED, "Erro")
+
+    jobs = {job["id"]: job for job in queue.list_jobs()}
+    assert jobs[done]["status"] == JobStatus.DONE.value
+    assert jobs[done]["message"] == "10 emails enviados"
+    assert jobs[done]["finished_at"] is not None
+    assert jobs[failed]["status"] == JobStatus.FAILED.value
+
+
+def test_reopen_fails_running_jobs_and_keeps_pending(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    queue = JobQueue(path)
+    running = queue.enqueue("a.xlsx", "a@x.com", {})
+    pending = queue.enqueue("b.xlsx", "a@x.com", {})
+    queue.claim_next()
+    queue.close()
+
+    reopened = JobQueue(path)
+    try:
+        jobs = {job["id"]: job for job in reopened.list_jobs()}
+        assert jobs[running]["status"] == JobStatus.FAILED.value
+        assert jobs[running]["message"] == "Interrompido antes de terminar"
+        assert jobs[pending]["status"] == JobStatus.PENDING.value
+        assert reopened.claim_next()["id"] == pending
+    finally:
+        reopened.close()
+
+
+def test_for_settings_uses_data_dir(settings):
+    queue = JobQueue.for_settings(settings)
+    try:
+        assert queue.path.startswith(settings.DATA_DIR)
+    finally:
+        queue.close()
@@ -0,0 +1,61 @@
+import asyncio
+import base64
+import json
+
+from app.services.json_payload import (
+    JsonPiecesPayload,
+    blob_reference,
+    encode_json_pieces,
+)
+
+
+def test_blobs_are_spliced_uncopied():
+    first = base64.b64encode(b"first attachment")
+    second = bytearray(base64.b64encode(b"second"))
+    document = {
+        "attachments": [
+            {"name": "a.txt", "contentBytes": blob_reference(0)},
+            {"name": "b.txt", "contentBytes": blob_reference(1)},
+        ]
+    }
+
+    pieces = encode_json_pieces(document, [first, second])
+
+    assert any(piece is first for piece in pieces)
+    assert any(piece is second for piece in pieces)
+    decoded = json.loads(b"".join(bytes(piece) for piece in pieces))
+    assert decoded["attachments"][0]["contentBytes"] == first.decode()
+    assert decoded["attachments"][1]["contentBytes"] == second.decode()
+
+
+def test_document_without_blobs_is_one_piece():
+    pieces = encode_json_pieces({"subject": "blob:0"}, [])
+    assert pieces == [json.dumps({"subject": "blob:0"}).encode()]
+
+
+def test_same_blob_can_be_referenced_twice():
+    blob = b'Corpo \\"com\\" aspas'
+    document = {"a": blob_reference(0), "b": blob_reference(0)}
+
+    decoded = json.loads(b"".join(encode_json_pieces(document, [blob])))
+
+    assert decoded == {"a": 'Corpo "com" aspas', "b": 'Corpo "com" aspas'}
+
+
+def test_payload_writes_pieces_in_order():
+    class Writer:
+        def __init__(self):
+            self.chunks = []
+
+        async def write(self, chunk):
+            self.chunks.append(bytes(chunk))
+
+    pieces = [b'{"a": "', memoryview(b"xyz"), b'"}']
+    payload = JsonPiecesPayload(pieces)
+    writer = Writer()
+
+    asyncio.run(payload.write(writer))
+
+    assert payload.size == 12
+    assert b"".join(writer.chunks) == b'{"a": "xyz"}'
+    assert payload.decode() == '{"a": "xyz"}'
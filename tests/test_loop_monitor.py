@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import time
+
+from app.services import metrics
+from app.services.loop_monitor import LoopLagMonitor
+
+
+def test_samples_record_the_lag(monkeypatch):
+    lags = []
+    monkeypatch.setattr(metrics.LOOP_LAG, "observe", lags.append)
+    monitor = LoopLagMonitor(interval=0.01, block_threshold=0)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.02)
+        # A callback that holds the loop past the next sample
+        time.sleep(0.1)
+        await asyncio.sleep(0.05)
+        monitor.stop()
+
+    asyncio.run(scenario())
+
+    assert max(lags) >= 0.08
+    assert monitor.last_lag < 0.08
+    assert monitor._watchdog is None
+
+
+def test_blocking_callback_is_logged_once(caplog):
+    monitor = LoopLagMonitor(interval=0.01, block_threshold=0.1)
+    blocks = metrics.LOOP_BLOCKS.value
+
+    def blocking_call():
+        time.sleep(0.4)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.02)
+        blocking_call()
+        await asyncio.sleep(0.02)
+        monitor.stop()
+
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(scenario())
+
+    warnings = [r.message for r in caplog.records if "bloqueado" in r.message]
+    assert len(warnings) == 1
+    assert "blocking_call" in warnings[0]
+    assert metrics.LOOP_BLOCKS.value == blocks + 1
+    assert monitor._watchdog is None
+
+
+def test_start_twice_keeps_one_sampler():
+    monitor = LoopLagMonitor(interval=0.01, block_threshold=0.5)
+
+    async def scenario():
+        monitor.start()
+        task, watchdog = monitor._task, monitor._watchdog
+        monitor.start()
+        same = monitor._task is task and monitor._watchdog is watchdog
+        monitor.stop()
+        return same
+
+    assert asyncio.run(scenario())
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from app.exceptions import ExcelReadError
+from app.services.process_excel import ExcelProcessor
+
+pytest.importorskip("pyarrow")
+
+CSV_ROWS = (
+    'E-MAIL ASSUNTO;"E-MAIL PARA (separar com ;)";CORPO E-MAIL 1\n'
+    "Assunto 1;a@x.com;Corpo 1\n"
+    "Assunto 2;b@x.com;Corpo 2\n"
+)
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "campanha.csv"
+    path.write_text(CSV_ROWS, encoding="utf-8")
+    return str(path)
+
+
+def _snapshots(settings):
+    directory = os.path.join(settings.DATA_DIR, "snapshots")
+    return os.listdir(directory) if os.path.isdir(directory) else []
+
+
+def test_wrong_delimiter_is_not_cached(settings, csv_file):
+    settings.SNAPSHOT_CACHE_MAX_FILES = 5
+    settings.CSV_DELIMITER = ","
+
+    with pytest.raises(ExcelReadError, match="Missing required columns"):
+        ExcelProcessor(csv_file, settings).process_excel()
+    assert _snapshots(settings) == []
+
+    settings.CSV_DELIMITER = ";"
+    email_data = ExcelProcessor(csv_file, settings).process_excel()
+
+    assert email_data["subjects"] == ["Assunto 1", "Assunto 2"]
+    assert len(_snapshots(settings)) == 1
+
+
+def test_snapshot_is_keyed_by_parsing_settings(settings, csv_file):
+    settings.SNAPSHOT_CACHE_MAX_FILES = 5
+    settings.CSV_DELIMITER = ";"
+    ExcelProcessor(csv_file, settings).process_excel()
+    ExcelProcessor(csv_file, settings).process_excel()
+    assert len(_snapshots(settings)) == 1
+
+    settings.CSV_ENCODING = "latin-1"
+    email_data = ExcelProcessor(csv_file, settings).process_excel()
+
+    assert email_data["recipients"] == ["a@x.com", "b@x.com"]
+    assert len(_snapshots(settings)) == 2
+
+
+def test_nul_characters_are_removed(settings, tmp_path):
+    path = tmp_path / "nul.csv"
+    path.write_bytes(
+        b'E-MAIL ASSUNTO;"E-MAIL PARA (separar com ;)";CORPO E-MAIL 1\n'
+        b"\x00blob:0\x00;a@x.com;Corpo\x00 1\n"
+    )
+    settings.CSV_DELIMITER = ";"
+
+    email_data = ExcelProcessor(str(path), settings).process_excel()
+
+    assert email_data["subjects"] == ["blob:0"]
+    assert email_data["bodies"] == [["Corpo 1"]]
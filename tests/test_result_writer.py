@@ -0,0 +1,129 @@
+import os
+from datetime import datetime
+
+from openpyxl import Workbook, load_workbook
+
+from app.enum.result_write_back import ResultWriteBack
+from app.enum.send_status import SendStatus
+from app.services.result_writer import RESULT_COLUMNS, ROW_COLUMN, ResultWriter
+
+SENT = SendStatus.SENT.value
+FAILED = SendStatus.FAILED.value
+
+
+def _result(row, status, recipients, sender=None, error=None, finished_at=None):
+    return {
+        "row": row,
+        "status": status,
+        "recipients": recipients,
+        "sender": sender,
+        "error": error,
+        "finished_at": finished_at,
+    }
+
+
+def _workbook(path, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Campanha"
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+def _values(path):
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = [list(row) for row in workbook.worksheets[0].iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+    # Trailing empty cells are not stored, so rows are read back shorter
+    width = len(rows[0])
+    return [row + [None] * (width - len(row)) for row in rows]
+
+
+def test_single_row_keeps_its_result():
+    cells = ResultWriter._group(
+        [_result(2, SENT, "a@x.com", sender="s@x.com", finished_at=1_700_000_000)]
+    )
+
+    assert cells == {2: (SENT, None, "s@x.com", datetime.fromtimestamp(1_700_000_000))}
+
+
+def test_copies_of_a_row_are_merged():
+    cells = ResultWriter._group(
+        [
+            _result(3, SENT, "a@x.com", sender="s1@x.com", finished_at=10),
+            _result(3, FAILED, "b@x.com", error="Erro 500", finished_at=20),
+            _result(3, SENT, "c@x.com", sender="s1@x.com", finished_at=15),
+        ]
+    )
+
+    status, error, sender, finished = cells[3]
+    assert status == f"{SENT}, {FAILED}"
+    assert error == "b@x.com: Erro 500"
+    assert sender == "s1@x.com"
+    assert finished == datetime.fromtimestamp(20)
+
+
+def test_missing_keys_leave_cells_empty():
+    cells = ResultWriter._group(
+        [
+            {"row": 2, "status": FAILED, "recipients": "a@x.com", "error": "x"},
+            {"row": 4, "status": SendStatus.DEFERRED.value, "recipients": "b@x.com"},
+        ]
+    )
+
+    assert cells == {
+        2: (FAILED, "x", None, None),
+        4: (SendStatus.DEFERRED.value, None, None, None),
+    }
+
+
+def test_annotate_appends_result_columns(tmp_path):
+    source = _workbook(
+        tmp_path / "campanha.xlsx",
+        [["E-MAIL ASSUNTO", "CORPO E-MAIL 1"], ["A", "x"], ["B"], ["C", "z"]],
+    )
+    results = [
+        _result(2, SENT, "a@x.com", sender="s@x.com"),
+        _result(4, FAILED, "c@x.com", error="Erro"),
+    ]
+
+    output = ResultWriter(ResultWriteBack.ANNOTATE).write(source, results)
+
+    assert output == str(tmp_path / "campanha_resultado.xlsx")
+    assert _values(output) == [
+        ["E-MAIL ASSUNTO", "CORPO E-MAIL 1"] + RESULT_COLUMNS,
+        ["A", "x", SENT, None, "s@x.com", None],
+        ["B", None, None, None, None, None],
+        ["C", "z", FAILED, "Erro", None, None],
+    ]
+
+
+def test_sidecar_holds_row_numbers_and_results(tmp_path):
+    source = tmp_path / "campanha.csv"
+    source.write_text("E-MAIL ASSUNTO\nA\nB\n", encoding="utf-8")
+    results = [
+        _result(3, FAILED, "b@x.com", error="Erro"),
+        _result(2, SENT, "a@x.com", sender="s@x.com"),
+    ]
+
+    output = ResultWriter(ResultWriteBack.ANNOTATE).write(str(source), results)
+
+    assert output == str(tmp_path / "campanha_resultado.xlsx")
+    assert _values(output) == [
+        [ROW_COLUMN] + RESULT_COLUMNS,
+        [2, SENT, None, "s@x.com", None],
+        [3, FAILED, "Erro", None, None],
+    ]
+
+
+def test_off_writes_nothing(tmp_path):
+    source = _workbook(tmp_path / "campanha.xlsx", [["E-MAIL ASSUNTO"], ["A"]])
+
+    output = ResultWriter(ResultWriteBack.OFF).write(source, [_result(2, SENT, "a")])
+
+    assert output is None
+    assert os.listdir(tmp_path) == ["campanha.xlsx"]
@@ -0,0 +1,104 @@
+import json
+import os
+import time
+
+import pytest
+
+from app.exceptions import RuntimeKnobError
+from app.services.runtime_knobs import RuntimeConfigWatcher, RuntimeKnobs
+
+
+@pytest.fixture
+def knobs(settings):
+    settings.AIOHTTP_LIMIT = 10
+    settings.MAILBOX_MESSAGES_PER_MINUTE = 30
+    return RuntimeKnobs(settings)
+
+
+def _write_config(path, values, mtime_ns=None):
+    path.write_text(json.dumps(values), encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_knobs_start_from_the_settings(knobs):
+    assert knobs.as_dict() == {
+        "concurrency": 10,
+        "messages_per_minute": 30,
+        "chunk_size": 0,
+    }
+
+
+def test_update_returns_only_changed_knobs(knobs):
+    changed = knobs.update({"concurrency": "20", "messages_per_minute": 30})
+
+    assert changed == {"concurrency": 20}
+    assert knobs.concurrency == 20
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        {"unknown": 1},
+        {"concurrency": "many"},
+        {"concurrency": 0},
+        {"chunk_size": 100, "messages_per_minute": -1},
+    ],
+)
+def test_invalid_update_changes_nothing(knobs, values):
+    with pytest.raises(RuntimeKnobError):
+        knobs.update(values)
+
+    assert knobs.as_dict() == {
+        "concurrency": 10,
+        "messages_per_minute": 30,
+        "chunk_size": 0,
+    }
+
+
+def test_watcher_applies_the_file_once_per_change(knobs, tmp_path):
+    path = tmp_path / "runtime.json"
+    watcher = RuntimeConfigWatcher(knobs, str(path), interval=1)
+
+    assert not watcher.check()
+    _write_config(path, {"concurrency": 5}, mtime_ns=1_000)
+    assert watcher.check()
+    assert knobs.concurrency == 5
+    assert not watcher.check()
+
+    _write_config(path, {"concurrency": 7}, mtime_ns=2_000)
+    assert watcher.check()
+    assert knobs.concurrency == 7
+
+
+def test_watcher_ignores_invalid_files(knobs, tmp_path):
+    path = tmp_path / "runtime.json"
+    watcher = RuntimeConfigWatcher(knobs, str(path), interval=1)
+
+    path.write_text("{not json", encoding="utf-8")
+    assert watcher.check()
+    _write_config(path, [1, 2], mtime_ns=1_000)
+    assert watcher.check()
+    _write_config(path, {"concurrency": 0}, mtime_ns=2_000)
+    assert watcher.check()
+
+    assert knobs.concurrency == 10
+
+
+def test_watcher_thread_picks_up_changes(knobs, tmp_path):
+    path = tmp_path / "runtime.json"
+    _write_config(path, {"messages_per_minute": 15}, mtime_ns=1_000)
+    watcher = RuntimeConfigWatcher(knobs, str(path), interval=0.01)
+
+    watcher.start()
+    try:
+        assert knobs.messages_per_minute == 15
+        _write_config(path, {"messages_per_minute": 45}, mtime_ns=2_000)
+        deadline = time.monotonic() + 2
+        while knobs.messages_per_minute != 45 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        watcher.stop()
+
+    assert knobs.messages_per_minute == 45
+    assert watcher._thread is None
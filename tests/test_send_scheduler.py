@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+from app.services.runtime_knobs import RuntimeKnobs
+from app.services.send_scheduler import RecipientLedger, SendScheduler, TokenBucket
+
+
+def test_bucket_starts_full_and_paces_to_rate():
+    async def scenario():
+        bucket = TokenBucket(rate=20.0, capacity=2)
+        started = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # Two tokens of burst, then four at 20 per second
+    elapsed = asyncio.run(scenario())
+    assert 0.18 <= elapsed < 0.4
+
+
+def test_set_rate_applies_to_next_tokens():
+    async def scenario():
+        bucket = TokenBucket(rate=1.0)
+        await bucket.acquire()
+        bucket.set_rate(50.0)
+        started = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(scenario())
+    assert elapsed < 0.3
+
+
+def test_set_rate_keeps_tokens_accrued_at_previous_rate():
+    bucket = TokenBucket(rate=10.0, capacity=5)
+    bucket.tokens = 0
+    bucket._updated = time.monotonic() - 0.2
+    bucket.set_rate(0.001)
+    assert 1.9 <= bucket.tokens <= 2.1
+
+
+def test_scheduler_picks_up_rate_set_while_sending(settings):
+    settings.MAILBOX_MESSAGES_PER_MINUTE = 0
+    knobs = RuntimeKnobs(settings)
+    scheduler = SendScheduler(settings, RecipientLedger(None), knobs=knobs)
+
+    async def scenario():
+        started = time.monotonic()
+        for _ in range(20):
+            await scheduler.wait_for_slot("a@x.com")
+        unpaced = time.monotonic() - started
+
+        knobs.update({"messages_per_minute": 600})
+        started = time.monotonic()
+        for _ in range(3):
+            await scheduler.wait_for_slot("a@x.com")
+        return unpaced, time.monotonic() - started
+
+    unpaced, paced = asyncio.run(scenario())
+    assert unpaced < 0.05
+    # One token of burst, then one every 0.1 s
+    assert 0.15 <= paced < 0.4
+
+
+def test_plan_counts_fanned_out_messages(settings):
+    settings.MAILBOX_MESSAGES_PER_MINUTE = 60
+    scheduler = SendScheduler(settings, RecipientLedger(None))
+
+    plan = scheduler.plan([3, 1], ["a@x.com"], message_counts=[3, 1])
+
+    assert plan["per_mailbox"]["a@x.com"]["messages"] == 4
+    assert plan["eta_seconds"] == 4.0
+
+
+def test_campaigns_plan_against_what_others_reserved(settings):
+    settings.MAILBOX_RECIPIENTS_PER_DAY = 10
+    shared = SendScheduler(settings, RecipientLedger(None))
+    first = shared.for_campaign(1)
+    second = shared.for_campaign(2)
+
+    first_plan = first.plan([4, 4], ["a@x.com"])
+    second_plan = second.plan([4, 2], ["a@x.com"])
+
+    assert first_plan["deferred"] == []
+    assert second_plan["scheduled"] == [1]
+    assert second_plan["deferred"] == [0]
+    # The first campaign can still send everything it planned
+    assert first.has_quota("a@x.com", 8)
+    assert not second.has_quota("a@x.com", 3)
+
+
+def test_sent_and_finished_plans_release_the_reservation(settings):
+    settings.MAILBOX_RECIPIENTS_PER_DAY = 10
+    shared = SendScheduler(settings, RecipientLedger(None))
+    first = shared.for_campaign(1)
+    second = shared.for_campaign(2)
+    first.plan([4, 4], ["a@x.com"])
+
+    first.reserve("a@x.com", 4)
+    first.release("a@x.com", 4, sent=True)
+    assert second.remaining("a@x.com") == 2
+
+    first.finish()
+    assert second.remaining("a@x.com") == 6
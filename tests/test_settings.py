@@ -0,0 +1,15 @@
+from app.enum.duplicate_policy import DuplicatePolicy
+from app.enum.result_write_back import ResultWriteBack
+
+
+def test_duplicate_rows_are_sent_by_default(settings):
+    assert DuplicatePolicy(settings.DEDUP_POLICY) is DuplicatePolicy.OFF
+
+
+def test_results_are_not_written_by_default(settings):
+    assert ResultWriteBack(settings.RESULT_WRITE_BACK) is ResultWriteBack.OFF
+
+
+def test_runtime_watchers_are_opt_in(settings):
+    assert settings.RUNTIME_CONFIG_PATH == ""
+    assert settings.LOOP_MONITOR_INTERVAL == 0
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import time
+
+from app.enum.send_status import SendStatus
+from app.services import sharded_sender
+from app.services.result_writer import ResultWriter
+from app.services.sharded_sender import ShardedEmailSender
+
+
+def _crashing_shard(
+    shard_id,
+    access_token,
+    api_scope,
+    sender_email,
+    settings,
+    shard_data,
+    events,
+    workers,
+):
+    """
+    Reports the first row of the shard, then exits like a crashed worker.
+    """
+    events.put(
+        (
+            "row",
+            shard_id,
+            {
+                "row": shard_data["rows"][0],
+                "status": SendStatus.SENT.value,
+                "recipients": shard_data["recipients"][0],
+                "sender": sender_email,
+                "error": None,
+                "finished_at": time.time(),
+            },
+        )
+    )
+    events.close()
+    events.join_thread()
+    os._exit(1)
+
+
+def _email_data(rows):
+    return {
+        "bodies": ["<p>body</p>"] * len(rows),
+        "subjects": ["subject"] * len(rows),
+        "recipients": [f"user{row}@x.com" for row in rows],
+        "cc": [""] * len(rows),
+        "cco": [""] * len(rows),
+        "attachments": [[] for _ in rows],
+        "inline_images": [[] for _ in rows],
+        "rows": rows,
+    }
+
+
+def test_rows_of_a_crashed_worker_are_failed(settings, monkeypatch):
+    monkeypatch.setattr(sharded_sender, "_run_shard", _crashing_shard)
+    sender = ShardedEmailSender("token", "scope", "sender@x.com", settings, workers=1)
+
+    results = asyncio.run(sender.send_emails(_email_data([2, 3, 4])))
+
+    assert [result["row"] for result in results] == [2, 3, 4]
+    assert results[0]["status"] == SendStatus.SENT.value
+    for result in results[1:]:
+        assert result["status"] == SendStatus.FAILED.value
+        assert result["sender"] is None
+        assert result["finished_at"] is None
+    cells = ResultWriter._group(results)
+    assert cells[2][2] == "sender@x.com"
+    assert cells[3][:3] == (
+        SendStatus.FAILED.value,
+        "Worker process exited before sending this email",
+        None,
+    )
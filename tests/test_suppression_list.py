@@ -0,0 +1,135 @@
+import os
+
+import pytest
+
+from app.services.suppression_list import SuppressionList
+
+
+@pytest.fixture
+def suppression(tmp_path):
+    suppression = SuppressionList(str(tmp_path / "suppression"))
+    yield suppression
+    suppression.close()
+
+
+@pytest.fixture
+def source(tmp_path):
+    return tmp_path / "descadastros.txt"
+
+
+def _replace(source, content: bytes) -> None:
+    """
+    Replaces the source file with a new file, as exporters usually do.
+    """
+    temporary = source.with_suffix(".tmp")
+    temporary.write_bytes(content)
+    os.replace(temporary, source)
+
+
+def test_add_contains_and_compact(suppression):
+    assert suppression.add(["A@x.com", "b@x.com", "a@x.com ", ""]) == 2
+    assert suppression.contains("a@X.com")
+    suppression.compact()
+    assert suppression.contains("b@x.com")
+    assert not suppression.contains("c@x.com")
+    assert suppression.add(["b@x.com", "c@x.com"]) == 1
+    assert list(suppression.contains_many(["a@x.com", "d@x.com", "c@x.com"])) == [
+        True,
+        False,
+        True,
+    ]
+
+
+def test_reopen_keeps_log_and_index(suppression):
+    suppression.add(["a@x.com"])
+    suppression.compact()
+    suppression.add(["b@x.com"])
+    suppression.close()
+
+    reopened = SuppressionList(suppression.directory)
+    try:
+        assert reopened.contains("a@x.com") and reopened.contains("b@x.com")
+        assert len(reopened) == 2
+    finally:
+        reopened.close()
+
+
+def test_sync_reads_only_appended_lines(suppression, source):
+    source.write_bytes(b"a@x.com\nb@x.com\n")
+    assert suppression.sync_source(str(source)) == 2
+
+    with open(source, "ab") as file:
+        file.write(b"c@x.com\n")
+
+    assert suppression.sync_source(str(source)) == 1
+    assert suppression._read_state()["offset"] == source.stat().st_size
+
+
+def test_sync_imports_unterminated_last_line(suppression, source):
+    source.write_bytes(b"a@x.com\nb@x.com")
+
+    assert suppression.sync_source(str(source)) == 2
+    assert suppression.contains("b@x.com")
+
+
+def test_sync_rereads_last_line_once_completed(suppression, source):
+    source.write_bytes(b"a@x.com\nbob@x.c")
+    suppression.sync_source(str(source))
+
+    with open(source, "ab") as file:
+        file.write(b"om\nc@x.com\n")
+
+    assert suppression.sync_source(str(source)) == 2
+    assert suppression.contains("bob@x.com")
+    assert not suppression.contains("om")
+
+
+def test_sync_rereads_truncated_file(suppression, source):
+    source.write_bytes(b"a@x.com\nb@x.com\n")
+    suppression.sync_source(str(source))
+
+    with open(source, "wb") as file:
+        file.write(b"c@x.com\n")
+
+    assert suppression.sync_source(str(source)) == 1
+    assert suppression.contains("c@x.com")
+
+
+def test_sync_rereads_replaced_file_of_same_size(suppression, source):
+    source.write_bytes(b"a@x.com\nb@x.com\n")
+    suppression.sync_source(str(source))
+
+    _replace(source, b"c@x.com\nd@x.com\n")
+
+    assert suppression.sync_source(str(source)) == 2
+    assert suppression.contains("c@x.com") and suppression.contains("d@x.com")
+
+
+def test_sync_rereads_larger_replacement(suppression, source):
+    source.write_bytes(b"a@x.com\n")
+    suppression.sync_source(str(source))
+
+    _replace(source, b"zz@x.com\nb@x.com\nc@x.com\n")
+
+    assert suppression.sync_source(str(source)) == 3
+    assert suppression.contains("zz@x.com")
+
+
+def test_sync_rereads_file_rewritten_in_place(suppression, source):
+    source.write_bytes(b"a@x.com\nb@x.com\n")
+    suppression.sync_source(str(source))
+
+    with open(source, "r+b") as file:
+        file.write(b"c@x.com\nd@x.com\ne@x.com\n")
+
+    assert suppression.sync_source(str(source)) == 3
+    assert suppression.contains("c@x.com")
+
+
+def test_sync_of_another_file_starts_over(suppression, tmp_path, source):
+    source.write_bytes(b"a@x.com\n")
+    suppression.sync_source(str(source))
+    other = tmp_path / "bounces.txt"
+    other.write_bytes(b"a@x.com\nb@x.com\n")
+
+    assert suppression.sync_source(str(other)) == 1